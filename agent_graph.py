@@ -0,0 +1,145 @@
+import os
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import END, StateGraph, START
+from agent_utils import State
+from display_utils import print_state_info
+from prompts import PromptAssembler
+from router import CaseRouter
+from compaction import HistoryCompactor
+from executor import ParallelToolNode
+from guard import LoopGuard
+from llm_cache import CachedChatModel
+from fake_chat_model import ScriptedChatModel
+
+
+def make_chat_model(tools, kind: str | None = None):
+    """Chat model with the tools bound, or none bound when tools is empty. CHAT_MODEL=scripted (or
+    kind="scripted") selects the offline ScriptedChatModel, with SCRIPTED_LATENCY seconds of delay per call."""
+    kind = kind or os.environ.get("CHAT_MODEL", "openai")
+    if kind == "scripted":
+        model = ScriptedChatModel(latency=float(os.environ.get("SCRIPTED_LATENCY", "0")))
+        return model.bind_tools(tools) if tools else model
+
+    from langchain.chat_models import init_chat_model
+    llm = init_chat_model(model="gpt-4o-mini", temperature=0)
+    # Identical requests (unchanged cases, replayed scenarios) are answered from a local cache
+    return CachedChatModel(
+        llm.bind_tools(tools) if tools else llm,
+        os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite3"),
+        model_name="gpt-4o-mini:temperature=0",
+        tools=tools,
+    )
+
+
+def should_continue(state: State):
+    """Router function to decide whether to continue to tools or end."""
+    last_message = state["messages"][-1]
+    if last_message.tool_calls:
+        return "tools"
+    else:
+        return END
+
+
+def after_router(state: State):
+    """End when the router finished the case itself, otherwise hand it to the agent."""
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return END
+    return "agent"
+
+
+def after_guard(state: State):
+    """End when the guard stopped the run, otherwise run the tool calls."""
+    last_message = state["messages"][-1]
+    if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+        return END
+    return "tools"
+
+
+def build_graph(chat_model, tools, prompt: PromptAssembler | None = None, verbose: bool = True,
+                router: CaseRouter | None = None, compactor: HistoryCompactor | None = None,
+                tool_node: ParallelToolNode | None = None, guard: LoopGuard | None = None):
+    """Compile the agent -> tools loop around chat_model, which must already have the tools bound.
+
+    With a router, every request passes through it first and only reaches the
+    agent when the router doesn't finish the case itself. With a compactor, old
+    tool results are shrunk after every tools step, before the agent sees them.
+    Tool calls run through tool_node, a ParallelToolNode over tools by default.
+    With a guard, each turn's tool calls are checked for loops before they run.
+
+    The graph runs with invoke or ainvoke; for ainvoke pass tools_and_resources.ASYNC_TOOLS
+    so tool work runs off the event loop.
+    """
+    # System prompt rendered once; it and the tool schemas form the cacheable prefix of every call
+    prompt = prompt or PromptAssembler(tools)
+
+    def agent(state: State) -> State:
+        messages = prompt.build(state["messages"])
+        response = chat_model.invoke(messages)
+        prompt.record(response)
+
+        if verbose:
+            print_state_info({"messages": [response]}, "AGENT", "EXITING")
+        return {"messages": [response]}
+
+    async def aagent(state: State) -> State:
+        messages = prompt.build(state["messages"])
+        response = await chat_model.ainvoke(messages)
+        prompt.record(response)
+
+        if verbose:
+            print_state_info({"messages": [response]}, "AGENT", "EXITING")
+        return {"messages": [response]}
+
+    def fast_path(state: State) -> State:
+        messages, _ = router.route(state["messages"])
+        if verbose and messages:
+            print_state_info({"messages": messages}, "ROUTER", "EXITING")
+        return {"messages": messages}
+
+    async def afast_path(state: State) -> State:
+        messages, _ = await router.aroute(state["messages"])
+        if verbose and messages:
+            print_state_info({"messages": messages}, "ROUTER", "EXITING")
+        return {"messages": messages}
+
+    def compact(state: State) -> State:
+        return {"messages": compactor.compact(state["messages"])}
+
+    graph_builder = StateGraph(State)
+    graph_builder.add_node("agent", RunnableLambda(agent, afunc=aagent, name="agent"))
+    tool_node = tool_node or ParallelToolNode(tools)
+    graph_builder.add_node("tools", RunnableLambda(tool_node.invoke, afunc=tool_node.ainvoke, name="tools"))
+    if router is not None:
+        graph_builder.add_node("router", RunnableLambda(fast_path, afunc=afast_path, name="router"))
+        graph_builder.add_edge(START, "router")
+        graph_builder.add_conditional_edges("router", after_router, {
+            "agent": "agent",
+            END: END
+        })
+    else:
+        graph_builder.add_edge(START, "agent")
+    if guard is not None:
+        graph_builder.add_node("guard", guard)
+        graph_builder.add_conditional_edges("agent", should_continue, {
+            "tools": "guard",
+            END: END
+        })
+        graph_builder.add_conditional_edges("guard", after_guard, {
+            "tools": "tools",
+            END: END
+        })
+    else:
+        graph_builder.add_conditional_edges("agent", should_continue, {
+            "tools": "tools",
+            END: END
+        })
+    if compactor is not None:
+        graph_builder.add_node("compact", compact)
+        graph_builder.add_edge("tools", "compact")
+        graph_builder.add_edge("compact", "agent")
+    else:
+        graph_builder.add_edge("tools", "agent")
+    graph_builder.add_edge("agent", END)
+    return graph_builder.compile()
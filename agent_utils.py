@@ -1,6 +1,8 @@
-from typing import Annotated, TypedDict
+from typing import Annotated, NotRequired, TypedDict
 from langgraph.graph.message import add_messages
 
 
 class State(TypedDict):
-    messages: Annotated[list, add_messages] 
\ No newline at end of file
+    messages: Annotated[list, add_messages]
+    # Set by guard.LoopGuard when it stops a run
+    stop_reason: NotRequired[dict]
@@ -0,0 +1,96 @@
+"""Benchmark recall and memory of the quantized past-case index against the float path.
+
+Builds a synthetic corpus of case-like texts, indexes it at full precision, writes
+int8 and float16 memory-mapped copies and compares top-k recall (with and without
+re-ranking from the float16 rows), query latency, the bytes a scan reads, the
+bytes mapped and the file size. An int8 file with re-rank rows is larger than a
+float16 one; "int8 (no rerank rows)" is the smallest file.
+
+    python bench_embeddings.py --cases 20000 --queries 200
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from similarity import HashingEmbedder
+from embedding_store import QuantizedEmbeddings, write_embeddings
+
+
+def synthetic_texts(n: int, rng: np.random.Generator, topics: int = 50, length: int = 60) -> list[str]:
+    background = [f"word{i}" for i in range(3000)]
+    topic_words = [[f"topic{t}term{i}" for i in range(40)] for t in range(topics)]
+    texts = []
+    for _ in range(n):
+        topic = topic_words[rng.integers(topics)]
+        n_topic = int(length * 0.6)
+        words = list(rng.choice(topic, n_topic)) + list(rng.choice(background, length - n_topic))
+        rng.shuffle(words)
+        texts.append(" ".join(words))
+    return texts
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=1024)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    texts = synthetic_texts(args.cases, rng)
+    queries = synthetic_texts(args.queries, rng)
+
+    embedder = HashingEmbedder(args.dim)
+    start = time.perf_counter()
+    tf = np.stack([embedder.term_frequencies(text) for text in texts])
+    embedder.fit(tf)
+    matrix = embedder.weight(tf)
+    del tf
+    print(f"Indexed {args.cases} cases in {time.perf_counter() - start:.2f}s (dim {args.dim})")
+
+    query_vectors = embedder.embed(queries)
+    start = time.perf_counter()
+    exact = [top_k(matrix @ q, args.k) for q in query_vectors]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    heap_mb = matrix.nbytes / 2**20
+    print(f"\n{'variant':<36}{'scan MB':>9}{'mapped MB':>11}{'file MB':>9}{'recall@k':>10}{'ms/query':>10}")
+    print(f"{'float64 (heap)':<36}{matrix.size * 8 / 2**20:>9.1f}{'-':>11}{'-':>9}{1.0:>10.3f}{'-':>10}")
+    print(f"{'float32 (heap)':<36}{heap_mb:>9.1f}{'-':>11}{'-':>9}{1.0:>10.3f}{exact_ms:>10.2f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        ids = [str(i) for i in range(args.cases)]
+        for dtype, with_rows in (("float16", True), ("int8", True), ("int8", False)):
+            path = os.path.join(directory, f"{dtype}-{with_rows}.bin")
+            write_embeddings(path, ids, matrix, embedder, dtype, rerank=with_rows)
+            mapped = QuantizedEmbeddings(path)
+            sizes = (f"{mapped.scan_bytes / 2**20:>9.1f}{mapped.nbytes / 2**20:>11.1f}"
+                     f"{os.path.getsize(path) / 2**20:>9.1f}")
+
+            for rerank in (False, True):
+                hits = 0
+                start = time.perf_counter()
+                for q, truth in zip(query_vectors, exact):
+                    if rerank:
+                        candidates = top_k(mapped.scores(q), args.k * args.rerank_factor)
+                        # Re-rank from the file's float16 rows (or dequantized int8 without them), as MappedPastCaseIndex does
+                        found = candidates[top_k(mapped.rerank_vectors(candidates) @ q, args.k)]
+                    else:
+                        found = top_k(mapped.scores(q), args.k)
+                    hits += len(set(found.tolist()) & set(truth.tolist()))
+                elapsed = (time.perf_counter() - start) / len(queries) * 1000
+                label = f"{dtype} mmap" + ("" if with_rows else " (no rerank rows)") + (" + rerank" if rerank else "")
+                print(f"{label:<36}{sizes}{hits / (args.k * len(queries)):>10.3f}{elapsed:>10.2f}")
+            del mapped
+
+
+if __name__ == "__main__":
+    main()
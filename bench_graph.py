@@ -0,0 +1,156 @@
+"""Benchmark the agent -> tools loop offline with the scripted chat model.
+
+Generates synthetic cases (a pool of resolved past cases plus incoming ones),
+runs every incoming case through the graph with ScriptedChatModel and reports
+cases per second, so graph dispatch, ToolNode, the message reducer and the case
+mutations can be profiled without a provider. With --concurrency the cases run
+through AsyncCaseRunner instead; add --latency to see throughput scale with the
+number of in-flight cases.
+
+On one core the default run does about 125 cases/s with invoke and about
+100-140 with --concurrency: roughly 8 ms per case, short of the 1000 cases/s
+target. Retrieval used to be the hot spot (BM25 walked every posting in Python,
+about 22 ms per check_past_cases); it is now vectorised at about 5 ms. Most of
+what is left is LangGraph and LangChain per-step overhead (Runnable config
+merging, callback managers, signature inspection) across the ~12 node runs of
+a case, which no code here controls. Run with --profile to check.
+
+    python bench_graph.py --cases 2000 --past 500
+    python bench_graph.py --cases 500 --profile
+    python bench_graph.py --cases 500 --latency 0.05 --concurrency 32
+"""
+import argparse
+import asyncio
+import cProfile
+import pstats
+import random
+import time
+from datetime import datetime, timedelta
+from langchain_core.messages import HumanMessage
+from simple_model import Case, Comment, CaseState, Priority, Component
+from tools_and_resources import (
+    case_store, webapp_dev, applog_dev, support_agent, api_dev, database_admin, ALL_TOOLS, ASYNC_TOOLS
+)
+from agent_graph import build_graph, make_chat_model
+from runner import AsyncCaseRunner, case_request
+from router import CaseRouter
+from compaction import HistoryCompactor
+
+
+COMPONENT_ASSIGNEES = {
+    Component.WEBAPP: webapp_dev,
+    Component.APPLOG: applog_dev,
+    Component.API: api_dev,
+    Component.DATABASE: database_admin,
+    Component.OTHER: support_agent,
+}
+SYMPTOMS = {
+    Component.WEBAPP: "page hangs after clicking the run job button and the browser tab freezes",
+    Component.APPLOG: "job scheduler log shows worker threads blocked and jobs never finishing",
+    Component.API: "REST endpoint returns 502 bad gateway under load for batch requests",
+    Component.DATABASE: "queries time out and the connection pool is exhausted during nightly batch",
+    Component.OTHER: "customer cannot find the export option in the settings menu",
+}
+INSTRUCTIONS = (
+    "",
+    "Please read through this case and synthesize for the developer colleagues who will take over investigation.",
+    "Customer gets a Permission Denied error.",
+)
+
+
+def synthetic_case(case_id: str, component: Component, rng: random.Random, resolved: bool, comments: int = 0) -> Case:
+    created = datetime.now() - timedelta(days=rng.randint(1, 90))
+    assignee = COMPONENT_ASSIGNEES[component] if resolved else support_agent
+    return Case(
+        id=case_id,
+        title=f"{component.value} issue {case_id}",
+        description=f"Customer reports the {SYMPTOMS[component]}. Seen {rng.randint(1, 20)} times today.",
+        priority=rng.choice(list(Priority)),
+        state=CaseState.RESOLVED if resolved else CaseState.NEW,
+        assignee=assignee,
+        component=component if resolved else Component.WEBAPP,
+        created_at=created,
+        updated_at=created,
+        comments=[
+            Comment(
+                id=f"{case_id}-c{i}",
+                content=f"Investigated the {component.value} side. Found the cause in step {i}. Deployed a fix.",
+                author=rng.choice(list(COMPONENT_ASSIGNEES.values())).name,
+                created_at=(created + timedelta(hours=i)).isoformat(),
+                updated_at=(created + timedelta(hours=i)).isoformat(),
+            )
+            for i in range(comments)
+        ],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--past", type=int, default=500)
+    parser.add_argument("--comments", type=int, default=5, help="comments per synthetic case")
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial seconds per model call")
+    parser.add_argument("--concurrency", type=int, default=0, help="cases in flight at once via ainvoke; 0 runs invoke in a loop")
+    parser.add_argument("--router", action="store_true", help="put the rule-based fast-path router in front of the agent")
+    parser.add_argument("--compact", action="store_true", help="compact old tool results between tools and agent")
+    parser.add_argument("--profile", action="store_true", help="print the top functions by cumulative time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", type=float, default=1000.0, help="cases/s to compare the result against")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    components = list(Component)
+    with case_store.batch():
+        case_store.add_cases([
+            synthetic_case(f"PAST-{i:06d}", rng.choice(components), rng, resolved=True, comments=args.comments)
+            for i in range(args.past)
+        ])
+        incoming = [
+            synthetic_case(f"BENCH-{i:06d}", rng.choice(components), rng, resolved=False, comments=args.comments)
+            for i in range(args.cases)
+        ]
+        case_store.add_cases(incoming)
+    requests = {case.id: case_request(case, INSTRUCTIONS[i % len(INSTRUCTIONS)]) for i, case in enumerate(incoming)}
+    first = next(iter(requests))
+
+    model = make_chat_model(ALL_TOOLS, "scripted").model_copy(update={"latency": args.latency})
+    tools = ASYNC_TOOLS if args.concurrency else ALL_TOOLS
+    graph = build_graph(model, tools, verbose=False, router=CaseRouter(tools) if args.router else None,
+                        compactor=HistoryCompactor() if args.compact else None)
+    config = {"recursion_limit": 20}
+
+    # Build the lazy retrieval indexes outside the timed loop
+    graph.invoke({"messages": [HumanMessage(content=requests.pop(first))]}, config=config)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter()
+    messages = 0
+    if args.concurrency:
+        runs = asyncio.run(AsyncCaseRunner(graph, args.concurrency, config=config).run(requests))
+        messages = sum(len(run.messages) for run in runs.values())
+        failed = [run for run in runs.values() if run.status != "done"]
+        if failed:
+            print(f"{len(failed)} cases did not finish, first: {failed[0]}")
+    else:
+        for text in requests.values():
+            result = graph.invoke({"messages": [HumanMessage(content=text)]}, config=config)
+            messages += len(result["messages"])
+    elapsed = time.perf_counter() - start
+    if profiler:
+        profiler.disable()
+
+    done = len(requests)
+    resolved = sum(1 for case in incoming if case_store[case.id].state == CaseState.RESOLVED)
+    print(f"Processed {done} cases in {elapsed:.2f}s: {done / elapsed:.0f} cases/s, "
+          f"{messages / done:.1f} messages/case, {model.calls} model calls, {resolved} resolved")
+    rate = done / elapsed
+    print(f"{elapsed / done * 1000:.2f} ms/case; target {args.target:.0f} cases/s "
+          + ("met" if rate >= args.target else f"missed by {args.target / rate:.1f}x"))
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Bulk import and export of cases as JSONL, gzip-compressed when the path ends in .gz.
+
+Both directions stream in chunks, so memory stays flat however many cases
+move. Set CASE_STORE_DB (or CASE_STORE_JOURNAL) so the store outlives the run.
+
+    CASE_STORE_DB=cases.sqlite3 python bulk.py export cases.jsonl.gz
+    CASE_STORE_DB=cases.sqlite3 python bulk.py import cases.jsonl.gz --processes 4
+"""
+import argparse
+import gzip
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pydantic import ValidationError
+from simple_model import Case
+
+
+@contextmanager
+def open_jsonl(path: str, mode: str):
+    """(binary handle on a JSONL file, the underlying file), through gzip when the path ends in .gz.
+
+    The underlying file's tell() is the byte offset on disk, compressed or not.
+    """
+    with open(path, mode + "b") as raw:
+        if path.endswith(".gz"):
+            with gzip.GzipFile(fileobj=raw, mode=mode + "b", compresslevel=6) as f:
+                yield f, raw
+        else:
+            yield raw, raw
+
+
+def store_cases(store, chunk_size: int = 1000):
+    """Every case in the store, read chunk_size at a time instead of listing them all."""
+    return store.iter_cases(chunk_size)
+
+
+def parse_chunk(lines: list[bytes]) -> tuple[list[Case], list[tuple[int, str]]]:
+    """Cases parsed from a chunk of JSONL lines, and (offset, reason) for those that failed."""
+    cases, errors = [], []
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            cases.append(Case.model_validate_json(line))
+        except ValidationError as e:
+            errors.append((offset, str(e.errors(include_url=False)[0]["msg"])))
+    return cases, errors
+
+
+class Progress:
+    """Counts records and file bytes moved and hands a rate snapshot to `on_progress` after each chunk.
+
+    Bytes are the file's own, so gzip-compressed for a .gz path.
+    """
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+        self.cases = 0
+        self.errors = 0
+        self.bytes = 0
+        self.first_errors: list[tuple[int, str]] = []
+
+    def update(self, cases: int, offset: int, errors: list[tuple[int, str]] = ()):
+        """Count a chunk; offset is how far into the file it ends."""
+        self.cases += cases
+        self.bytes = offset
+        self.errors += len(errors)
+        self.first_errors.extend(errors[:10 - len(self.first_errors)])
+        if self.on_progress is not None:
+            self.on_progress(self.stats())
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "cases": self.cases,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "elapsed": elapsed,
+            "cases_per_second": self.cases / elapsed if elapsed else 0.0,
+            "mb_per_second": self.bytes / elapsed / 1e6 if elapsed else 0.0,
+        }
+
+
+def export_cases(cases, path: str, chunk_size: int = 1000, on_progress=None) -> dict:
+    """Write cases (any iterable, e.g. store_cases(store)) to JSONL, chunk_size lines per write."""
+    progress = Progress(on_progress)
+    cases = iter(cases)
+    with open_jsonl(path, "w") as (f, raw):
+        while chunk := list(itertools.islice(cases, chunk_size)):
+            f.write(b"".join(case.model_dump_json().encode() + b"\n" for case in chunk))
+            progress.update(len(chunk), raw.tell())
+    # gzip writes its last block and trailer on close
+    progress.bytes = os.path.getsize(path)
+    return progress.stats()
+
+
+def read_chunks(path: str, chunk_size: int):
+    """Lists of up to chunk_size lines, with the line number each list starts at and the file offset it ends at."""
+    with open_jsonl(path, "r") as (f, raw):
+        number = 1
+        while lines := list(itertools.islice(f, chunk_size)):
+            yield number, lines, raw.tell()
+            number += len(lines)
+
+
+def import_cases(path: str, store, chunk_size: int = 1000, processes: int = 0, on_progress=None) -> dict:
+    """Load cases from JSONL into the store, one store batch() per chunk.
+
+    With processes > 0 the chunks are parsed in a process pool, at most two per
+    process in flight, and stored in file order. Parsed cases have to be pickled
+    back, which costs more than model_validate_json for records like ours, so
+    this only pays off when validation is the heavy part. Lines that don't validate are
+    counted and skipped; stats()["first_errors"] holds the first few as (line
+    number, reason). Cases already in the store are replaced. A journaled store
+    (CASE_STORE_JOURNAL) does not log the imported cases one by one; it takes
+    one snapshot when the import ends.
+    """
+    progress = Progress(on_progress)
+    journal = getattr(store, "journal", None)
+
+    def store_chunk(number: int, end: int, parsed: tuple):
+        cases, errors = parsed
+        with store.batch():
+            store.add_cases(cases)
+        progress.update(len(cases), end, [(number + offset, msg) for offset, msg in errors])
+
+    with journal.suspended() if journal is not None else nullcontext():
+        if processes <= 0:
+            for number, lines, end in read_chunks(path, chunk_size):
+                store_chunk(number, end, parse_chunk(lines))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                pending = deque()
+                for number, lines, end in read_chunks(path, chunk_size):
+                    pending.append((number, end, pool.submit(parse_chunk, lines)))
+                    if len(pending) >= 2 * processes:
+                        number, end, future = pending.popleft()
+                        store_chunk(number, end, future.result())
+                while pending:
+                    number, end, future = pending.popleft()
+                    store_chunk(number, end, future.result())
+    return {**progress.stats(), "first_errors": progress.first_errors}
+
+
+def print_progress(stats: dict):
+    print(f"\r{stats['cases']} cases, {stats['errors']} errors, {stats['bytes'] / 1e6:.1f} MB "
+          f"({stats['cases_per_second']:.0f} cases/s, {stats['mb_per_second']:.1f} MB/s)", end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or export the case store as JSONL (.gz for gzip).")
+    parser.add_argument("direction", choices=("import", "export"))
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=0, help="parse imports in this many processes")
+    args = parser.parse_args()
+
+    from tools_and_resources import case_store
+    if args.direction == "export":
+        stats = export_cases(store_cases(case_store), args.path, args.chunk_size, print_progress)
+    else:
+        stats = import_cases(args.path, case_store, args.chunk_size, args.processes, print_progress)
+    print()
+    for number, reason in stats.get("first_errors", []):
+        print(f"line {number}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
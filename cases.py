@@ -243,15 +243,16 @@ permissions_case = Case(
 )
 
 def load_all_cases():
-    """Load all cases into the case store."""
-    case_store[historical_case.id] = historical_case
-    case_store[incoming_case.id] = incoming_case
-    case_store[complex_case.id] = complex_case
-    case_store[permissions_case.id] = permissions_case
+    """Load all cases into the case store, keeping any versions already persisted there."""
+    with case_store.batch():
+        case_store.add_cases(
+            case for case in (historical_case, incoming_case, complex_case, permissions_case)
+            if case.id not in case_store
+        )
     
     return {
-        "historical_case": historical_case,
-        "incoming_case": incoming_case, 
-        "complex_case": complex_case,
-        "permissions_case": permissions_case
+        "historical_case": case_store[historical_case.id],
+        "incoming_case": case_store[incoming_case.id], 
+        "complex_case": case_store[complex_case.id],
+        "permissions_case": case_store[permissions_case.id]
     } 
\ No newline at end of file
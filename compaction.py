@@ -0,0 +1,126 @@
+import json
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough token count: four characters per token plus a few per message."""
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        total += len(content) // 4 + 4
+        for call in getattr(message, "tool_calls", None) or ():
+            total += len(json.dumps(call["args"])) // 4 + 4
+    return total
+
+
+class HistoryCompactor:
+    """Shrinks old tool results in the agent's message history between tool and model calls.
+
+    Results in the last `keep_turns` tool-calling turns are left alone. Older
+    ones are collapsed to a digest of at most `digest_chars` characters, and a
+    result whose call (same tool, same arguments) was made again later is
+    replaced by a stub. If the history still exceeds `token_budget`, messages
+    before the last keep_turns turns are shrunk oldest first: tool results are
+    stubbed, and long AI and human contents are cut to a digest. The latest
+    human message (the request being worked on) is never touched. Every
+    ToolMessage stays in place with its tool_call_id, and every AIMessage keeps
+    its tool calls, so each tool call keeps its result.
+
+    compact() returns replacement messages with the originals' ids, which the
+    add_messages reducer swaps in place.
+    """
+
+    def __init__(self, keep_turns: int = 2, digest_chars: int = 300, token_budget: int = 8000):
+        self.keep_turns = keep_turns
+        self.digest_chars = digest_chars
+        self.token_budget = token_budget
+        self.compacted = 0
+        self.chars_saved = 0
+
+    def compact(self, messages: list) -> list:
+        turns = 0
+        protected = set()
+        # Index of the first message of the last keep_turns turns
+        recent_start = len(messages)
+        # Walk newest first: the last keep_turns turns are protected, and the first
+        # time a (tool, args) pair is seen is its latest call
+        latest = {}
+        superseded = set()
+        for index in range(len(messages) - 1, -1, -1):
+            message = messages[index]
+            if isinstance(message, AIMessage) and message.tool_calls:
+                turns += 1
+                if turns <= self.keep_turns:
+                    recent_start = index
+                for call in message.tool_calls:
+                    if turns <= self.keep_turns:
+                        protected.add(call["id"])
+                    key = (call["name"], json.dumps(call["args"], sort_keys=True))
+                    if key in latest:
+                        superseded.add(call["id"])
+                    else:
+                        latest[key] = call["id"]
+        request = next((message for message in reversed(messages) if isinstance(message, HumanMessage)), None)
+
+        updates = {}
+        for message in messages:
+            if not isinstance(message, ToolMessage) or message.tool_call_id in protected:
+                continue
+            if message.response_metadata.get("compacted") in ("superseded", "stub"):
+                continue
+            if message.tool_call_id in superseded:
+                updates[message.id] = self._replace(message, "superseded", f"[{message.name}: superseded by a later call]")
+            elif not message.response_metadata.get("compacted"):
+                digest = self._digest(message)
+                if digest is not None:
+                    updates[message.id] = self._replace(message, "digest", digest)
+
+        current = [updates.get(message.id, message) for message in messages]
+        tokens = estimate_tokens(current)
+        for message in current[:recent_start]:
+            if tokens <= self.token_budget:
+                break
+            if message is request or message.response_metadata.get("compacted") in ("superseded", "stub"):
+                continue
+            if isinstance(message, ToolMessage):
+                if message.tool_call_id in protected:
+                    continue
+                replacement = self._replace(message, "stub", f"[{message.name}: result dropped to fit the history budget]")
+            elif not message.response_metadata.get("compacted"):
+                digest = self._digest(message)
+                if digest is None:
+                    continue
+                replacement = self._replace(message, "digest", digest)
+            else:
+                continue
+            updates[message.id] = replacement
+            tokens -= estimate_tokens([message]) - estimate_tokens([replacement])
+        return list(updates.values())
+
+    def stats(self) -> dict:
+        return {"compacted": self.compacted, "chars_saved": self.chars_saved}
+
+    def _digest(self, message) -> str | None:
+        """The message's text flattened and cut so that, marker included, it is at most digest_chars long."""
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        flat = " ".join(content.split())
+        if len(flat) <= self.digest_chars:
+            return None
+        dropped = len(content)
+        # The marker's length depends on the count it shows; settle both
+        for _ in range(3):
+            marker = f"... [{dropped} chars compacted]"
+            head = flat[:max(self.digest_chars - len(marker), 0)]
+            if len(content) - len(head) == dropped:
+                break
+            dropped = len(content) - len(head)
+        return head + f"... [{dropped} chars compacted]"
+
+    def _replace(self, message, level: str, content: str):
+        previous = message.content if isinstance(message.content, str) else json.dumps(message.content)
+        self.compacted += 1
+        self.chars_saved += len(previous) - len(content)
+        return message.model_copy(update={
+            "content": content,
+            "response_metadata": {**message.response_metadata, "compacted": level},
+        })
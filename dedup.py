@@ -0,0 +1,128 @@
+import hashlib
+import re
+import threading
+import zlib
+import numpy as np
+from simple_model import Case
+
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+MAX_HASH = np.uint64(0xFFFFFFFF)
+
+
+def content_key(case: Case) -> bytes:
+    """Digest of the text a signature covers, to tell whether a saved case needs re-signing."""
+    return hashlib.blake2b(f"{case.title}\n{case.description}".encode(), digest_size=16).digest()
+
+
+def case_shingles(case: Case, size: int = 3) -> set[str]:
+    """Word shingles of a case's title and description."""
+    words = WORD_PATTERN.findall(f"{case.title}\n{case.description}".lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class DuplicateIndex:
+    """MinHash + LSH index for spotting near-duplicate cases on arrival.
+
+    Each case's shingle set is reduced to a `num_perm` MinHash signature using
+    multiply-shift hashing, vectorized with NumPy. Signatures are split into
+    `bands` bands; cases sharing any band bucket become candidates, and only those
+    candidates have their Jaccard similarity estimated. With the defaults (16 bands
+    of 8 rows) pairs above ~0.7 Jaccard are found with high probability, and a
+    lookup touches a handful of buckets whatever the index size. Each signature
+    is kept with a digest of the title and description it was made from, so
+    re-adding a case whose text didn't change (a new comment, a state change)
+    costs one hash instead of a new signature.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.7, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Odd 64-bit multipliers; (a * x + b) >> 32 is a universal hash of 32-bit x
+        self._a = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._signatures: dict[str, np.ndarray] = {}
+        # case_id -> content_key() of the text its signature was made from
+        self._content: dict[str, bytes] = {}
+        self._buckets: list[dict[bytes, set[str]]] = [{} for _ in range(bands)]
+        self._lock = threading.RLock()
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, case_id: object) -> bool:
+        return case_id in self._signatures
+
+    def signature(self, case: Case) -> np.ndarray:
+        shingles = case_shingles(case)
+        if not shingles:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        hashed = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            values = (hashed[:, None] * self._a[None, :] + self._b[None, :]) >> np.uint64(32)
+        return values.min(axis=0)
+
+    def build(self, cases):
+        with self._lock:
+            self._signatures.clear()
+            self._content.clear()
+            self._buckets = [{} for _ in range(self.bands)]
+            for case in cases:
+                self.add(case)
+            self.built = True
+
+    def add(self, case: Case):
+        content = content_key(case)
+        if self._content.get(case.id) == content:
+            return
+        signature = self.signature(case)
+        with self._lock:
+            self.remove(case.id)
+            self._signatures[case.id] = signature
+            self._content[case.id] = content
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, set()).add(case.id)
+
+    def remove(self, case_id: str) -> bool:
+        with self._lock:
+            signature = self._signatures.pop(case_id, None)
+            self._content.pop(case_id, None)
+            if signature is None:
+                return False
+            for band, key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(case_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+            return True
+
+    def query(self, case: Case, threshold: float | None = None) -> list[tuple[str, float]]:
+        """(case id, estimated Jaccard similarity) of indexed near-duplicates, best first."""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self._signatures.get(case.id)
+        if signature is None or self._content.get(case.id) != content_key(case):
+            signature = self.signature(case)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            candidates.discard(case.id)
+            matches = []
+            for candidate in candidates:
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= threshold:
+                    matches.append((candidate, similarity))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [signature[i:i + self.rows].tobytes() for i in range(0, self.num_perm, self.rows)]
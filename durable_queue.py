@@ -0,0 +1,389 @@
+"""Durable case queue in SQLite that worker processes on one machine can share.
+
+SQLite's WAL mode needs shared memory between the processes, so the queue file
+(and a CASE_STORE_DB case store) must be on a local disk, not a network share.
+Queue cases from a shared case store, run workers against it, and read the stats:
+
+    CASE_STORE_DB=cases.sqlite3 python durable_queue.py --db queue.sqlite3 --enqueue
+    CASE_STORE_DB=cases.sqlite3 python durable_queue.py --db queue.sqlite3 --enqueue CASE-2025-002
+    CASE_STORE_DB=cases.sqlite3 python durable_queue.py --db queue.sqlite3 --worker-id worker1
+    python durable_queue.py --db queue.sqlite3 --stats
+"""
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from langchain_core.messages import HumanMessage
+from pydantic import BaseModel
+from simple_model import Case, CaseState
+from runner import case_request
+from work_queue import PRIORITY_RANK
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    case_id TEXT PRIMARY KEY,
+    rank INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+-- Done and dead jobs are kept, so claims only walk an index of the pending ones
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs(rank, created_at) WHERE status IN ('ready', 'leased');
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    redelivered INTEGER NOT NULL DEFAULT 0,
+    lost_leases INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+ENQUEUE = """
+INSERT INTO jobs (case_id, rank, created_at, enqueued_at, status) VALUES (?, ?, ?, ?, 'ready')
+ON CONFLICT(case_id) DO UPDATE SET
+    rank = excluded.rank, enqueued_at = excluded.enqueued_at, status = 'ready', attempts = 0, error = NULL
+WHERE jobs.status IN ('done', 'dead')
+"""
+# Highest priority, oldest first; a leased job whose lease ran out is claimable again
+NEXT_JOB = """
+SELECT case_id, status, attempts FROM jobs
+WHERE status IN ('ready', 'leased') AND (status = 'ready' OR lease_expires < ?)
+ORDER BY rank, created_at LIMIT 1
+"""
+LEASE = """
+UPDATE jobs SET status = 'leased', owner = ?, token = ?, lease_expires = ?, attempts = attempts + 1
+WHERE case_id = ?
+"""
+EXTEND = "UPDATE jobs SET lease_expires = ? WHERE case_id = ? AND token = ? AND status = 'leased'"
+PARK = "UPDATE jobs SET status = 'dead', owner = NULL, token = NULL, lease_expires = NULL, error = ? WHERE case_id = ?"
+FINISH = "UPDATE jobs SET status = ?, owner = NULL, token = NULL, lease_expires = NULL, error = ? WHERE case_id = ? AND token = ?"
+SELECT_ATTEMPTS = "SELECT attempts FROM jobs WHERE case_id = ?"
+COUNT_BY_STATUS = "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+REGISTER_WORKER = """
+INSERT INTO workers (worker_id, host, pid, started_at, last_seen) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(worker_id) DO UPDATE SET host = excluded.host, pid = excluded.pid, last_seen = excluded.last_seen
+"""
+WORKER_COUNT = "UPDATE workers SET {column} = {column} + ?, last_seen = ? WHERE worker_id = ?"
+SELECT_WORKERS = "SELECT * FROM workers ORDER BY worker_id"
+
+
+class Lease(BaseModel):
+    case_id: str
+    token: str
+    worker_id: str
+    expires: float
+    redelivery: bool = False
+
+
+class DurableCaseQueue:
+    """Case queue kept in a SQLite database so separate processes can claim work from it.
+
+    claim() takes the highest-priority, oldest ready case and leases it to the
+    worker for `visibility_timeout` seconds under a fresh token. While the lease
+    holds, no other worker can claim that case. heartbeat() extends the lease. A
+    worker that crashes or stalls stops heartbeating, its lease runs out, and the
+    case is redelivered to the next claim. complete() and fail() only apply while
+    the caller's token is still current, so a worker that lost its lease cannot
+    overwrite the new owner's result; it should stop as soon as heartbeat()
+    returns False. A case that fails, or whose lease runs out, `max_attempts`
+    times is parked as dead, so a case that keeps crashing its worker process
+    is not redelivered forever.
+
+    Per-worker counters (claimed, completed, failed, redelivered, lost leases,
+    busy time) live in the same database; worker_stats() exports them.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 60.0, max_attempts: int = 5, busy_timeout: float = 30.0):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, case: Case) -> bool:
+        """Queue a case; False if it is already waiting or leased."""
+        cursor = self._conn.execute(ENQUEUE, (case.id, PRIORITY_RANK[case.priority], case.created_at.timestamp(), time.time()))
+        return cursor.rowcount > 0
+
+    def enqueue_many(self, cases) -> int:
+        conn = self._conn
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = sum(
+                conn.execute(ENQUEUE, (case.id, PRIORITY_RANK[case.priority], case.created_at.timestamp(), now)).rowcount
+                for case in cases
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return count
+
+    def register(self, worker_id: str):
+        now = time.time()
+        self._conn.execute(REGISTER_WORKER, (worker_id, socket.gethostname(), os.getpid(), now, now))
+
+    def claim(self, worker_id: str) -> Lease | None:
+        """Lease the next case to worker_id, or None if nothing is claimable."""
+        conn = self._conn
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two workers never pick the same row
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = conn.execute(NEXT_JOB, (now,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                case_id, status, attempts = row
+                if status != "leased" or attempts < self.max_attempts:
+                    break
+                # Every worker that took it died or stalled; stop handing it out
+                conn.execute(PARK, (f"lease expired after {attempts} attempts", case_id))
+            redelivery = status == "leased"
+            lease = Lease(case_id=case_id, token=uuid.uuid4().hex, worker_id=worker_id,
+                          expires=now + self.visibility_timeout, redelivery=redelivery)
+            conn.execute(LEASE, (worker_id, lease.token, lease.expires, lease.case_id))
+            self._count(worker_id, "claimed", 1, now)
+            if redelivery:
+                self._count(worker_id, "redelivered", 1, now)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return lease
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """Extend the lease; False means it was lost and the case may belong to another worker now."""
+        expires = time.time() + self.visibility_timeout
+        if self._conn.execute(EXTEND, (expires, lease.case_id, lease.token)).rowcount == 0:
+            return False
+        lease.expires = expires
+        return True
+
+    def complete(self, lease: Lease, busy_seconds: float = 0.0) -> bool:
+        return self._finish(lease, "done", None, "completed", busy_seconds)
+
+    def fail(self, lease: Lease, error: str, busy_seconds: float = 0.0) -> bool:
+        """Release a failed case for another attempt, or park it as dead after max_attempts."""
+        return self._finish(lease, None, error, "failed", busy_seconds)
+
+    def counts(self) -> dict:
+        return dict(self._conn.execute(COUNT_BY_STATUS).fetchall())
+
+    def worker_stats(self) -> list[dict]:
+        """Per-worker counters with throughput over the worker's lifetime and while busy."""
+        cursor = self._conn.execute(SELECT_WORKERS)
+        columns = [column[0] for column in cursor.description]
+        stats = []
+        for row in cursor.fetchall():
+            worker = dict(zip(columns, row))
+            uptime = max(worker["last_seen"] - worker["started_at"], 1e-9)
+            worker["cases_per_second"] = worker["completed"] / uptime
+            worker["busy_cases_per_second"] = worker["completed"] / worker["busy_seconds"] if worker["busy_seconds"] else 0.0
+            stats.append(worker)
+        return stats
+
+    def _finish(self, lease: Lease, status: str | None, error: str | None, counter: str, busy_seconds: float) -> bool:
+        """Set the leased case's status (None: ready, or dead after max_attempts) if the lease is still ours."""
+        conn = self._conn
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if status is None:
+                row = conn.execute(SELECT_ATTEMPTS, (lease.case_id,)).fetchone()
+                status = "dead" if row is not None and row[0] >= self.max_attempts else "ready"
+            owned = conn.execute(FINISH, (status, error, lease.case_id, lease.token)).rowcount > 0
+            self._count(lease.worker_id, counter if owned else "lost_leases", 1, now)
+            self._count(lease.worker_id, "busy_seconds", busy_seconds, now)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return owned
+
+    def _count(self, worker_id: str, column: str, amount: float, now: float):
+        self._conn.execute(WORKER_COUNT.format(column=column), (amount, now, worker_id))
+
+
+class LeaseLost(Exception):
+    """The worker's lease on a case ran out and another worker may own the case now."""
+
+
+def durable_graph_handler(graph, store, config: dict | None = None):
+    """DurableWorker handler that runs a case through a compiled graph one step at a time.
+
+    Before each step it confirms (and renews) the lease, and raises LeaseLost
+    instead of going on if it was lost, so tools never change a case that
+    another worker has claimed since.
+    """
+    def handle(case_id: str, still_leased) -> str:
+        request = HumanMessage(content=case_request(store[case_id]))
+        state = None
+        for state in graph.stream({"messages": [request]}, config=config or {"recursion_limit": 40}, stream_mode="values"):
+            if not still_leased():
+                raise LeaseLost(case_id)
+        return state["messages"][-1].content
+
+    return handle
+
+
+class DurableWorker:
+    """Claims cases from a DurableCaseQueue and runs `handler(case_id, still_leased)` on each.
+
+    One background thread per worker, with its own connection, heartbeats the
+    current lease every `heartbeat_interval` seconds while the handler makes
+    progress. still_leased() returns False once the lease is lost, and renews it
+    otherwise. The handler must call it before each change it makes, and stop
+    (raise) when it returns False; durable_graph_handler does so between graph
+    steps. If the handler goes `max_step_seconds` without calling it, the
+    thread treats the handler as hung: it stops extending the lease and marks
+    it lost, so the case is redelivered once the lease runs out, and the
+    handler is told to stop if it ever resumes. A lost lease is counted against
+    the worker, never completed.
+    """
+
+    def __init__(self, case_queue: DurableCaseQueue, handler, worker_id: str | None = None,
+                 heartbeat_interval: float | None = None, idle_sleep: float = 0.5,
+                 max_step_seconds: float | None = None):
+        self.queue = case_queue
+        self.handler = handler
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval or case_queue.visibility_timeout / 3
+        self.idle_sleep = idle_sleep
+        self.max_step_seconds = max_step_seconds or case_queue.visibility_timeout * 5
+        self.stopping = threading.Event()
+        # (lease, lost event) of the case being handled, and when the handler last
+        # called still_leased(), for the heartbeat thread
+        self._current: tuple[Lease, threading.Event] | None = None
+        self._progress = 0.0
+        self._heart: threading.Thread | None = None
+        case_queue.register(self.worker_id)
+
+    def run(self, max_cases: int | None = None, exit_when_idle: bool = False) -> int:
+        """Process cases until stop() (or max_cases, or an empty queue with exit_when_idle)."""
+        done = 0
+        while not self.stopping.is_set() and (max_cases is None or done < max_cases):
+            lease = self.queue.claim(self.worker_id)
+            if lease is None:
+                if exit_when_idle:
+                    break
+                self.stopping.wait(self.idle_sleep)
+                continue
+            self.process(lease)
+            done += 1
+        return done
+
+    def process(self, lease: Lease) -> bool:
+        lost = threading.Event()
+
+        def still_leased() -> bool:
+            self._progress = time.monotonic()
+            if lost.is_set() or not self.queue.heartbeat(lease):
+                lost.set()
+                return False
+            return True
+
+        if self._heart is None:
+            self._heart = threading.Thread(target=self._beat, name=f"heartbeat-{self.worker_id}", daemon=True)
+            self._heart.start()
+        self._progress = time.monotonic()
+        self._current = (lease, lost)
+        start = time.perf_counter()
+        try:
+            self.handler(lease.case_id, still_leased)
+        except Exception as e:
+            self._current = None
+            return self.queue.fail(lease, repr(e), time.perf_counter() - start)
+        self._current = None
+        return self.queue.complete(lease, time.perf_counter() - start)
+
+    def _beat(self):
+        # DurableCaseQueue connections are per thread, so this one is opened once and reused
+        while not self.stopping.wait(self.heartbeat_interval):
+            current = self._current
+            if current is None:
+                continue
+            lease, lost = current
+            if lost.is_set():
+                continue
+            if time.monotonic() - self._progress > self.max_step_seconds:
+                # Hung handler: let the lease run out so another worker gets the case
+                lost.set()
+            elif not self.queue.heartbeat(lease):
+                lost.set()
+
+    def stop(self):
+        self.stopping.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue cases on, or run a triage worker against, a durable case queue.")
+    parser.add_argument("--db", required=True, help="queue database path")
+    parser.add_argument("--enqueue", nargs="*", metavar="CASE_ID",
+                        help="queue these cases from CASE_STORE_DB, or every unresolved case if none are given, and exit")
+    parser.add_argument("--worker-id")
+    parser.add_argument("--max-cases", type=int)
+    parser.add_argument("--exit-when-idle", action="store_true")
+    parser.add_argument("--visibility-timeout", type=float, default=60.0)
+    parser.add_argument("--stats", action="store_true", help="print queue and per-worker stats as JSON and exit")
+    args = parser.parse_args()
+
+    case_queue = DurableCaseQueue(args.db, visibility_timeout=args.visibility_timeout)
+    if args.stats:
+        print(json.dumps({"jobs": case_queue.counts(), "workers": case_queue.worker_stats()}, indent=2))
+        return
+
+    # Same rule as CaseWorkerPool's process mode: every process must see one store
+    if not os.environ.get("CASE_STORE_DB"):
+        parser.error("CASE_STORE_DB must point at the case store shared by every worker")
+
+    from tools_and_resources import case_store
+    if args.enqueue is not None:
+        if args.enqueue:
+            missing = [case_id for case_id in args.enqueue if case_id not in case_store]
+            if missing:
+                parser.error(f"Cases not found: {', '.join(missing)}")
+            cases = [case_store[case_id] for case_id in args.enqueue]
+        else:
+            cases = [case for state in CaseState if state != CaseState.RESOLVED
+                     for case in case_store.list_cases_by_state(state)]
+        print(f"Queued {case_queue.enqueue_many(cases)} of {len(cases)} cases")
+        return
+
+    from tools_and_resources import ALL_TOOLS
+    from agent_graph import build_graph, make_chat_model
+    graph = build_graph(make_chat_model(ALL_TOOLS), ALL_TOOLS, verbose=False)
+    worker = DurableWorker(case_queue, durable_graph_handler(graph, case_store), args.worker_id)
+    done = worker.run(args.max_cases, args.exit_when_idle)
+    print(f"{worker.worker_id} processed {done} cases")
+
+
+if __name__ == "__main__":
+    main()
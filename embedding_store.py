@@ -0,0 +1,250 @@
+import json
+import struct
+import numpy as np
+from similarity import HashingEmbedder, PastCaseIndex, case_text, top_hits
+
+
+# File layout: header, JSON id list (row i is ids[i]), per-row float32 scales,
+# document frequencies, the n x dim quantized matrix, then (for int8) the same rows
+# in float16 for re-ranking. Sections are 64-byte aligned so both matrices can be
+# memory-mapped directly.
+MAGIC = b"CASEVEC2"
+# magic, dtype, n, dim, n_docs, ids_off, ids_len, scales_off, data_off, rerank_off (0: none)
+HEADER = struct.Struct("<8s8sQQQQQQQQ")
+DTYPES = {"int8": np.int8, "float16": np.float16}
+ALIGN = 64
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def quantize(matrix: np.ndarray, dtype: str = "int8") -> tuple[np.ndarray, np.ndarray]:
+    """Quantize rows to `dtype`, returning (values, per-row scales)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), np.ones(len(matrix), dtype=np.float32)
+    if dtype != "int8":
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    # Symmetric per-row scaling onto [-127, 127]
+    scales = np.abs(matrix).max(axis=1) / 127.0 if len(matrix) else np.zeros(0, dtype=np.float32)
+    scales = scales.astype(np.float32)
+    safe = np.where(scales == 0, 1.0, scales)
+    values = np.clip(np.rint(matrix / safe[:, None]), -127, 127).astype(np.int8)
+    return values, scales
+
+
+def write_embeddings(path: str, ids: list[str], matrix: np.ndarray, embedder: HashingEmbedder, dtype: str = "int8",
+                     rerank: bool = True):
+    """Write a quantized embedding file that QuantizedEmbeddings can memory-map.
+
+    With rerank, an int8 file also gets float16 copies of its rows to re-rank
+    candidates from; a float16 file re-ranks from its own rows. Re-ranking is
+    float16-precise, not float32: the copies put an int8 file at 3 bytes per
+    dimension, more than a float16 file, so pass rerank=False when memory
+    matters more than the last bit of recall.
+    """
+    values, scales = quantize(matrix, dtype)
+    n, dim = values.shape if len(values) else (0, embedder.dim)
+    ids_blob = json.dumps(ids, separators=(",", ":")).encode()
+    ids_off = _align(HEADER.size)
+    scales_off = _align(ids_off + len(ids_blob))
+    df_off = _align(scales_off + scales.nbytes)
+    data_off = _align(df_off + dim * 8)
+    rerank_off = _align(data_off + values.nbytes) if rerank and dtype == "int8" and n else 0
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, dtype.encode(), n, dim, embedder.n_docs, ids_off, len(ids_blob), scales_off,
+                            data_off, rerank_off))
+        f.seek(ids_off)
+        f.write(ids_blob)
+        f.seek(scales_off)
+        f.write(scales.tobytes())
+        f.seek(df_off)
+        f.write(embedder.doc_freq.astype(np.float64).tobytes())
+        f.seek(data_off)
+        f.write(np.ascontiguousarray(values).tobytes())
+        if rerank_off:
+            f.seek(rerank_off)
+            f.write(np.asarray(matrix, dtype=np.float16).tobytes())
+
+
+def save_index(index: PastCaseIndex, path: str, dtype: str = "int8"):
+    """Compact an in-memory PastCaseIndex and write it out as a quantized file."""
+    index.compact()
+    write_embeddings(path, list(index.ids), index.matrix, index.embedder, dtype)
+
+
+class FrozenIDFEmbedder(HashingEmbedder):
+    """HashingEmbedder whose document frequencies stay as loaded, so every vector is weighted alike."""
+
+    def fit(self, tf_matrix: np.ndarray):
+        pass
+
+    def add_document(self, tf: np.ndarray):
+        pass
+
+    def remove_document(self, tf: np.ndarray):
+        pass
+
+
+class QuantizedEmbeddings:
+    """Read-only, memory-mapped view of a file written by write_embeddings.
+
+    The matrix is never copied onto the heap: every worker that opens the same
+    file shares its pages through the OS page cache. Scoring walks the matrix in
+    row chunks, dequantizing one chunk at a time. The embedder carries the
+    file's IDF, frozen.
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 4096):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            magic, dtype, n, dim, n_docs, ids_off, ids_len, scales_off, data_off, rerank_off = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"Not an embedding file: {path}")
+            f.seek(ids_off)
+            self.ids: list[str] = json.loads(f.read(ids_len))
+        self.dtype = dtype.rstrip(b"\0").decode()
+        self.dim = dim
+        self.rows = {case_id: row for row, case_id in enumerate(self.ids)}
+        self.scales = np.memmap(path, dtype=np.float32, mode="r", offset=scales_off, shape=(n,)) if n else np.zeros(0, np.float32)
+        df_off = _align(scales_off + n * 4)
+        self.embedder = FrozenIDFEmbedder(dim)
+        self.embedder.doc_freq = np.array(np.memmap(path, dtype=np.float64, mode="r", offset=df_off, shape=(dim,)))
+        self.embedder.n_docs = n_docs
+        self.values = (np.memmap(path, dtype=DTYPES[self.dtype], mode="r", offset=data_off, shape=(n, dim))
+                       if n else np.zeros((0, dim), dtype=DTYPES[self.dtype]))
+        if rerank_off:
+            self.rerank_values = np.memmap(path, dtype=np.float16, mode="r", offset=rerank_off, shape=(n, dim))
+        else:
+            self.rerank_values = self.values if self.dtype == "float16" else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def scan_bytes(self) -> int:
+        """Bytes every full scan reads: the quantized matrix and its scales."""
+        return self.values.nbytes + self.scales.nbytes
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes mapped in all: the scanned matrix plus any separate float16 re-rank rows."""
+        rerank = self.rerank_values.nbytes if self.rerank_values is not None and self.rerank_values is not self.values else 0
+        return self.scan_bytes + rerank
+
+    def vectors(self, rows) -> np.ndarray:
+        """Dequantized float32 vectors for the given rows; meant for a handful of rows, not a scan."""
+        rows = np.asarray(rows, dtype=np.intp)
+        return self.values[rows].astype(np.float32) * self.scales[rows, None]
+
+    def rerank_vectors(self, rows) -> np.ndarray:
+        """float16-precision vectors for re-ranking, or the dequantized ones if the file has none."""
+        if self.rerank_values is None:
+            return self.vectors(rows)
+        return self.rerank_values[np.asarray(rows, dtype=np.intp)].astype(np.float32)
+
+    def scores(self, query: np.ndarray, rows=None) -> np.ndarray:
+        """Approximate cosine of `query` against every row, or only `rows`."""
+        query = query.astype(np.float32)
+        if rows is None:
+            out = np.empty(len(self.ids), dtype=np.float32)
+            for start in range(0, len(self.ids), self.chunk_rows):
+                stop = start + self.chunk_rows
+                out[start:stop] = (self.values[start:stop].astype(np.float32) @ query) * self.scales[start:stop]
+            return out
+        rows = np.asarray(rows, dtype=np.intp)
+        out = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self.chunk_rows):
+            chunk = rows[start:start + self.chunk_rows]
+            out[start:start + len(chunk)] = (self.values[chunk].astype(np.float32) @ query) * self.scales[chunk]
+        return out
+
+
+class MappedPastCaseIndex:
+    """Past-case index served from a quantized, memory-mapped embedding file.
+
+    Candidates are ranked on the quantized vectors, then the best
+    `rerank_factor * k` are re-scored from the file's float16 rows, so a query
+    never goes back to the case store. Cases resolved after the file was written
+    go to a small in-memory PastCaseIndex, and reopened ones are tombstoned, so
+    the file itself stays read-only and shared. The delta index shares the
+    file's frozen IDF, keeping its scores comparable with the file's.
+    """
+
+    def __init__(self, path: str, rerank_factor: int = 4, prune_ratio: float = 0.25):
+        self.base = QuantizedEmbeddings(path)
+        self.embedder = self.base.embedder
+        self.rerank_factor = rerank_factor
+        self.prune_ratio = prune_ratio
+        self._removed: set[str] = set()
+        self.delta = PastCaseIndex(self.embedder)
+        self.delta.built = True
+        self.built = True
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self._removed) + len(self.delta)
+
+    def __contains__(self, case_id: object) -> bool:
+        return case_id in self.delta or (case_id in self.base.rows and case_id not in self._removed)
+
+    def build(self, cases):
+        """The file is the base index; nothing to build in memory."""
+
+    def start_compaction(self, interval: float = 5.0):
+        self.delta.start_compaction(interval)
+
+    def upsert(self, case):
+        # The delta's vector replaces the file's row, if the file has one
+        if case.id in self.base.rows:
+            self._removed.add(case.id)
+        self.delta.upsert(case)
+
+    def remove(self, case_id: str) -> bool:
+        in_base = case_id in self.base.rows and case_id not in self._removed
+        if in_base:
+            self._removed.add(case_id)
+        return self.delta.remove(case_id) or in_base
+
+    def query(self, case, k: int = 3) -> list[tuple[str, float]]:
+        hits = self.query_text(case_text(case), k + 1)
+        return [hit for hit in hits if hit[0] != case.id][:k]
+
+    def query_text(self, text: str, k: int = 10, candidates=None, rerank: bool = True) -> list[tuple[str, float]]:
+        """Top-k (case id, cosine), approximate on the file and float16-precise after re-ranking.
+
+        A `candidates` filter covering at most `prune_ratio` of the file is
+        scored on its own rows only; otherwise the whole file is scored in row
+        chunks straight from the mapping and the filter applied to the best
+        rows. Tombstones are skipped before the re-rank pool is cut, so it is
+        always full.
+        """
+        if candidates is not None and not len(candidates):
+            return []
+        query = self.embedder.embed([text])[0]
+        depth = k * self.rerank_factor if rerank else k
+        if candidates is not None and len(candidates) <= self.prune_ratio * len(self.base):
+            rows = np.fromiter((self.base.rows[c] for c in candidates if c in self.base.rows), dtype=np.intp)
+            hits = top_hits(self.base.scores(query, rows), [self.base.ids[row] for row in rows], depth,
+                            skip=self._removed)
+        else:
+            hits = top_hits(self.base.scores(query), self.base.ids, depth, candidates, self._removed)
+        if rerank and hits:
+            hits = list(self.score_ids(text, [case_id for case_id, _ in hits]).items())
+        hits.extend(self.delta.query_text(text, k, candidates))
+        hits.sort(key=lambda hit: -hit[1])
+        return hits[:k]
+
+    def score_ids(self, text: str, case_ids) -> dict[str, float]:
+        """Cosine against specific cases, from the file's float16 rows or the delta index."""
+        in_delta = [case_id for case_id in case_ids if case_id in self.delta]
+        in_base = [case_id for case_id in case_ids
+                   if case_id not in self.delta and case_id in self.base.rows and case_id not in self._removed]
+        scores = self.delta.score_ids(text, in_delta) if in_delta else {}
+        if in_base:
+            query = self.embedder.embed([text])[0]
+            vectors = self.base.rerank_vectors([self.base.rows[case_id] for case_id in in_base])
+            scores.update(zip(in_base, (vectors @ query).tolist()))
+        return scores
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessage, ToolMessage
+from agent_utils import State
+
+
+def mutates_case(tool) -> bool:
+    return bool((tool.metadata or {}).get("mutates_case"))
+
+
+class ParallelToolNode:
+    """Graph node that runs the last AIMessage's tool calls concurrently.
+
+    Calls are grouped by the case they touch. A group holding any call to a
+    tool marked mutates_case runs its calls one after another in the order the
+    model emitted them, so two changes to one case never interleave and every
+    read of that case in the same turn sees a deterministic state. All other
+    calls, and the groups themselves, run in parallel on a thread pool (or as
+    tasks under ainvoke). Results come back in call order with their
+    tool_call_id; each carries its run time in response_metadata["elapsed_ms"],
+    and stats() aggregates them per tool.
+    """
+
+    def __init__(self, tools, max_workers: int = 8):
+        self.tools = {t.name: t for t in tools}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool-call")
+        self._lock = threading.Lock()
+        # tool name -> [calls, total ms, max ms]
+        self.timings: dict[str, list] = {}
+
+    def invoke(self, state: State) -> State:
+        groups = self.groups(self._tool_calls(state))
+        if len(groups) == 1:
+            # Nothing to overlap; skip the hand-off to the pool
+            return {"messages": self._ordered(groups, [self._run_group(groups[0])])}
+        futures = [self._pool.submit(self._run_group, group) for group in groups]
+        return {"messages": self._ordered(groups, [future.result() for future in futures])}
+
+    async def ainvoke(self, state: State) -> State:
+        groups = self.groups(self._tool_calls(state))
+        results = await asyncio.gather(*(self._arun_group(group) for group in groups))
+        return {"messages": self._ordered(groups, results)}
+
+    def groups(self, tool_calls: list[dict]) -> list[list[tuple[int, dict]]]:
+        """(position, call) lists: one serial group per mutated case, one per remaining call."""
+        mutated = {
+            call["args"].get("case_id") for call in tool_calls
+            if call["name"] in self.tools and mutates_case(self.tools[call["name"]])
+        }
+        by_case: dict[str, list] = {}
+        groups = []
+        for position, call in enumerate(tool_calls):
+            case_id = call["args"].get("case_id")
+            if case_id is not None and case_id in mutated:
+                if case_id not in by_case:
+                    by_case[case_id] = []
+                    groups.append(by_case[case_id])
+                by_case[case_id].append((position, call))
+            else:
+                groups.append([(position, call)])
+        return groups
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                name: {"calls": calls, "avg_ms": total / calls, "max_ms": worst}
+                for name, (calls, total, worst) in self.timings.items()
+            }
+
+    def _run_group(self, group: list[tuple[int, dict]]) -> list[ToolMessage]:
+        return [self._run(call) for _, call in group]
+
+    async def _arun_group(self, group: list[tuple[int, dict]]) -> list[ToolMessage]:
+        return [await self._arun(call) for _, call in group]
+
+    def _run(self, call: dict) -> ToolMessage:
+        start = time.perf_counter()
+        try:
+            message = self._tool(call).invoke({**call, "type": "tool_call"})
+        except Exception as e:
+            message = self._error(call, e)
+        return self._timed(call, message, start)
+
+    async def _arun(self, call: dict) -> ToolMessage:
+        start = time.perf_counter()
+        try:
+            message = await self._tool(call).ainvoke({**call, "type": "tool_call"})
+        except Exception as e:
+            message = self._error(call, e)
+        return self._timed(call, message, start)
+
+    def _tool(self, call: dict):
+        if call["name"] not in self.tools:
+            raise ValueError(f"{call['name']} is not a valid tool, try one of [{', '.join(self.tools)}].")
+        return self.tools[call["name"]]
+
+    @staticmethod
+    def _error(call: dict, error: Exception) -> ToolMessage:
+        return ToolMessage(
+            content=f"Error: {error!r}\n Please fix your mistakes.",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _timed(self, call: dict, message: ToolMessage, start: float) -> ToolMessage:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        message.response_metadata = {**message.response_metadata, "elapsed_ms": round(elapsed_ms, 3)}
+        with self._lock:
+            timing = self.timings.setdefault(call["name"], [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed_ms
+            timing[2] = max(timing[2], elapsed_ms)
+        return message
+
+    @staticmethod
+    def _tool_calls(state: State) -> list[dict]:
+        last_message = state["messages"][-1]
+        return last_message.tool_calls if isinstance(last_message, AIMessage) else []
+
+    @staticmethod
+    def _ordered(groups: list, results: list) -> list[ToolMessage]:
+        positioned = [
+            (position, message)
+            for group, messages in zip(groups, results)
+            for (position, _), message in zip(group, messages)
+        ]
+        return [message for _, message in sorted(positioned, key=lambda item: item[0])]
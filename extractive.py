@@ -0,0 +1,137 @@
+import re
+import zlib
+import numpy as np
+from simple_model import Case
+
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Cue words marking sentences that state a root cause or a fix
+CAUSE_WORDS = frozenset("cause caused causing because due correlate discovered found confirmed deadlock".split())
+FIX_WORDS = frozenset("fix fixed fixes deployed implemented workaround resolved resolution".split())
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or that the their
+this to was were when which while will with we our no not so than then there these they
+""".split())
+
+
+class ExtractiveSummarizer:
+    """Offline TextRank summary of a case built from its comments and change history.
+
+    Sentences are embedded as hashed term-frequency vectors in one (n, dim) NumPy
+    matrix. TextRank runs power iteration over the cosine-similarity graph
+    S = X X^T without ever forming S: every step is two (n, dim) matrix-vector
+    products, so a 10k-comment case ranks in well under a second. No model is called.
+    """
+
+    def __init__(self, dim: int = 256, damping: float = 0.85, iterations: int = 30, tolerance: float = 1e-4,
+                 max_sentences: int = 5, redundancy: float = 0.7):
+        self.dim = dim
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+        self.max_sentences = max_sentences
+        self.redundancy = redundancy
+
+    def summarize(self, case: Case) -> str:
+        sentences, authors = [], []
+        for comment in case.comments:
+            for sentence in SENTENCE_SPLIT.split(comment.content.strip()):
+                if sentence:
+                    sentences.append(sentence)
+                    authors.append(comment.author)
+
+        lines = []
+        participants = list(dict.fromkeys(comment.author for comment in case.comments))
+        if participants:
+            lines.append(f"Participants: {', '.join(participants)}")
+        lines.extend(self._history(case))
+        if not sentences:
+            return "\n".join(lines) or "No comments to summarize."
+
+        matrix, cause_cues, fix_cues = self._embed(sentences)
+        order = np.argsort(-self.rank(matrix))
+
+        cause = self._best(order, cause_cues)
+        fix = self._best(order, fix_cues)
+        if cause is not None:
+            lines.append(f"Root cause: {sentences[cause]} ({authors[cause]})")
+        if fix is not None and fix != cause:
+            lines.append(f"Fix: {sentences[fix]} ({authors[fix]})")
+
+        chosen = []
+        for index in order:
+            if len(chosen) >= self.max_sentences:
+                break
+            if index in (cause, fix):
+                continue
+            if chosen and float(np.max(matrix[chosen] @ matrix[index])) > self.redundancy:
+                continue
+            chosen.append(int(index))
+        if chosen:
+            lines.append("Key points:")
+            lines.extend(f"- {authors[i]}: {sentences[i]}" for i in sorted(chosen))
+        return "\n".join(lines)
+
+    def rank(self, matrix: np.ndarray) -> np.ndarray:
+        """TextRank scores for L2-normalised sentence rows, via implicit S = X X^T minus self-loops."""
+        n = len(matrix)
+        if n == 1:
+            return np.ones(1, dtype=np.float32)
+        self_similarity = np.einsum("ij,ij->i", matrix, matrix)
+        degree = matrix @ matrix.sum(axis=0) - self_similarity
+        degree[degree <= 0] = 1.0
+        scores = np.full(n, 1.0 / n, dtype=np.float32)
+        for _ in range(self.iterations):
+            share = scores / degree
+            spread = matrix @ (matrix.T @ share) - self_similarity * share
+            updated = (1.0 - self.damping) / n + self.damping * spread
+            if np.abs(updated - scores).sum() < self.tolerance:
+                scores = updated
+                break
+            scores = updated
+        return scores
+
+    def _embed(self, sentences: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(L2-normalised TF-IDF rows, root-cause cue flags, fix cue flags) per sentence."""
+        lengths, words, cause_cues, fix_cues = [], [], [], []
+        for sentence in sentences:
+            tokens = WORD_PATTERN.findall(sentence.lower())
+            lengths.append(len(tokens))
+            words.extend(tokens)
+            cause_cues.append(not CAUSE_WORDS.isdisjoint(tokens))
+            fix_cues.append(not FIX_WORDS.isdisjoint(tokens))
+        # One crc32 per distinct word in this case; stopwords map to -1 and are dropped below
+        buckets = {word: -1 if word in STOPWORDS else zlib.crc32(word.encode()) % self.dim for word in set(words)}
+        n = len(sentences)
+        rows = np.repeat(np.arange(n), lengths)
+        cols = np.fromiter(map(buckets.__getitem__, words), dtype=np.int64, count=len(words))
+        keep = cols >= 0
+        counts = np.zeros((n, self.dim), dtype=np.float32)
+        np.add.at(counts, (rows[keep], cols[keep]), 1.0)
+        # Unsigned buckets keep every similarity non-negative, as TextRank needs
+        matrix = np.log1p(counts)
+        matrix *= (np.log((1.0 + n) / (1.0 + np.count_nonzero(counts, axis=0))) + 1.0).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms, np.array(cause_cues), np.array(fix_cues)
+
+    @staticmethod
+    def _best(order: np.ndarray, cues: np.ndarray) -> int | None:
+        """Highest-ranked sentence with a cue word."""
+        ranked = order[cues[order]]
+        return int(ranked[0]) if len(ranked) else None
+
+    @staticmethod
+    def _history(case: Case) -> list[str]:
+        """One line per field that changed, with its values in order."""
+        trails: dict[str, list[str]] = {}
+        for change in sorted(case.change_history, key=lambda change: change.changed_at):
+            if change.field == "comments":
+                continue
+            trail = trails.setdefault(change.field, [])
+            if not trail and change.old_value is not None:
+                trail.append(change.old_value)
+            if change.new_value is not None and (not trail or trail[-1] != change.new_value):
+                trail.append(change.new_value)
+        return [f"{field.capitalize()} history: {' -> '.join(trail)}" for field, trail in trails.items()]
@@ -0,0 +1,126 @@
+import json
+import threading
+from collections import OrderedDict
+from langchain_core.messages import AIMessage, ToolMessage
+from agent_utils import State
+
+
+# Tool -> {argument: case field} for calls that set a field, used to spot oscillation
+FIELD_ARGS = {
+    "change_case_state": {"state": "state"},
+    "change_case_component": {"component": "component"},
+    "change_case_assignee": {"assignee_id": "assignee"},
+    "change_case_priority": {"priority": "priority"},
+    "update_case": {"state": "state", "component": "component", "assignee_id": "assignee", "priority": "priority"},
+}
+
+
+def field_value(case, field: str) -> str:
+    """A case field as the tools take it: the enum value, or the assignee's id."""
+    value = getattr(case, field)
+    return value.id if field == "assignee" else value.value
+
+
+class RunTrace:
+    """What one run has done so far: call fingerprints and the values set per (case, field)."""
+
+    def __init__(self):
+        self.turns = 0
+        self.calls: dict[str, int] = {}
+        self.values: dict[tuple[str, str], list[str]] = {}
+
+
+class LoopGuard:
+    """Graph node between the agent and the tools that stops runs going in circles.
+
+    Each tool call is fingerprinted by name and canonical arguments. A run is
+    stopped when a call is repeated more than `max_repeats` times, when a case
+    field is set back to a value it already had earlier in the run (state
+    new -> in_progress -> new), or after `max_turns` tool-calling turns. With a
+    `store`, a field's history starts from the case's stored value the first
+    time the run touches it, so setting it away and straight back is caught. Each
+    check is a dict lookup per call, against a trace kept per run (keyed by the
+    id of the run's first message; the last `max_runs` are kept).
+
+    A stopped run gets a skipped result for each pending call, so every tool
+    call keeps its ToolMessage, and a final AIMessage; state["stop_reason"] says
+    why. stats() counts checks and stops by reason.
+    """
+
+    def __init__(self, store=None, max_repeats: int = 1, max_turns: int = 8, max_runs: int = 1024):
+        self.store = store
+        self.max_repeats = max_repeats
+        self.max_turns = max_turns
+        self.max_runs = max_runs
+        self._runs: OrderedDict[str, RunTrace] = OrderedDict()
+        self._lock = threading.Lock()
+        self.turns_checked = 0
+        self.stopped: dict[str, int] = {}
+
+    def __call__(self, state: State) -> State:
+        last_message = state["messages"][-1]
+        if not isinstance(last_message, AIMessage) or not last_message.tool_calls:
+            return {}
+        with self._lock:
+            trace = self._trace(state["messages"][0].id)
+            reason = self.check(trace, last_message.tool_calls)
+            self.turns_checked += 1
+            if reason is not None:
+                self.stopped[reason["reason"]] = self.stopped.get(reason["reason"], 0) + 1
+        if reason is None:
+            return {}
+        skipped = [
+            ToolMessage(content=f"Skipped: {reason['detail']}", name=call["name"], tool_call_id=call["id"], status="error")
+            for call in last_message.tool_calls
+        ]
+        final = AIMessage(content=f"Stopped the run ({reason['reason']}): {reason['detail']}")
+        return {"messages": skipped + [final], "stop_reason": reason}
+
+    def check(self, trace: RunTrace, tool_calls: list[dict]) -> dict | None:
+        """Record one turn's calls in the trace; the reason to stop, if any."""
+        trace.turns += 1
+        if trace.turns > self.max_turns:
+            return {"reason": "turn_limit", "turn": trace.turns, "detail": f"more than {self.max_turns} tool-calling turns"}
+        for call in tool_calls:
+            fingerprint = f"{call['name']}:{json.dumps(call['args'], sort_keys=True)}"
+            count = trace.calls.get(fingerprint, 0) + 1
+            trace.calls[fingerprint] = count
+            if count > self.max_repeats + 1:
+                return {
+                    "reason": "repeat", "turn": trace.turns, "tool": call["name"], "args": call["args"],
+                    "detail": f"{call['name']} called {count} times with the same arguments",
+                }
+            case_id = call["args"].get("case_id")
+            for arg, field in FIELD_ARGS.get(call["name"], {}).items():
+                value = call["args"].get(arg)
+                if value is None:
+                    continue
+                history = trace.values.get((case_id, field))
+                if history is None:
+                    history = trace.values[(case_id, field)] = self._starting_values(case_id, field)
+                if history and history[-1] != value and value in history:
+                    return {
+                        "reason": "oscillation", "turn": trace.turns, "tool": call["name"], "case_id": case_id,
+                        "field": field, "values": history + [value],
+                        "detail": f"{field} of {case_id} set back to {value} ({' -> '.join(history + [value])})",
+                    }
+                history.append(value)
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"turns_checked": self.turns_checked, "stopped": dict(self.stopped), "runs_tracked": len(self._runs)}
+
+    def _starting_values(self, case_id: str | None, field: str) -> list[str]:
+        case = self.store.get(case_id) if self.store is not None and case_id is not None else None
+        return [] if case is None else [field_value(case, field)]
+
+    def _trace(self, run_id: str) -> RunTrace:
+        trace = self._runs.get(run_id)
+        if trace is None:
+            trace = self._runs[run_id] = RunTrace()
+            if len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+        else:
+            self._runs.move_to_end(run_id)
+        return trace
@@ -0,0 +1,309 @@
+"""Stream new cases from a JSONL file (or stdin) into the triage pipeline.
+
+Each line is either a full Case or a new request with at least id, title and
+description (request_id and body are accepted for those); missing fields get
+new-case defaults. Valid cases are stored and queued for the triage workers
+in batches, and the reader waits whenever the queue is full. Lines that don't
+validate go to the dead-letter file with the reason.
+
+    CHAT_MODEL=scripted python ingest.py incoming.jsonl --dead-letter rejected.jsonl
+    tail -f incoming.jsonl | python ingest.py - --workers 8
+    python ingest.py incoming.jsonl --follow --sla
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from pydantic import ValidationError
+from simple_model import Assignee, Case
+
+
+def read_lines(source: str, follow: bool = False, poll_interval: float = 0.5, stop: threading.Event | None = None):
+    """Yield (line number, line) from a file, or stdin for "-", one line at a time.
+
+    With follow, keep reading as the file grows (like tail -f) until stop is
+    set, and yield (line number, None) whenever the reader catches up, so the
+    consumer can flush a partial batch. stdin is always read that way, since a
+    pipe can go quiet without closing. Blank lines are skipped.
+    """
+    if source == "-":
+        yield from read_stdin(poll_interval, stop)
+        return
+    stream = open(source, encoding="utf-8")
+    number = 0
+    pending = ""
+    try:
+        while stop is None or not stop.is_set():
+            line = stream.readline()
+            if not line:
+                if not follow:
+                    break
+                yield number, None
+                time.sleep(poll_interval)
+                continue
+            # A writer may be mid-line; hold the fragment until its newline arrives
+            if follow and not line.endswith("\n"):
+                pending += line
+                continue
+            line, pending = pending + line, ""
+            number += 1
+            if line.strip():
+                yield number, line
+        if pending.strip():
+            yield number + 1, pending
+    finally:
+        stream.close()
+
+
+def read_stdin(poll_interval: float = 0.5, stop: threading.Event | None = None, buffered: int = 1000):
+    """read_lines() for stdin: a thread reads the lines, and (line number, None) is yielded after each quiet poll_interval."""
+    lines = queue.Queue(maxsize=buffered)
+
+    def pump():
+        for line in iter(sys.stdin.readline, ""):
+            lines.put(line)
+        lines.put(None)
+
+    threading.Thread(target=pump, name="stdin-reader", daemon=True).start()
+    number = 0
+    while stop is None or not stop.is_set():
+        try:
+            line = lines.get(timeout=poll_interval)
+        except queue.Empty:
+            yield number, None
+            continue
+        if line is None:
+            break
+        number += 1
+        if line.strip():
+            yield number, line
+
+
+def new_case_fields(record: dict, default_assignee: Assignee | None = None) -> dict:
+    """Fill in what a new request leaves out: state new, priority medium, component other, timestamps now."""
+    now = datetime.now()
+    fields = {"state": "new", "priority": "medium", "component": "other", "created_at": now, "updated_at": now}
+    if default_assignee is not None:
+        fields["assignee"] = default_assignee
+    fields.update(record)
+    if "id" not in fields and "request_id" in fields:
+        fields["id"] = fields.pop("request_id")
+    if "description" not in fields and "body" in fields:
+        fields["description"] = fields.pop("body")
+    return fields
+
+
+def parse_case(line: str, default_assignee: Assignee | None = None) -> Case:
+    """A Case from one JSONL line: validated straight from JSON, or built from a new-request record."""
+    try:
+        return Case.model_validate_json(line)
+    except ValidationError as full_error:
+        record = json.loads(line)
+        if not isinstance(record, dict) or "state" in record or "assignee" in record:
+            raise full_error
+        return Case.model_validate(new_case_fields(record, default_assignee))
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'record'}: {e['msg']}" for e in error.errors())
+    return f"{type(error).__name__}: {error}"
+
+
+class CaseIngestor:
+    """Validates JSONL lines into cases in batches, stores them and queues them for triage.
+
+    Every `batch_size` lines (or when a followed file goes quiet) the batch is
+    parsed, its valid cases are written to `store` in one batch() and put on
+    `case_queue` (a work_queue.CaseQueue). put() blocks while the queue is full,
+    which stalls reading, so memory stays bounded by the batch and the queue.
+    With `put_timeout`, a case that still can't be queued is taken back out of
+    the store and dead-lettered, so replaying its line ingests it again. A case
+    whose id is already stored is skipped and counted as a duplicate, so
+    re-reading a file after a restart neither resets cases the agents already
+    triaged nor queues them again. Rejected lines are appended to `dead_letter`
+    as JSON with their line number, reason and raw text. Each callback in
+    `on_added` gets every stored case before it is queued, and each callback in
+    `on_removed` gets the id of one taken back out, to undo what `on_added` did.
+    Every `report_every` seconds `on_report` gets stats().
+    """
+
+    def __init__(self, store, case_queue, batch_size: int = 200, dead_letter: str | None = None,
+                 default_assignee: Assignee | None = None, put_timeout: float | None = None,
+                 on_added=(), on_removed=(), report_every: float = 5.0, on_report=None):
+        self.store = store
+        self.queue = case_queue
+        self.batch_size = batch_size
+        self.dead_letter = dead_letter
+        self.default_assignee = default_assignee
+        self.put_timeout = put_timeout
+        self.on_added = list(on_added)
+        self.on_removed = list(on_removed)
+        self.report_every = report_every
+        self.on_report = on_report
+        self.lines = 0
+        self.ingested = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.started = None
+        self._last_report = (0.0, 0, 0)
+
+    def ingest(self, lines) -> dict:
+        """Consume (line number, line) pairs such as read_lines() yields; the final stats()."""
+        self.started = time.perf_counter()
+        self._last_report = (self.started, 0, 0)
+        batch = []
+        for number, line in lines:
+            if line is not None:
+                batch.append((number, line))
+            if len(batch) >= self.batch_size or (line is None and batch):
+                self.flush(batch)
+                batch = []
+            self._maybe_report()
+        if batch:
+            self.flush(batch)
+        if self.on_report is not None:
+            self.on_report(self.stats())
+        return self.stats()
+
+    def flush(self, batch: list[tuple[int, str]]):
+        parsed, rejects = [], []
+        for number, line in batch:
+            try:
+                parsed.append((number, line, parse_case(line, self.default_assignee)))
+            except (ValidationError, ValueError) as e:
+                rejects.append({"line": number, "error": describe_error(e), "raw": line.rstrip("\n")})
+        self.lines += len(batch)
+        # Never overwrite a stored case: after a restart the file is read from the top
+        # again, and those cases may already be triaged
+        new, seen = [], set()
+        for number, line, case in parsed:
+            if case.id in seen or case.id in self.store:
+                self.duplicates += 1
+            else:
+                seen.add(case.id)
+                new.append((number, line, case))
+        if new:
+            with self.store.batch():
+                self.store.add_cases([case for _, _, case in new])
+            # Indexed, flagged and timed before a worker can pick the case up
+            for _, _, case in new:
+                for callback in self.on_added:
+                    callback(case)
+            for number, line, case in new:
+                try:
+                    if self.queue.put(case, timeout=self.put_timeout):
+                        self.ingested += 1
+                    else:
+                        self.duplicates += 1
+                except queue.Full:
+                    # Unstore it too, or the duplicate check would skip it when the line is replayed
+                    self.store.remove_case(case.id)
+                    for callback in self.on_removed:
+                        callback(case.id)
+                    rejects.append({"line": number, "case_id": case.id, "error": "triage queue full",
+                                    "raw": line.rstrip("\n")})
+        if rejects:
+            self.rejected += len(rejects)
+            if self.dead_letter is not None:
+                with open(self.dead_letter, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(reject) + "\n" for reject in rejects)
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started if self.started is not None else 0.0
+        return {
+            "lines": self.lines,
+            "ingested": self.ingested,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "elapsed": elapsed,
+            "lines_per_second": self.lines / elapsed if elapsed else 0.0,
+            "cases_per_second": self.ingested / elapsed if elapsed else 0.0,
+            "queue_depth": len(self.queue),
+        }
+
+    def _maybe_report(self):
+        now = time.perf_counter()
+        last_time, last_lines, last_ingested = self._last_report
+        if self.on_report is None or now - last_time < self.report_every:
+            return
+        stats = self.stats()
+        stats["recent_lines_per_second"] = (self.lines - last_lines) / (now - last_time)
+        stats["recent_cases_per_second"] = (self.ingested - last_ingested) / (now - last_time)
+        self._last_report = (now, self.lines, self.ingested)
+        self.on_report(stats)
+
+
+def print_report(stats: dict):
+    print(f"ingest: {stats['lines']} lines ({stats['lines_per_second']:.0f}/s), "
+          f"{stats['ingested']} cases queued ({stats['cases_per_second']:.0f}/s), "
+          f"{stats['duplicates']} duplicates skipped, {stats['rejected']} dead-lettered, queue depth {stats['queue_depth']}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream cases from JSONL into the triage workers.")
+    parser.add_argument("source", help='JSONL file, or "-" for stdin')
+    parser.add_argument("--follow", action="store_true", help="keep reading as the file grows")
+    parser.add_argument("--dead-letter", default="dead_letter.jsonl")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--report-every", type=float, default=5.0)
+    parser.add_argument("--sla", action="store_true", help="escalate stored and ingested cases that breach their SLA")
+    parser.add_argument("--sla-tick", type=float, default=60.0, help="seconds between SLA checks")
+    args = parser.parse_args()
+
+    from tools_and_resources import (
+        case_store, search_index, duplicate_index, support_agent, save_case, save_listeners, case_lock,
+        duplicates_on_arrival, ALL_TOOLS
+    )
+    from agent_graph import build_graph, make_chat_model
+    from work_queue import CaseQueue, CaseWorkerPool, graph_handler
+
+    def index_case(case: Case):
+        if search_index.built:
+            search_index.upsert(case)
+
+    def flag_duplicates(case: Case):
+        matches = duplicates_on_arrival(case)
+        if matches:
+            match_id, similarity = matches[0]
+            print(f"duplicate: {case.id} looks like {match_id} (similarity {similarity:.2f})", flush=True)
+
+    on_added = [index_case, flag_duplicates]
+    on_removed = [search_index.remove, duplicate_index.remove]
+    scheduler = None
+    if args.sla:
+        from sla import SLAScheduler
+        from bulk import store_cases
+        scheduler = SLAScheduler(case_store, save_case, tick=args.sla_tick, lock_for=case_lock, on_escalate=[
+            lambda case, old, new: print(f"sla: {case.id} breached its {old.value} SLA, now {new.value}", flush=True)
+        ])
+        # Re-time a case whenever a tool saves it, and time every case already stored or ingested
+        save_listeners.append(scheduler.track)
+        on_added.append(scheduler.track)
+        on_removed.append(scheduler.untrack)
+        scheduler.track_all(store_cases(case_store))
+        scheduler.start()
+
+    graph = build_graph(make_chat_model(ALL_TOOLS), ALL_TOOLS, verbose=False)
+    case_queue = CaseQueue(maxsize=args.queue_size)
+    pool = CaseWorkerPool(case_queue, graph_handler(graph, case_store), workers=args.workers).start()
+    ingestor = CaseIngestor(case_store, case_queue, args.batch_size, args.dead_letter, default_assignee=support_agent,
+                            on_added=on_added, on_removed=on_removed, report_every=args.report_every, on_report=print_report)
+    try:
+        ingestor.ingest(read_lines(args.source, follow=args.follow))
+    except KeyboardInterrupt:
+        pass
+    pool.stop()
+    print(pool.stats())
+    if scheduler is not None:
+        scheduler.stop()
+        print(scheduler.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pydantic import TypeAdapter
+from simple_model import Case, Comment, Change
+from store import CaseStore
+
+
+# Snapshot layout: fixed header, the cases' JSON payloads back to back, then a
+# JSON index of [case_id, offset, length, n_comments, n_changes, *index_keys].
+SNAPSHOT_MAGIC = b"CASESNP1"
+SNAPSHOT_HEADER = struct.Struct("<8sQQQQ")  # magic, last_seq, count, index_offset, index_length
+SNAPSHOT_PATTERN = "snapshot-*.bin"
+LOG_NAME = "changes.log"
+
+
+# Case fields held in their own lists; everything else is a scalar field
+LIST_FIELDS = {"comments", "change_history"}
+
+
+def scalar_fields(case: Case) -> dict:
+    return case.model_dump(mode="json", exclude=LIST_FIELDS)
+
+
+def fields_digest(fields: dict) -> bytes:
+    return hashlib.blake2b(json.dumps(fields, sort_keys=True).encode(), digest_size=16).digest()
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(field: str) -> TypeAdapter:
+    return TypeAdapter(Case.model_fields[field].annotation)
+
+
+class SnapshotReader:
+    """Memory-mapped view of one snapshot file.
+
+    Opening it only parses the header and the index; a case's payload is
+    decoded into a Case the first time the store asks for it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.last_seq, self.count, index_offset, index_length = SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a case snapshot: {path}")
+        self.entries = json.loads(self._mmap[index_offset:index_offset + index_length])
+        self._offsets = {entry[0]: (entry[1], entry[2]) for entry in self.entries}
+
+    def raw(self, case_id: str) -> bytes:
+        offset, length = self._offsets[case_id]
+        return self._mmap[offset:offset + length]
+
+    def load(self, case_id: str) -> Case:
+        return Case.model_validate_json(self.raw(case_id))
+
+
+class CaseJournal:
+    """Periodic binary snapshots of a CaseStore plus an append-only log of its writes.
+
+    Every save() logs the Change records the tools appended to case.change_history
+    since the last save, together with the new field value they describe, and any
+    new comments. If the scalar fields still differ from what the log last
+    recorded (say updated_at, which no Change names), all of them are logged in
+    one more record, so an in-place edit is never lost. Once snapshot_every
+    records have piled up the whole store is written to a new snapshot and the
+    log starts over. Recovery memory-maps the
+    latest snapshot, files its cases lazily and replays only the log tail, so
+    startup cost follows recent activity rather than total history.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 10000, fsync: bool = False):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.store: CaseStore | None = None
+        self.seq = 0
+        self.records_since_snapshot = 0
+        # case_id -> (n_comments, n_changes) already covered by the snapshot or the log
+        self._marks: dict[str, tuple[int, int]] = {}
+        # case_id -> fields_digest() of the scalar fields the log last recorded
+        self._fields: dict[str, bytes] = {}
+        self._lock = threading.RLock()
+        self._log = None
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def open(cls, directory: str, snapshot_every: int = 10000, fsync: bool = False) -> CaseStore:
+        """Recover a CaseStore from `directory` and attach a journal that keeps logging to it."""
+        journal = cls(directory, snapshot_every=snapshot_every, fsync=fsync)
+        store = CaseStore()
+
+        reader = journal._latest_snapshot()
+        if reader is not None:
+            journal.seq = reader.last_seq
+            for case_id, _, _, n_comments, n_changes, *index_keys in reader.entries:
+                store.add_lazy(case_id, index_keys, reader)
+                journal._marks[case_id] = (n_comments, n_changes)
+
+        journal._replay(store)
+        journal.attach(store)
+        return store
+
+    def attach(self, store: CaseStore):
+        self.store = store
+        store.journal = self
+        self._log = open(self._log_path, "ab")
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if self.store is not None:
+                self.store.journal = None
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, LOG_NAME)
+
+    # Write path, called by CaseStore
+    def record_put(self, case: Case):
+        with self._lock:
+            record = case.model_dump(mode="json")
+            self._append({"op": "put", "case_id": case.id, "case": record})
+            self._marks[case.id] = (len(case.comments), len(case.change_history))
+            self._fields[case.id] = fields_digest({k: v for k, v in record.items() if k not in LIST_FIELDS})
+            self._maybe_snapshot()
+
+    def record_remove(self, case_id: str):
+        with self._lock:
+            self._append({"op": "remove", "case_id": case_id})
+            self._marks.pop(case_id, None)
+            self._fields.pop(case_id, None)
+            self._maybe_snapshot()
+
+    def record_save(self, case: Case):
+        with self._lock:
+            n_comments, n_changes = self._marks.get(case.id, (0, 0))
+            if len(case.comments) < n_comments or len(case.change_history) < n_changes:
+                # History was rewritten rather than appended to; log the whole case
+                self.record_put(case)
+                return
+            for comment in case.comments[n_comments:]:
+                self._append({"op": "comment", "case_id": case.id, "comment": comment.model_dump(mode="json")})
+            for change in case.change_history[n_changes:]:
+                record = {"op": "change", "case_id": case.id, "change": change.model_dump(mode="json")}
+                if change.field in Case.model_fields and change.field not in LIST_FIELDS:
+                    record["value"] = case.model_dump(mode="json", include={change.field})[change.field]
+                self._append(record)
+            self._marks[case.id] = (len(case.comments), len(case.change_history))
+            fields = scalar_fields(case)
+            digest = fields_digest(fields)
+            if self._fields.get(case.id) != digest:
+                self._append({"op": "fields", "case_id": case.id, "fields": fields})
+                self._fields[case.id] = digest
+            self._maybe_snapshot()
+
+    def _append(self, record: dict):
+        self.seq += 1
+        record["seq"] = self.seq
+        self._log.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.records_since_snapshot += 1
+
+    def _maybe_snapshot(self):
+        # Only between whole writes: a snapshot taken partway through a save would
+        # already hold the case while the rest of that save's records land after it
+        if self.records_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    @contextmanager
+    def suspended(self):
+        """Skip logging writes inside the block, then snapshot the store once.
+
+        For bulk loads: logging every put would write each case twice and
+        rewrite the whole store every snapshot_every records. A crash inside
+        the block loses the writes made in it.
+        """
+        store = self.store
+        with store._lock:
+            store.journal = None
+        try:
+            yield self
+        finally:
+            with store._lock:
+                self.snapshot()
+                store.journal = self
+
+    # Snapshots
+    def snapshot(self) -> str:
+        """Write the whole store to a new snapshot file and truncate the log.
+
+        Takes the store's lock before the journal's, the order every write
+        takes them in, so no write is half-way through while the store is copied.
+        """
+        store = self.store
+        with store._lock, self._lock:
+            path = os.path.join(self.directory, f"snapshot-{self.seq:020d}.bin")
+            tmp_path = path + ".tmp"
+            entries = []
+            with open(tmp_path, "wb") as f:
+                f.write(b"\0" * SNAPSHOT_HEADER.size)
+                offset = SNAPSHOT_HEADER.size
+                for case_id in store:
+                    reader = store._lazy.get(case_id)
+                    if reader is not None:
+                        # Never decoded since recovery: copy the payload bytes as they are
+                        payload = reader.raw(case_id)
+                        n_comments, n_changes = self._marks.get(case_id, (0, 0))
+                    else:
+                        case = store.cases[case_id]
+                        payload = case.model_dump_json().encode()
+                        # The payload holds everything, logged or not (see suspended())
+                        n_comments, n_changes = self._marks[case_id] = (len(case.comments), len(case.change_history))
+                        self._fields[case_id] = fields_digest(scalar_fields(case))
+                    f.write(payload)
+                    entries.append([case_id, offset, len(payload), n_comments, n_changes, *store.index_keys(case_id)])
+                    offset += len(payload)
+                index = json.dumps(entries, separators=(",", ":")).encode()
+                f.write(index)
+                f.seek(0)
+                f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, self.seq, len(entries), offset, len(index)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+            # Records up to self.seq are in the snapshot now; replay skips them even if
+            # we crash before the truncate below.
+            self._log.close()
+            self._log = open(self._log_path, "wb")
+            self.records_since_snapshot = 0
+            for old in glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)):
+                if old != path:
+                    os.remove(old)
+            return path
+
+    # Recovery
+    def _latest_snapshot(self) -> SnapshotReader | None:
+        paths = sorted(glob.glob(os.path.join(self.directory, SNAPSHOT_PATTERN)))
+        return SnapshotReader(paths[-1]) if paths else None
+
+    def _replay(self, store: CaseStore):
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write at the tail from a crash mid-append
+                    break
+                if record["seq"] <= self.seq:
+                    continue
+                self.seq = record["seq"]
+                self.records_since_snapshot += 1
+                self._apply(store, record)
+
+    def _apply(self, store: CaseStore, record: dict):
+        case_id = record["case_id"]
+        op = record["op"]
+        if op == "put":
+            case = Case.model_validate(record["case"])
+            store.add_case(case)
+            self._marks[case_id] = (len(case.comments), len(case.change_history))
+            self._fields[case_id] = fields_digest(scalar_fields(case))
+            return
+        if op == "remove":
+            store.remove_case(case_id)
+            self._marks.pop(case_id, None)
+            self._fields.pop(case_id, None)
+            return
+
+        case = store.get_case(case_id)
+        if case is None:
+            return
+        if op == "comment":
+            case.comments.append(Comment.model_validate(record["comment"]))
+        elif op == "change":
+            change = Change.model_validate(record["change"])
+            if "value" in record:
+                setattr(case, change.field, _field_adapter(change.field).validate_python(record["value"]))
+            case.change_history.append(change)
+        elif op == "fields":
+            for field, value in record["fields"].items():
+                setattr(case, field, _field_adapter(field).validate_python(value))
+            self._fields[case_id] = fields_digest(record["fields"])
+        store.save(case)
+        self._marks[case_id] = (len(case.comments), len(case.change_history))
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access);
+"""
+SELECT_RESPONSE = "SELECT value FROM responses WHERE key = ?"
+TOUCH_RESPONSE = "UPDATE responses SET last_access = ? WHERE key = ?"
+INSERT_RESPONSE = "INSERT OR REPLACE INTO responses (key, value, size, last_access) VALUES (?, ?, ?, ?)"
+TOTAL_SIZE = "SELECT COALESCE(SUM(size), 0) FROM responses"
+SELECT_SIZE = "SELECT size FROM responses WHERE key = ?"
+OLDEST = "SELECT key, size FROM responses WHERE key != ? ORDER BY last_access LIMIT ?"
+DELETE_RESPONSE = "DELETE FROM responses WHERE key = ?"
+
+# Set in the response_metadata of responses served from the cache
+CACHE_HIT_FLAG = "llm_cache_hit"
+# Message fields that differ between otherwise identical conversations
+VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def canonical_messages(messages: list) -> list[dict]:
+    """Serialized messages with run-specific ids and provider metadata stripped."""
+    canonical = []
+    for message in messages:
+        data = dict(message_to_dict(message)["data"])
+        for field in VOLATILE_FIELDS:
+            data.pop(field, None)
+        canonical.append({"type": message.type, "data": data})
+    return canonical
+
+
+class CachedChatModel:
+    """Exact-match response cache in front of a chat model, stored in SQLite.
+
+    The key is a SHA-256 of the model name, the bound tool schemas and the
+    canonical serialized messages, so re-running triage on an unchanged case or
+    replaying a scenario returns the stored completion instead of calling the
+    provider. Entries are evicted least-recently-used once the stored responses
+    exceed max_bytes. Set bypass (or LLM_CACHE_BYPASS=1) to always call the model
+    and leave the cache untouched. A replayed response carries its stored
+    usage_metadata and has response_metadata[CACHE_HIT_FLAG] set, so usage
+    accounting can tell it from a fresh completion.
+    """
+
+    def __init__(self, model, path: str, model_name: str, tools=(), max_bytes: int = 256 * 2**20,
+                 bypass: bool | None = None):
+        self.model = model
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = os.environ.get("LLM_CACHE_BYPASS") == "1" if bypass is None else bypass
+        self._prefix = json.dumps(
+            {"model": model_name, "tools": [convert_to_openai_tool(t) for t in tools]},
+            sort_keys=True, separators=(",", ":"),
+        )
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute(TOTAL_SIZE).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, messages: list) -> str:
+        payload = self._prefix + json.dumps(canonical_messages(messages), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def invoke(self, messages: list, **kwargs):
+        if self.bypass:
+            return self.model.invoke(messages, **kwargs)
+        key = self.key(messages)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = self.model.invoke(messages, **kwargs)
+        self._put(key, response)
+        return response
+
+    async def ainvoke(self, messages: list, **kwargs):
+        if self.bypass:
+            return await self.model.ainvoke(messages, **kwargs)
+        key = self.key(messages)
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        response = await self.model.ainvoke(messages, **kwargs)
+        self._put(key, response)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self._size,
+            "bypass": self.bypass,
+        }
+
+    def _get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(SELECT_RESPONSE, (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(TOUCH_RESPONSE, (time.time(), key))
+            self.hits += 1
+        response = messages_from_dict([json.loads(row[0])])[0]
+        response.response_metadata[CACHE_HIT_FLAG] = True
+        return response
+
+    def _put(self, key: str, response):
+        value = json.dumps(message_to_dict(response)).encode()
+        with self._lock:
+            old = self._conn.execute(SELECT_SIZE, (key,)).fetchone()
+            self._conn.execute(INSERT_RESPONSE, (key, value, len(value), time.time()))
+            self._size += len(value) - (old[0] if old else 0)
+            while self._size > self.max_bytes:
+                victims = self._conn.execute(OLDEST, (key, 64)).fetchall()
+                if not victims:
+                    break
+                for victim, size in victims:
+                    self._conn.execute(DELETE_RESPONSE, (victim,))
+                    self._size -= size
+                    self.evictions += 1
+                    if self._size <= self.max_bytes:
+                        break
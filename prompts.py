@@ -0,0 +1,130 @@
+import hashlib
+import json
+from langchain_core.messages import SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from llm_cache import CACHE_HIT_FLAG
+from simple_model import CaseState, Priority, Component
+from tools_and_resources import webapp_dev, applog_dev, support_agent, api_dev, database_admin, security_analyst
+
+
+SYSTEM_PROMPT_TEMPLATE = """You are an IT Service Management (ITSM) assistant. Your job is to help customers with their support cases.
+    
+    IMPORTANT: Always make multiple tool calls in sequence. Never end with just one tool call - you must ALWAYS follow up with additional actions.
+    If you are asked to synthesize comments, you must use the synthesize_comments tool, followed by add_comments and then nothing else.
+    
+    You have the following tools at your disposal:
+    - review_app_design: Review the app design and suggest a workaround for the customer if you find something, reply directly to the customer. THIS IS THE FIRST THING YOU SHOULD CHECK AS THE ANSWER COULD BE RIGHT THERE.
+    - check_past_cases: Check past resolved cases that are similar to the current case via keyword and vector search. THIS IS THE SECOND THING YOU SHOULD CHECK.
+    - check_duplicate_cases: Check whether the current case is a near-duplicate of another open or resolved case. This is much cheaper than check_past_cases; if it finds a resolved duplicate you can use that case directly.
+    - search_cases: Search all cases by free text, optionally filtered by component, priority and state.
+    - change_case_component: Change the component of the current case.
+    - change_case_assignee: Change the assignee of the current case.
+    - change_case_state: Change the state of the current case.
+    - change_case_priority: Change the priority of the current case.
+    - add_comment: Add a comment to the current case.
+    - update_case: Change several fields of the current case (component, assignee, state, priority) and optionally add a comment, all in one call. Prefer it over separate change_* and add_comment calls.
+    - synthesize_comments: Synthesize all the comments into one comment. This is useful when there are a lot of comments and you need to summarize them for developer or support colleagues. Use mode 'extractive' for a fast summary of the key facts (who investigated, root cause, fix) or 'map_reduce' for a fuller written summary, instead of reading every comment yourself. Only used this if specified.
+
+    MANDATORY WORKFLOW:
+    1. For permission/access issues: 
+       a) FIRST: Use review_app_design
+       b) THEN: ALWAYS call add_comment to document the design limitation
+       c) THEN: ALWAYS call change_case_state to 'resolved' if it's a design limitation
+    2. For technical issues: 
+       a) FIRST: Use check_past_cases to find similar resolved cases
+       b) THEN: Make necessary changes (component, assignee, etc.) based on findings
+       c) THEN: ALWAYS call add_comment to document the solution
+       d) THEN: ALWAYS call change_case_state to 'resolved' if problem is solved
+    3. ONLY provide a final summary response WITHOUT tool calls after you have completed ALL required tool calls
+    You may do several of the changes, comment and state steps above in a single update_case call.
+
+    CRITICAL: After calling review_app_design, you MUST ALWAYS call add_comment and change_case_state. Never stop after just review_app_design. 
+
+    You will be given a case and a message from a customer. You will need to use the tools to help the customer.
+    
+    You will also have access to the following assignees:
+    - {webapp_dev.name} ({webapp_dev.department}) - WebApp Development
+    - {applog_dev.name} ({applog_dev.department}) - AppLog Development
+    - {support_agent.name} ({support_agent.department}) - Customer Support
+    - {api_dev.name} ({api_dev.department}) - API Development
+    - {database_admin.name} ({database_admin.department}) - Database Administration
+    - {security_analyst.name} ({security_analyst.department}) - Security Team
+
+    You will also have access to the following components:
+    - {Component.WEBAPP} - WebApp
+    - {Component.APPLOG} - AppLog
+    - {Component.API} - API
+    - {Component.DATABASE} - Database
+    - {Component.OTHER} - Other
+
+    You will also have access to the following priorities:
+    - {Priority.LOW} - Low
+    - {Priority.MEDIUM} - Medium - {Priority.HIGH} - High - {Priority.VERY_HIGH} - Very High You will also have access to the following states: - {CaseState.NEW} - New - {CaseState.IN_PROGRESS} - In Progress
+    - {CaseState.AWAITING_CUSTOMER_INFO} - Awaiting Customer Info
+    - {CaseState.RESOLVED} - Resolved
+    """
+
+
+def render_system_prompt() -> str:
+    """Fill in the assignees, components, priorities and states. None of them change at runtime."""
+    return SYSTEM_PROMPT_TEMPLATE.format(webapp_dev=webapp_dev, applog_dev=applog_dev, support_agent=support_agent, api_dev=api_dev, database_admin=database_admin, security_analyst=security_analyst, Component=Component, Priority=Priority, CaseState=CaseState)
+
+
+class PromptAssembler:
+    """Builds the message list for every agent call around a byte-stable prefix.
+
+    The system prompt is rendered once, when the graph is built, and sent as the
+    same SystemMessage object on every call. Together with the bound tool schemas
+    it forms a prefix that never changes between calls; everything case-specific
+    follows it in the conversation messages. That keeps provider-side prefix
+    caching effective across every agent/tools iteration.
+
+    record(response) tallies the provider-reported token usage, so stats() can
+    report the share of input tokens served from the provider's prefix cache.
+    Responses replayed by llm_cache.CachedChatModel never reached the provider;
+    they are counted apart and their stored usage is left out.
+    """
+
+    def __init__(self, tools, system_prompt: str | None = None):
+        self.system_prompt = system_prompt if system_prompt is not None else render_system_prompt()
+        self.system_message = SystemMessage(content=self.system_prompt)
+        self.tool_schemas = [convert_to_openai_tool(t) for t in tools]
+        self.prefix_hash = self._hash_prefix(self.system_prompt, self.tool_schemas)
+        self.calls = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.replayed = 0
+
+    @staticmethod
+    def _hash_prefix(system_prompt: str, tool_schemas: list[dict]) -> str:
+        payload = system_prompt + json.dumps(tool_schemas, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def build(self, messages: list) -> list:
+        """The static prefix followed by the conversation so far."""
+        self.calls += 1
+        return [self.system_message] + list(messages)
+
+    def record(self, response):
+        """Add the provider's token usage from a model response, when it reports any."""
+        if (getattr(response, "response_metadata", None) or {}).get(CACHE_HIT_FLAG):
+            self.replayed += 1
+            return
+        usage = getattr(response, "usage_metadata", None) or {}
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.cached_tokens += cached
+        if cached:
+            self.cache_hits += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "prefix_hash": self.prefix_hash[:12],
+            "calls_with_cache_hit": self.cache_hits,
+            "replayed_from_llm_cache": self.replayed,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "provider_cache_hit_rate": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+        }
@@ -0,0 +1,222 @@
+import re
+import threading
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+from similarity import HashingEmbedder
+
+
+CASE_ID_PATTERN = re.compile(r"CASE ID:\s*(\S+)")
+# Fast-path cues only count in the title and the instructions after the case header,
+# never in the customer's description
+TITLE_PATTERN = re.compile(r"^TITLE:(.*)$", re.MULTILINE)
+INSTRUCTIONS_PATTERN = re.compile(r"^CREATED:.*?$(.*)", re.MULTILINE | re.DOTALL)
+# "Permission Denied error" names the permission problem; it isn't a separate technical cue
+ERROR_SUFFIX = r"(?:['\"]?\s+errors?)?"
+# Route -> alternatives; each route becomes one named group of a single compiled pattern.
+# permission and synthesis are full fast paths, technical only prefetches check_past_cases.
+ROUTE_PATTERNS = {
+    "permission": [
+        rf"permission denied{ERROR_SUFFIX}", rf"access denied{ERROR_SUFFIX}", r"not (?:permitted|authori[sz]ed|allowed) to",
+        rf"unauthori[sz]ed{ERROR_SUFFIX}", rf"forbidden{ERROR_SUFFIX}", r"(?:admin|administrator) (?:rights|privileges|role)",
+    ],
+    "synthesis": [r"synthesi[sz]e", r"summari[sz]e (?:the|this|all)"],
+    "technical": [
+        r"errors?", r"exceptions?", r"crash\w*", r"hang\w*", r"freez\w*", r"unresponsive", r"time[sd]? ?out",
+        r"slow\w*", r"5\d\d", r"leak\w*", r"fail\w*", r"deadlock\w*", r"regress\w*", r"broken",
+        r"since (?:the )?(?:last|latest|recent) (?:deploy\w*|release|update|upgrade)",
+    ],
+}
+FAST_PATHS = ("permission", "synthesis")
+
+
+class LinearRouteModel:
+    """Softmax regression over hashed token frequencies, for cases the patterns miss.
+
+    Small enough to train in milliseconds on labelled past requests with fit(),
+    and save()/load() as a .npz file.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.embedder = HashingEmbedder(dim)
+        self.labels: list[str] = []
+        self.weights = np.zeros((dim, 0), dtype=np.float32)
+        self.bias = np.zeros(0, dtype=np.float32)
+
+    def features(self, texts: list[str]) -> np.ndarray:
+        matrix = np.stack([self.embedder.term_frequencies(text) for text in texts])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def fit(self, texts: list[str], labels: list[str], epochs: int = 300, learning_rate: float = 1.0,
+            l2: float = 1e-4) -> "LinearRouteModel":
+        self.labels = sorted(set(labels))
+        x = self.features(texts)
+        y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        y[np.arange(len(texts)), [self.labels.index(label) for label in labels]] = 1.0
+        self.weights = np.zeros((x.shape[1], len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+        for _ in range(epochs):
+            gradient = (self._softmax(x @ self.weights + self.bias) - y) / len(texts)
+            self.weights -= learning_rate * (x.T @ gradient + l2 * self.weights)
+            self.bias -= learning_rate * gradient.sum(axis=0)
+        return self
+
+    def predict(self, text: str) -> tuple[str | None, float]:
+        """(most likely label, its probability); (None, 0.0) before fit()."""
+        if not self.labels:
+            return None, 0.0
+        probabilities = self._softmax(self.features([text]) @ self.weights + self.bias)[0]
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str):
+        np.savez(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels))
+
+    @classmethod
+    def load(cls, path: str) -> "LinearRouteModel":
+        data = np.load(path)
+        model = cls(data["weights"].shape[0])
+        model.weights, model.bias, model.labels = data["weights"], data["bias"], data["labels"].tolist()
+        return model
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class CaseRouter:
+    """Fast-path stage in front of the agent for requests whose workflow is fixed.
+
+    The request is matched against one compiled pattern with a named group per
+    route. Permission and synthesis cues only count in the title and the
+    instructions, and a permission cue only when no technical cue appears there
+    too. Such a lone match is confident: the router runs
+    that route's tool sequence from the system prompt's MANDATORY WORKFLOW itself,
+    with the comment and state change folded into one update_case call,
+    and ends the run without calling the model. A technical match runs
+    check_past_cases and hands over to the agent with the result already in the
+    conversation. Anything else, including conflicting matches, goes straight to
+    the agent. When no pattern matches, an optional LinearRouteModel is consulted
+    and trusted above `threshold`.
+
+    The tool calls and results are added to the messages like the agent's own,
+    so the history reads the same whichever path handled the case.
+    """
+
+    def __init__(self, tools, model: LinearRouteModel | None = None, threshold: float = 0.9,
+                 patterns: dict[str, list[str]] = ROUTE_PATTERNS):
+        self.tools = {t.name: t for t in tools}
+        self.model = model
+        self.threshold = threshold
+        self.pattern = re.compile(
+            "|".join(f"(?P<{route}>\\b(?:{'|'.join(alternatives)})\\b)" for route, alternatives in patterns.items()),
+            re.IGNORECASE,
+        )
+        # Routed cases per route; route() runs on worker threads
+        self.counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> tuple[str | None, float]:
+        """(route, confidence) for a request; route is None when the agent should decide."""
+        matched = {match.lastgroup for match in self.pattern.finditer(text)}
+        cues = {match.lastgroup for match in self.pattern.finditer(self.cue_text(text))}
+        fast = cues.intersection(FAST_PATHS)
+        # Conflicting cues, e.g. "403 Forbidden since last deploy": let the agent decide
+        if len(fast) > 1 or ("permission" in fast and "technical" in cues):
+            return None, 0.0
+        if fast:
+            return fast.pop(), 1.0
+        if "technical" in matched:
+            return "technical", 1.0
+        if self.model is not None:
+            route, probability = self.model.predict(text)
+            if probability >= self.threshold:
+                return route, probability
+        return None, 0.0
+
+    @staticmethod
+    def cue_text(text: str) -> str:
+        """The title and instructions of a case request, or the whole text if it has no case header."""
+        title = TITLE_PATTERN.search(text)
+        if title is None:
+            return text
+        instructions = INSTRUCTIONS_PATTERN.search(text)
+        return title.group(1) + "\n" + (instructions.group(1) if instructions else "")
+
+    def plan(self, route: str, case_id: str, request: str) -> list[tuple[str, dict]]:
+        """The route's tool calls, in order. Arguments given as callables are computed from the previous result."""
+        if route == "permission":
+            return [
+                ("review_app_design", {"case_id": case_id, "message": request}),
+                ("update_case", lambda previous: {"case_id": case_id, "comment": previous, "state": "resolved"}),
+            ]
+        if route == "synthesis":
+            return [
+                ("synthesize_comments", {"case_id": case_id, "mode": "extractive"}),
+                ("add_comment", lambda previous: {"case_id": case_id, "message": previous}),
+            ]
+        if route == "technical":
+            return [("check_past_cases", {"case_id": case_id})]
+        return []
+
+    def route(self, messages: list) -> tuple[list, bool]:
+        """(messages to add, whether the case is finished) for the latest request."""
+        case_id, route, steps = self._start(messages)
+        added, previous = [], None
+        for i, (name, args) in enumerate(steps):
+            call = self._call(case_id, i, name, args, previous)
+            result = self.tools[name].invoke(call)
+            added.extend([AIMessage(content="", tool_calls=[call]), result])
+            previous = str(result.content)
+            if previous.endswith("not found"):
+                break
+        return self._finish(case_id, route, added, previous)
+
+    async def aroute(self, messages: list) -> tuple[list, bool]:
+        case_id, route, steps = self._start(messages)
+        added, previous = [], None
+        for i, (name, args) in enumerate(steps):
+            call = self._call(case_id, i, name, args, previous)
+            result = await self.tools[name].ainvoke(call)
+            added.extend([AIMessage(content="", tool_calls=[call]), result])
+            previous = str(result.content)
+            if previous.endswith("not found"):
+                break
+        return self._finish(case_id, route, added, previous)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+    def _count(self, route: str):
+        with self._lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+
+    def _start(self, messages: list) -> tuple[str | None, str | None, list]:
+        request = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        match = CASE_ID_PATTERN.search(request.content) if request is not None else None
+        if match is None:
+            return None, None, []
+        route, _ = self.classify(request.content)
+        steps = self.plan(route, match.group(1), request.content) if route else []
+        if any(name not in self.tools for name, _ in steps):
+            return match.group(1), None, []
+        return match.group(1), route, steps
+
+    @staticmethod
+    def _call(case_id: str, step: int, name: str, args, previous: str | None) -> dict:
+        if callable(args):
+            args = args(previous)
+        return {"name": name, "args": args, "id": f"route_{case_id}_{step}", "type": "tool_call"}
+
+    def _finish(self, case_id: str | None, route: str | None, added: list, previous: str | None) -> tuple[list, bool]:
+        if route is None or (previous or "").endswith("not found"):
+            self._count("agent")
+            return added, False
+        self._count(route)
+        if route in FAST_PATHS:
+            added.append(AIMessage(content=f"Handled case {case_id} on the {route} fast path."))
+            return added, True
+        return added, False
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from pydantic import BaseModel
+from langchain_core.messages import HumanMessage
+from simple_model import Case
+
+
+def case_request(case: Case, instructions: str = "") -> str:
+    """The agent's opening message for a case, as the demo scenarios write it."""
+    message = f"""
+New case received that needs analysis and routing:
+
+CASE ID: {case.id}
+TITLE: {case.title}
+DESCRIPTION: {case.description}
+PRIORITY: {case.priority.value.upper()}
+CURRENT STATE: {case.state.value.upper()}
+CURRENT ASSIGNEE: {case.assignee.name} ({case.assignee.department})
+CURRENT COMPONENT: {case.component.value.upper()}
+CREATED: {case.created_at.strftime('%Y-%m-%d %H:%M:%S')}
+"""
+    if instructions:
+        message += f"\n{instructions}\n"
+    return message
+
+
+class CaseRun(BaseModel):
+    case_id: str
+    # done, timeout, cancelled or error
+    status: str
+    elapsed: float
+    messages: list = []
+    error: str | None = None
+
+
+class AsyncCaseRunner:
+    """Drives a compiled graph over many cases concurrently with ainvoke.
+
+    At most `concurrency` cases are in flight at once; the rest wait for a slot.
+    A case that runs longer than `timeout` seconds, or is cancelled with
+    cancel(case_id), ends with that status while the others carry on. The graph
+    should be built with tools_and_resources.ASYNC_TOOLS so tool calls run on
+    worker threads and a slow case never stalls the event loop; a tool call
+    already running on a thread finishes even if its case is cancelled.
+    """
+
+    def __init__(self, graph, concurrency: int = 8, timeout: float = 120.0, config: dict | None = None):
+        self.graph = graph
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.config = config or {"recursion_limit": 20}
+        self._slots = asyncio.Semaphore(concurrency)
+        # case_id -> running ainvoke task
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+        self._finished: set[str] = set()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def run(self, requests: dict[str, str]) -> dict[str, CaseRun]:
+        """Process {case_id: opening message} and return {case_id: CaseRun} in input order.
+
+        A cancel(case_id) issued before or during the call still applies to a
+        case that hasn't started.
+        """
+        # Cases finished by an earlier run can be run (and cancelled) again
+        self._finished.difference_update(requests)
+        runs = await asyncio.gather(*(self.run_case(case_id, text) for case_id, text in requests.items()))
+        return {run.case_id: run for run in runs}
+
+    async def run_case(self, case_id: str, text: str) -> CaseRun:
+        start = time.perf_counter()
+        async with self._slots:
+            if case_id in self._cancelled:
+                self._cancelled.discard(case_id)
+                self._finished.add(case_id)
+                return CaseRun(case_id=case_id, status="cancelled", elapsed=0.0)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            task = asyncio.ensure_future(
+                self.graph.ainvoke({"messages": [HumanMessage(content=text)]}, config=self.config)
+            )
+            self._tasks[case_id] = task
+            try:
+                done, _ = await asyncio.wait({task}, timeout=self.timeout)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            finally:
+                self._tasks.pop(case_id, None)
+                self._cancelled.discard(case_id)
+                self._finished.add(case_id)
+                self.in_flight -= 1
+
+        elapsed = time.perf_counter() - start
+        if not done:
+            task.cancel()
+            return CaseRun(case_id=case_id, status="timeout", elapsed=elapsed)
+        if task.cancelled():
+            return CaseRun(case_id=case_id, status="cancelled", elapsed=elapsed)
+        if task.exception() is not None:
+            return CaseRun(case_id=case_id, status="error", elapsed=elapsed, error=repr(task.exception()))
+        return CaseRun(case_id=case_id, status="done", elapsed=elapsed, messages=task.result()["messages"])
+
+    def cancel(self, case_id: str) -> bool:
+        """Cancel a running or queued case. Returns False if it already finished."""
+        task = self._tasks.get(case_id)
+        if task is not None:
+            return task.cancel()
+        if case_id in self._cancelled or case_id in self._finished:
+            return False
+        self._cancelled.add(case_id)
+        return True
+
+    def cancel_all(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+def run_cases(graph, requests: dict[str, str], concurrency: int = 8, timeout: float = 120.0) -> dict[str, CaseRun]:
+    """Synchronous entry point: process the requests concurrently and wait for all of them."""
+    return asyncio.run(AsyncCaseRunner(graph, concurrency, timeout).run(requests))
@@ -0,0 +1,314 @@
+import heapq
+import math
+import threading
+import numpy as np
+from dedup import content_key
+from similarity import PastCaseIndex, TOKEN_PATTERN, STOPWORDS
+from simple_model import Case, CaseState, Priority, Component
+
+
+FILTER_FIELDS = ("state", "priority", "component")
+
+
+def bm25_tokens(text: str) -> list[str]:
+    return [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted BM25 index over case title, description and comment text.
+
+    Besides the term postings it keeps one row mask per state, priority and
+    component value over the documents' slots, so filters are resolved to a
+    candidate mask with a few vectorised ANDs before any scoring and documents
+    outside it are never scored. Adding a comment only indexes the new comment's
+    terms; editing the title or description reindexes the case.
+
+    Scoring is vectorised per term: a term's postings are turned into (slot,
+    term frequency) arrays the first time a query needs them, and kept until a
+    write touches that term, so a query is a few NumPy gathers per term rather
+    than a Python loop over every matching document.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {slot: term frequency}
+        self.postings: dict[str, dict[int, int]] = {}
+        self.doc_len: dict[str, int] = {}
+        self.total_len = 0
+        # term -> (slots, term frequencies) of its postings, built on first query
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        # document length per slot
+        self._lens = np.zeros(0, dtype=np.float64)
+        # field -> value -> bool mask over slots
+        self.filters: dict[str, dict[str, np.ndarray]] = {field: {} for field in FILTER_FIELDS}
+        # case_id -> slot, and slot -> case_id (None when free)
+        self._slots: dict[str, int] = {}
+        self._ids: list[str | None] = []
+        self._free: list[int] = []
+        self._capacity = 0
+        # case_id -> (filter values, number of comments indexed, content_key of title and description)
+        self._docs: dict[str, tuple[tuple, int, bytes]] = {}
+        # case_id -> terms it has postings under, so remove() skips the rest of the vocabulary
+        self._terms: dict[str, set[str]] = {}
+        self._lock = threading.RLock()
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, case_id: object) -> bool:
+        return case_id in self._docs
+
+    def build(self, cases):
+        with self._lock:
+            self.postings.clear()
+            self.doc_len.clear()
+            self.total_len = 0
+            self._arrays.clear()
+            self._lens = np.zeros(0, dtype=np.float64)
+            self.filters = {field: {} for field in FILTER_FIELDS}
+            self._slots.clear()
+            self._ids.clear()
+            self._free.clear()
+            self._capacity = 0
+            self._docs.clear()
+            self._terms.clear()
+            for case in cases:
+                self.upsert(case)
+            self.built = True
+
+    def upsert(self, case: Case):
+        """Index a new case, or bring an indexed one's filters and comments up to date."""
+        values = (case.state.value, case.priority.value, case.component.value)
+        content = content_key(case)
+        with self._lock:
+            previous = self._docs.get(case.id)
+            if previous is None:
+                texts = [case.title, case.title, case.description]
+                texts.extend(comment.content for comment in case.comments)
+            else:
+                old_values, n_comments, old_content = previous
+                if n_comments > len(case.comments) or old_content != content:
+                    # Comments were rewritten or the title or description edited: index it afresh
+                    self.remove(case.id)
+                    self.upsert(case)
+                    return
+                texts = [comment.content for comment in case.comments[n_comments:]]
+                self._set_filters(case.id, old_values, remove=True)
+            self._set_filters(case.id, values)
+            self._add_terms(case.id, texts)
+            self._docs[case.id] = (values, len(case.comments), content)
+
+    def remove(self, case_id: str) -> bool:
+        with self._lock:
+            previous = self._docs.pop(case_id, None)
+            if previous is None:
+                return False
+            self._set_filters(case_id, previous[0], remove=True)
+            slot = self._slots.pop(case_id)
+            self._ids[slot] = None
+            self._free.append(slot)
+            self._lens[slot] = 0.0
+            for term in self._terms.pop(case_id, ()):
+                self._arrays.pop(term, None)
+                docs = self.postings[term]
+                del docs[slot]
+                if not docs:
+                    del self.postings[term]
+            self.total_len -= self.doc_len.pop(case_id, 0)
+            return True
+
+    def candidates(self, state=None, priority=None, component=None) -> "Candidates | None":
+        """Cases passing every filter, as an AND of the filters' row masks; None means no filter."""
+        wanted = []
+        if state is not None:
+            wanted.append(("state", CaseState(state).value))
+        if priority is not None:
+            wanted.append(("priority", Priority(priority).value))
+        if component is not None:
+            wanted.append(("component", Component(component).value))
+        if not wanted:
+            return None
+        with self._lock:
+            masks = [self.filters[field].get(value) for field, value in wanted]
+            if any(mask is None for mask in masks):
+                return Candidates(self, np.zeros(self._capacity, dtype=bool))
+            result = masks[0].copy()
+            for mask in masks[1:]:
+                result &= mask
+            return Candidates(self, result)
+
+    def search(self, query: str, k: int = 10, candidates: "Candidates | None" = None) -> list[tuple[str, float]]:
+        """Top-k (case id, BM25 score), scoring only documents in `candidates` when given."""
+        terms = set(bm25_tokens(query))
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs or not terms or (candidates is not None and not len(candidates)):
+                return []
+            norms = self.k1 * (1.0 - self.b + self.b * self._lens / (self.total_len / n_docs))
+            scores = np.zeros(self._capacity, dtype=np.float64)
+            mask = None
+            if candidates is not None:
+                # The index may have grown since the mask was taken; new slots are outside it
+                mask = np.zeros(self._capacity, dtype=bool)
+                mask[:len(candidates.mask)] = candidates.mask[:self._capacity]
+            for term in terms:
+                arrays = self._postings_arrays(term)
+                if arrays is None:
+                    continue
+                slots, tf = arrays
+                idf = math.log(1.0 + (n_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                if mask is not None:
+                    inside = mask[slots]
+                    slots, tf = slots[inside], tf[inside]
+                scores[slots] += idf * tf * (self.k1 + 1.0) / (tf + norms[slots])
+            hits = np.flatnonzero(scores)
+            if len(hits) > k:
+                hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+            hits = hits[np.argsort(-scores[hits], kind="stable")]
+            ids = self._ids
+            return [(ids[slot], float(scores[slot])) for slot in hits]
+
+    def _postings_arrays(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            docs = self.postings.get(term)
+            if not docs:
+                return None
+            arrays = self._arrays[term] = (
+                np.fromiter(docs.keys(), dtype=np.intp, count=len(docs)),
+                np.fromiter(docs.values(), dtype=np.float64, count=len(docs)),
+            )
+        return arrays
+
+    def _add_terms(self, case_id: str, texts: list[str]):
+        length = 0
+        terms = self._terms.setdefault(case_id, set())
+        slot = self._slots[case_id]
+        arrays = self._arrays
+        for text in texts:
+            for term in bm25_tokens(text):
+                docs = self.postings.setdefault(term, {})
+                docs[slot] = docs.get(slot, 0) + 1
+                terms.add(term)
+                arrays.pop(term, None)
+                length += 1
+        self.doc_len[case_id] = self.doc_len.get(case_id, 0) + length
+        self._lens[slot] = self.doc_len[case_id]
+        self.total_len += length
+
+    def _set_filters(self, case_id: str, values: tuple, remove: bool = False):
+        if remove:
+            slot = self._slots[case_id]
+            for field, value in zip(FILTER_FIELDS, values):
+                mask = self.filters[field].get(value)
+                if mask is not None:
+                    mask[slot] = False
+            return
+        slot = self._slots.get(case_id)
+        if slot is None:
+            slot = self._new_slot(case_id)
+        for field, value in zip(FILTER_FIELDS, values):
+            index = self.filters[field]
+            mask = index.get(value)
+            if mask is None:
+                mask = index[value] = np.zeros(self._capacity, dtype=bool)
+            mask[slot] = True
+
+    def _new_slot(self, case_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = case_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(case_id)
+            if slot == self._capacity:
+                self._capacity = max(64, 2 * self._capacity)
+                lens = np.zeros(self._capacity, dtype=np.float64)
+                lens[:len(self._lens)] = self._lens
+                self._lens = lens
+                for index in self.filters.values():
+                    for value, mask in index.items():
+                        grown = np.zeros(self._capacity, dtype=bool)
+                        grown[:len(mask)] = mask
+                        index[value] = grown
+        self._slots[case_id] = slot
+        return slot
+
+
+class Candidates:
+    """The cases a BM25Index filter matched, as a bool mask over the index's slots.
+
+    Membership is a dict lookup and one array read, so the vector index can test
+    its own top hits against a wide filter without an id set ever being built;
+    iterating yields the matching ids, for a narrow filter to be looked up row
+    by row instead.
+    """
+
+    def __init__(self, index: BM25Index, mask: np.ndarray):
+        self.index = index
+        self.mask = mask
+        self._count = int(np.count_nonzero(mask))
+        self._ids: list[str] | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, case_id: object) -> bool:
+        slot = self.index._slots.get(case_id)
+        return slot is not None and slot < len(self.mask) and bool(self.mask[slot])
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def ids(self) -> list[str]:
+        if self._ids is None:
+            ids = self.index._ids
+            self._ids = [ids[slot] for slot in np.flatnonzero(self.mask) if ids[slot] is not None]
+        return self._ids
+
+
+class HybridSearcher:
+    """One ranked query over BM25 and vector similarity with filter pushdown.
+
+    Filters become a candidate mask up front. BM25 scores only candidates that
+    contain a query term and the vector index scores only candidate rows (see
+    PastCaseIndex.query_text), and the two top-N lists are fused as
+    `alpha * bm25 / max_bm25 + (1 - alpha) * cosine`. The vector index only
+    covers `vector_state` cases, so a filter on that state alone is not pushed
+    down to it, and a filter on any other state skips it. A case the vector
+    index doesn't hold has no cosine term and scores `alpha * bm25 / max_bm25`,
+    on the same scale as the fused scores; between equal keyword matches, the
+    resolved case ranks first.
+    """
+
+    def __init__(self, bm25: BM25Index, vectors: PastCaseIndex, alpha: float = 0.5, depth: int = 50,
+                 vector_state: CaseState = CaseState.RESOLVED):
+        self.bm25 = bm25
+        self.vectors = vectors
+        self.alpha = alpha
+        self.depth = depth
+        self.vector_state = vector_state
+
+    def search(self, query: str, k: int = 5, state=None, priority=None, component=None,
+               exclude: str | None = None) -> list[tuple[str, float]]:
+        """Top-k (case id, fused score) for free text. Raises ValueError for an unknown filter value."""
+        candidates = self.bm25.candidates(state=state, priority=priority, component=component)
+        # One spare slot for the excluded case
+        depth = self.depth + (exclude is not None)
+        lexical = self.bm25.search(query, depth, candidates)
+        fused: dict[str, float] = {}
+        best_lexical = lexical[0][1] if lexical else 1.0
+        for case_id, score in lexical:
+            fused[case_id] = self.alpha * score / best_lexical
+        if state is None or CaseState(state) == self.vector_state:
+            vector_candidates = candidates if priority is not None or component is not None else None
+            vector = dict(self.vectors.query_text(query, depth, vector_candidates))
+            # Vector scores for lexical hits that missed the vector top-N
+            vector.update(self.vectors.score_ids(query, [case_id for case_id in fused if case_id not in vector]))
+            for case_id, score in vector.items():
+                fused[case_id] = fused.get(case_id, 0.0) + (1.0 - self.alpha) * max(score, 0.0)
+        fused.pop(exclude, None)
+        return heapq.nlargest(k, ((case_id, score) for case_id, score in fused.items() if score > 1e-6),
+                              key=lambda item: item[1])
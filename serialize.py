@@ -0,0 +1,135 @@
+import threading
+from collections import OrderedDict
+from extractive import CAUSE_WORDS, FIX_WORDS, WORD_PATTERN
+from simple_model import Case, Comment
+
+
+DETAIL_LEVELS = ("line", "digest", "key_comments", "full")
+
+
+def case_version(case: Case) -> tuple:
+    """Changes whenever a tool mutates the case: every tool appends a comment or a change record."""
+    return (len(case.comments), len(case.change_history), case.updated_at)
+
+
+def clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def clip_lines(lines: list[str], limit: int) -> str:
+    """Join lines, dropping whole lines from the end (and saying how many) to stay within limit."""
+    text = "\n".join(lines)
+    if len(text) <= limit:
+        return text
+    kept, size = [], 0
+    for line in lines:
+        if size + len(line) + 1 > limit - 40:
+            break
+        kept.append(line)
+        size += len(line) + 1
+    kept.append(f"[{len(lines) - len(kept)} more lines omitted]")
+    return "\n".join(kept)
+
+
+class CaseSerializer:
+    """Bounded-size text rendering of cases for tool results, cached per case version.
+
+    Detail levels:
+      line          one line: id, state, priority, component and clipped title,
+                    for lists of matches
+      digest        id, state, priority, component, assignee, title, clipped
+                    description and the last comment
+      key_comments  the header plus the first and last comments and those that
+                    state a root cause or a fix, oldest first
+      full          every field, comment and change, newest comments dropped
+                    first if over the limit
+
+    Each level is capped at max_chars[level] characters. Renderings are kept in
+    an LRU keyed by (case id, case_version, level), so repeated lookups of an
+    unchanged case cost a dict hit.
+    """
+
+    def __init__(self, max_chars: dict | None = None, cache_size: int = 4096):
+        self.max_chars = {"line": 200, "digest": 600, "key_comments": 2000, "full": 8000, **(max_chars or {})}
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, case: Case, detail: str = "digest") -> str:
+        if detail not in DETAIL_LEVELS:
+            raise ValueError(f"Invalid detail level: {detail}")
+        key = (case.id, case_version(case), detail)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return text
+            self.misses += 1
+        text = getattr(self, f"_{detail}")(case, self.max_chars[detail])
+        with self._lock:
+            self._cache[key] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def render_many(self, cases: list[Case], detail: str = "digest") -> str:
+        return "\n\n".join(self.render(case, detail) for case in cases)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._cache)}
+
+    @staticmethod
+    def _header(case: Case) -> list[str]:
+        return [
+            f"{case.id} [{case.state.value}, {case.priority.value}] {case.title}",
+            f"Component: {case.component.value} | Assignee: {case.assignee.id} "
+            f"({case.assignee.name}, {case.assignee.department})",
+        ]
+
+    @staticmethod
+    def _comment(comment: Comment, limit: int) -> str:
+        return f"- [{comment.created_at[:16]}] {comment.author}: {clip(comment.content, limit)}"
+
+    def _line(self, case: Case, limit: int) -> str:
+        return clip(f"{case.id} [{case.state.value}, {case.priority.value}, {case.component.value}] {case.title}", limit)
+
+    def _digest(self, case: Case, limit: int) -> str:
+        lines = self._header(case)
+        lines.append(f"Description: {clip(case.description, 200)}")
+        if case.comments:
+            lines.append(f"Last comment ({len(case.comments)} total):")
+            lines.append(self._comment(case.comments[-1], 200))
+        return clip_lines(lines, limit)
+
+    def _key_comments(self, case: Case, limit: int) -> str:
+        lines = self._header(case)
+        lines.append(f"Description: {clip(case.description, 300)}")
+        key = []
+        for i, comment in enumerate(case.comments):
+            words = set(WORD_PATTERN.findall(comment.content.lower()))
+            if i in (0, len(case.comments) - 1) or words & CAUSE_WORDS or words & FIX_WORDS:
+                key.append(i)
+        if key:
+            lines.append(f"Key comments ({len(key)} of {len(case.comments)}):")
+            lines.extend(self._comment(case.comments[i], 300) for i in key)
+        return clip_lines(lines, limit)
+
+    def _full(self, case: Case, limit: int) -> str:
+        lines = self._header(case)
+        lines.append(f"Customer: {case.customer or '-'} | Created: {case.created_at:%Y-%m-%d %H:%M} "
+                     f"| Updated: {case.updated_at:%Y-%m-%d %H:%M}")
+        lines.append(f"Description: {case.description}")
+        if case.change_history:
+            lines.append("Changes:")
+            lines.extend(
+                f"- [{change.changed_at:%Y-%m-%d %H:%M}] {change.field}: {change.old_value} -> {change.new_value}"
+                for change in case.change_history
+            )
+        if case.comments:
+            lines.append("Comments:")
+            lines.extend(self._comment(comment, 1000) for comment in case.comments)
+        return clip_lines(lines, limit)
@@ -0,0 +1,353 @@
+import re
+import threading
+import zlib
+from functools import lru_cache
+import numpy as np
+from simple_model import Case
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can for from has have in into is it its of on or that the their
+this to was were when which while will with after before not no so than then there these they
+""".split())
+
+
+def case_text(case: Case) -> str:
+    """The text a case is matched on: title (weighted twice), description and comments."""
+    parts = [case.title, case.title, case.description]
+    parts.extend(comment.content for comment in case.comments)
+    return "\n".join(parts)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cased word unigrams plus adjacent bigrams, without stopwords."""
+    words = [w for w in TOKEN_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@lru_cache(maxsize=1 << 16)
+def _bucket(token: str, dim: int) -> tuple[int, float]:
+    # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+    h = zlib.crc32(token.encode())
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+
+def top_hits(scores: np.ndarray, ids, k: int, candidates=None, skip=()) -> list[tuple[str, float]]:
+    """The k best (id, score) rows, best first, leaving out -inf rows, ids in `skip` and ids not in `candidates`.
+
+    Rows are taken from a partial sort that widens only while filtered-out rows
+    leave fewer than k hits, so a filter never costs a full sort.
+    """
+    hits: list[tuple[str, float]] = []
+    n = len(scores)
+    window = k
+    while k > 0 and n:
+        top = min(window, n)
+        best = np.argpartition(-scores, top - 1)[:top] if top < n else np.arange(n)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        hits = []
+        for i in best:
+            score = float(scores[i])
+            if score == -np.inf:
+                break
+            case_id = ids[i]
+            if case_id is None or case_id in skip or (candidates is not None and case_id not in candidates):
+                continue
+            hits.append((case_id, score))
+            if len(hits) == k:
+                return hits
+        if top == n or score == -np.inf:
+            break
+        window *= 4
+    return hits
+
+
+class HashingEmbedder:
+    """Offline hashed TF-IDF embedder.
+
+    Tokens are hashed into `dim` signed buckets with sublinear term frequency,
+    weighted by inverse document frequency over the indexed corpus and L2
+    normalised, so a dot product between two vectors is their cosine similarity.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.doc_freq = np.zeros(dim, dtype=np.float64)
+        self.n_docs = 0
+
+    def term_frequencies(self, text: str) -> np.ndarray:
+        """Unweighted sublinear-TF vector for a text, before IDF and normalisation."""
+        counts: dict[tuple[int, float], int] = {}
+        for token in tokenize(text):
+            key = _bucket(token, self.dim)
+            counts[key] = counts.get(key, 0) + 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for (index, sign), count in counts.items():
+            vector[index] += sign * (1.0 + np.log(count))
+        return vector
+
+    def fit(self, tf_matrix: np.ndarray):
+        """Set document frequencies from a (n_docs, dim) matrix of term frequencies."""
+        self.doc_freq = np.count_nonzero(tf_matrix, axis=0).astype(np.float64)
+        self.n_docs = tf_matrix.shape[0]
+
+    def add_document(self, tf: np.ndarray):
+        self.doc_freq += tf != 0
+        self.n_docs += 1
+
+    def remove_document(self, tf: np.ndarray):
+        self.doc_freq -= tf != 0
+        self.n_docs -= 1
+
+    def idf(self) -> np.ndarray:
+        return (np.log((1.0 + self.n_docs) / (1.0 + self.doc_freq)) + 1.0).astype(np.float32)
+
+    def weight(self, tf_matrix: np.ndarray) -> np.ndarray:
+        """Apply IDF to a (n, dim) TF matrix and L2-normalise each row."""
+        weighted = tf_matrix * self.idf()
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(weighted / norms, dtype=np.float32)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.weight(np.stack([self.term_frequencies(text) for text in texts]))
+
+
+class PastCaseIndex:
+    """Top-k cosine retrieval over resolved cases, maintained incrementally.
+
+    All vectors sit in one contiguous float32 matrix, so a query is a single
+    matrix product followed by a partial sort. upsert() writes one case's row in
+    place (appending when new) and remove() tombstones it, so resolving a case
+    never triggers a full reindex. Rows are weighted with the IDF current when they
+    were written; compact() drops tombstoned rows and re-weights the rest, and
+    start_compaction() runs it in a background thread once enough has drifted.
+
+    Writes made while build() runs are queued and applied to the new rows when
+    it finishes, so a case resolved mid-build is not lost.
+    """
+
+    def __init__(self, embedder: HashingEmbedder | None = None, compact_ratio: float = 0.2, prune_ratio: float = 0.25):
+        self.embedder = embedder or HashingEmbedder()
+        self.compact_ratio = compact_ratio
+        self.prune_ratio = prune_ratio
+        self.ids: list[str | None] = []
+        self._rows: dict[str, int] = {}
+        self._tf = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._matrix = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        # Rows tombstoned or written with a stale IDF since the last compaction
+        self._dirty = 0
+        self._lock = threading.RLock()
+        self._compactor = None
+        self._stop = threading.Event()
+        # case_id -> the case to upsert, or None to remove, for writes made during build()
+        self._pending: dict[str, Case | None] = {}
+        self._building = False
+        self.built = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, case_id: object) -> bool:
+        return case_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """One vector per entry of self.ids, tombstoned rows included."""
+        return self._matrix[:self._size]
+
+    def build(self, cases):
+        """Index `cases` from scratch.
+
+        upsert() and remove() calls from the moment build() starts are queued
+        and replayed once the new rows are in. Pass `cases` as a lazy iterable
+        over the store, so it is read after that point and no write falls
+        between the read and the queue.
+        """
+        with self._lock:
+            self._building = True
+            self._pending = {}
+        try:
+            cases = list(cases)
+            if cases:
+                tf = np.stack([self.embedder.term_frequencies(case_text(case)) for case in cases])
+            else:
+                tf = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        except BaseException:
+            with self._lock:
+                self._building = False
+                self._pending = {}
+            raise
+        with self._lock:
+            self.embedder.fit(tf)
+            self.ids = [case.id for case in cases]
+            self._rows = {case_id: row for row, case_id in enumerate(self.ids)}
+            self._tf = tf
+            self._matrix = self.embedder.weight(tf)
+            self._alive = np.ones(len(cases), dtype=bool)
+            self._size = len(cases)
+            self._dirty = 0
+            self._building = False
+            self.built = True
+            pending, self._pending = self._pending, {}
+            for case_id, case in pending.items():
+                if case is None:
+                    self.remove(case_id)
+                else:
+                    self.upsert(case)
+
+    def upsert(self, case: Case):
+        """Add or refresh one case's vector. A no-op until a build starts; queued while one runs."""
+        with self._lock:
+            if self._building:
+                self._pending[case.id] = case
+                return
+            if not self.built:
+                return
+        tf = self.embedder.term_frequencies(case_text(case))
+        with self._lock:
+            if self._building:
+                # A rebuild started while the vector was computed
+                self._pending[case.id] = case
+                return
+            row = self._rows.get(case.id)
+            if row is None:
+                row = self._append_row(case.id)
+            else:
+                self.embedder.remove_document(self._tf[row])
+            self.embedder.add_document(tf)
+            self._tf[row] = tf
+            self._matrix[row] = self.embedder.weight(tf[None, :])[0]
+            self._dirty += 1
+
+    def remove(self, case_id: str) -> bool:
+        """Tombstone a case's row; compact() reclaims it later."""
+        with self._lock:
+            if self._building:
+                self._pending[case_id] = None
+                return case_id in self._rows
+            row = self._rows.pop(case_id, None)
+            if row is None:
+                return False
+            self.embedder.remove_document(self._tf[row])
+            self._alive[row] = False
+            self.ids[row] = None
+            self._dirty += 1
+            return True
+
+    def needs_compaction(self) -> bool:
+        return self._dirty > max(1, self.compact_ratio * self._size)
+
+    def compact(self):
+        """Drop tombstoned rows and re-weight every row with the current IDF."""
+        with self._lock:
+            alive = np.flatnonzero(self._alive[:self._size])
+            self.ids = [self.ids[row] for row in alive]
+            self._rows = {case_id: row for row, case_id in enumerate(self.ids)}
+            self._tf = np.ascontiguousarray(self._tf[alive])
+            self._matrix = self.embedder.weight(self._tf)
+            self._alive = np.ones(len(alive), dtype=bool)
+            self._size = len(alive)
+            self._dirty = 0
+
+    def start_compaction(self, interval: float = 5.0):
+        """Compact in a daemon thread whenever needs_compaction() says so."""
+        if self._compactor is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                if self.needs_compaction():
+                    self.compact()
+
+        self._compactor = threading.Thread(target=run, name="past-case-compaction", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        if self._compactor is not None:
+            self._stop.set()
+            self._compactor.join()
+            self._compactor = None
+
+    def query(self, case: Case, k: int = 3) -> list[tuple[str, float]]:
+        return self.query_many([case], k)[0]
+
+    def query_many(self, cases: list[Case], k: int = 3) -> list[list[tuple[str, float]]]:
+        """(case id, cosine score) of the k nearest indexed cases for each query case.
+
+        A query case is never returned as its own neighbour.
+        """
+        if not cases:
+            return []
+        queries = [self.embedder.term_frequencies(case_text(case)) for case in cases]
+        with self._lock:
+            if not self._rows:
+                return [[] for _ in cases]
+            scores = self.embedder.weight(np.stack(queries)) @ self._matrix[:self._size].T
+            scores[:, ~self._alive[:self._size]] = -np.inf
+            ids = list(self.ids)
+        # One extra candidate in case the query itself is indexed
+        top = min(k + 1, len(self._rows))
+        results = []
+        for case, row in zip(cases, scores):
+            candidates = np.argpartition(-row, top - 1)[:top]
+            candidates = candidates[np.argsort(-row[candidates])]
+            hits = [(ids[i], float(row[i])) for i in candidates if ids[i] is not None and ids[i] != case.id]
+            results.append(hits[:k])
+        return results
+
+    def query_text(self, text: str, k: int = 10, candidates=None) -> list[tuple[str, float]]:
+        """Top-k (case id, cosine score) for free text.
+
+        `candidates` is any iterable container of case ids, e.g. a
+        BM25Index.candidates() mask. When it holds at most `prune_ratio` of the
+        indexed cases only their rows are multiplied; a wider filter costs more
+        to look up than to score, so the whole matrix is scored in place and
+        its best rows outside `candidates` are skipped.
+        """
+        if candidates is not None and not len(candidates):
+            return []
+        query = self.embedder.weight(self.embedder.term_frequencies(text)[None, :])[0]
+        with self._lock:
+            if not self._rows:
+                return []
+            if candidates is not None and len(candidates) <= self.prune_ratio * len(self._rows):
+                rows = np.fromiter((self._rows[c] for c in candidates if c in self._rows), dtype=np.intp)
+                return top_hits(self._matrix[rows] @ query, [self.ids[row] for row in rows], k)
+            scores = self._matrix[:self._size] @ query
+            scores[~self._alive[:self._size]] = -np.inf
+            return top_hits(scores, self.ids, k, candidates)
+
+    def score_ids(self, text: str, case_ids) -> dict[str, float]:
+        """Cosine score of free text against specific indexed cases."""
+        query = self.embedder.weight(self.embedder.term_frequencies(text)[None, :])[0]
+        with self._lock:
+            present = [case_id for case_id in case_ids if case_id in self._rows]
+            if not present:
+                return {}
+            scores = self._matrix[[self._rows[case_id] for case_id in present]] @ query
+        return dict(zip(present, scores.tolist()))
+
+    def _append_row(self, case_id: str) -> int:
+        if self._size == self._tf.shape[0]:
+            capacity = max(16, 2 * self._size)
+            self._tf = self._grow(self._tf, capacity)
+            self._matrix = self._grow(self._matrix, capacity)
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:self._size] = self._alive[:self._size]
+            self._alive = alive
+        row = self._size
+        self._size += 1
+        self.ids.append(case_id)
+        self._rows[case_id] = row
+        self._alive[row] = True
+        return row
+
+    def _grow(self, matrix: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        grown[:self._size] = matrix[:self._size]
+        return grown
@@ -1,16 +1,15 @@
+import os
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from simple_model import Case, Comment, CaseState, Priority, Component, Change
-from tools_and_resources import (
-    case_store, webapp_dev, applog_dev, support_agent, api_dev, database_admin, security_analyst, ALL_TOOLS
-)
+from tools_and_resources import case_store, ALL_TOOLS
 from cases import load_all_cases
-from langchain.chat_models import init_chat_model
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import SystemMessage, HumanMessage
-from langgraph.graph import END, StateGraph, START
-from display_utils import display_raw_messages, display_case_info, print_state_info, debug_graph_execution
-from agent_utils import State
+from langchain_core.messages import HumanMessage
+from display_utils import display_raw_messages, display_case_info
+from prompts import PromptAssembler
+from agent_graph import build_graph, make_chat_model
+from router import CaseRouter
+from compaction import HistoryCompactor
+from executor import ParallelToolNode
+from guard import LoopGuard
 
 
 load_dotenv()
@@ -21,96 +20,24 @@ incoming_case = cases["incoming_case"]
 complex_case = cases["complex_case"] 
 permissions_case = cases["permissions_case"]
 
-llm = init_chat_model(model="gpt-4o-mini", temperature=0)
-llm_with_tools = llm.bind_tools(ALL_TOOLS)
-tool_node = ToolNode(tools=ALL_TOOLS)
-
-
-def agent(state: State) -> State:
-    system_prompt = """You are an IT Service Management (ITSM) assistant. Your job is to help customers with their support cases.
-    
-    IMPORTANT: Always make multiple tool calls in sequence. Never end with just one tool call - you must ALWAYS follow up with additional actions.
-    If you are asked to synthesize comments, you must use the synthesize_comments tool, followed by add_comments and then nothing else.
-    
-    You have the following tools at your disposal:
-    - review_app_design: Review the app design and suggest a workaround for the customer if you find something, reply directly to the customer. THIS IS THE FIRST THING YOU SHOULD CHECK AS THE ANSWER COULD BE RIGHT THERE.
-    - check_past_cases: Check past cases that are similar to the current case via something like vector search. THIS IS THE SECOND THING YOU SHOULD CHECK.
-    - change_case_component: Change the component of the current case.
-    - change_case_assignee: Change the assignee of the current case.
-    - change_case_state: Change the state of the current case.
-    - change_case_priority: Change the priority of the current case.
-    - add_comment: Add a comment to the current case.
-    - synthesize_comments: Synthesize all the comments into one comment. This is useful when there are a lot of comments and you need to summarize them for developer or support colleagues. Only used this if specified.
-
-    MANDATORY WORKFLOW:
-    1. For permission/access issues: 
-       a) FIRST: Use review_app_design
-       b) THEN: ALWAYS call add_comment to document the design limitation
-       c) THEN: ALWAYS call change_case_state to 'resolved' if it's a design limitation
-    2. For technical issues: 
-       a) FIRST: Use check_past_cases to find similar resolved cases
-       b) THEN: Make necessary changes (component, assignee, etc.) based on findings
-       c) THEN: ALWAYS call add_comment to document the solution
-       d) THEN: ALWAYS call change_case_state to 'resolved' if problem is solved
-    3. ONLY provide a final summary response WITHOUT tool calls after you have completed ALL required tool calls
-
-    CRITICAL: After calling review_app_design, you MUST ALWAYS call add_comment and change_case_state. Never stop after just review_app_design. 
-
-    You will be given a case and a message from a customer. You will need to use the tools to help the customer.
-    
-    You will also have access to the following assignees:
-    - {webapp_dev.name} ({webapp_dev.department}) - WebApp Development
-    - {applog_dev.name} ({applog_dev.department}) - AppLog Development
-    - {support_agent.name} ({support_agent.department}) - Customer Support
-    - {api_dev.name} ({api_dev.department}) - API Development
-    - {database_admin.name} ({database_admin.department}) - Database Administration
-    - {security_analyst.name} ({security_analyst.department}) - Security Team
-
-    You will also have access to the following components:
-    - {Component.WEBAPP} - WebApp
-    - {Component.APPLOG} - AppLog
-    - {Component.API} - API
-    - {Component.DATABASE} - Database
-    - {Component.OTHER} - Other
-
-    You will also have access to the following priorities:
-    - {Priority.LOW} - Low
-    - {Priority.MEDIUM} - Medium - {Priority.HIGH} - High - {Priority.VERY_HIGH} - Very High You will also have access to the following states: - {CaseState.NEW} - New - {CaseState.IN_PROGRESS} - In Progress
-    - {CaseState.AWAITING_CUSTOMER_INFO} - Awaiting Customer Info
-    - {CaseState.RESOLVED} - Resolved
-    """.format(webapp_dev=webapp_dev, applog_dev=applog_dev, support_agent=support_agent, api_dev=api_dev, database_admin=database_admin, security_analyst=security_analyst, Component=Component, Priority=Priority, CaseState=CaseState)
-
-    messages = [SystemMessage(content=system_prompt)] + state["messages"]
-    response = llm_with_tools.invoke(messages)
-    
-    print_state_info({"messages": [response]}, "AGENT", "EXITING")
-    return {"messages": [response]}
-
-
-def should_continue(state: State):
-    """Router function to decide whether to continue to tools or end."""
-    last_message = state["messages"][-1]
-    if last_message.tool_calls:
-        return "tools"
-    else:
-        return END
-
-
-# Graph building
-graph_builder = StateGraph(State)
-graph_builder.add_node("agent", agent)
-graph_builder.add_node("tools", tool_node)
-graph_builder.add_edge(START, "agent")
-graph_builder.add_conditional_edges("agent", should_continue, {
-    "tools": "tools",
-    END: END
-})
-graph_builder.add_edge("tools", "agent")
-graph_builder.add_edge("agent", END)
-graph = graph_builder.compile()
+llm_with_tools = make_chat_model(ALL_TOOLS)
+# System prompt rendered once; it and the tool schemas form the cacheable prefix of every call
+prompt = PromptAssembler(ALL_TOOLS)
+# Permission and synthesis requests follow a fixed tool sequence; the router runs it
+# without the model. FAST_PATH=0 sends every request to the agent.
+router = None if os.environ.get("FAST_PATH") == "0" else CaseRouter(ALL_TOOLS)
+# Old tool results are digested between tool and model calls so each call resends less
+compactor = HistoryCompactor()
+# Independent tool calls in one turn run in parallel; calls changing the same case run in order
+tool_node = ParallelToolNode(ALL_TOOLS)
+# Stops runs that repeat tool calls or flip a field back and forth, instead of hitting the recursion limit
+guard = LoopGuard(case_store)
+graph = build_graph(
+    llm_with_tools, ALL_TOOLS, prompt, router=router, compactor=compactor, tool_node=tool_node, guard=guard
+)
 
 # Configure recursion limit and add debugging
-config = {"recursion_limit": 10}  # Lower limit to catch issues faster
+config = {"recursion_limit": 40}  # Backstop only; LoopGuard ends runaway runs first
 
 print("\n" + "="*80)
 print("🤖 SCENARIO 1: NEW CASE - AGENT PROCESSING")
@@ -230,10 +157,11 @@ print("="*80)
 
 display_raw_messages(result, "SCENARIO 3")
 
-
-
-
-
-
-
-
+print("\n📈 PROMPT PREFIX CACHE:", prompt.stats())
+if router is not None:
+    print("📈 ROUTER:", router.stats())
+print("📈 HISTORY COMPACTION:", compactor.stats())
+print("📈 TOOL TIMINGS:", tool_node.stats())
+print("📈 LOOP GUARD:", guard.stats())
+if hasattr(llm_with_tools, "stats"):
+    print("📈 LLM RESPONSE CACHE:", llm_with_tools.stats())
@@ -55,4 +55,5 @@ class Case(BaseModel):
     created_at: datetime
     updated_at: datetime
     change_history: list[Change] = []
+    customer: str | None = None
 
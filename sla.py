@@ -0,0 +1,251 @@
+import math
+from contextlib import nullcontext
+import threading
+import time
+from datetime import datetime, timedelta
+from simple_model import Case, CaseState, Change, Priority
+
+
+# Longest a case may go without a change, and longest it may stay open, per priority
+RESPONSE_TARGETS = {
+    Priority.VERY_HIGH: timedelta(hours=1),
+    Priority.HIGH: timedelta(hours=4),
+    Priority.MEDIUM: timedelta(days=1),
+    Priority.LOW: timedelta(days=3),
+}
+RESOLUTION_TARGETS = {
+    Priority.VERY_HIGH: timedelta(days=1),
+    Priority.HIGH: timedelta(days=3),
+    Priority.MEDIUM: timedelta(days=7),
+    Priority.LOW: timedelta(days=14),
+}
+ESCALATES_TO = {Priority.LOW: Priority.MEDIUM, Priority.MEDIUM: Priority.HIGH, Priority.HIGH: Priority.VERY_HIGH}
+# The SLA clock stops while a case is resolved or waiting on the customer
+PAUSED_STATES = (CaseState.RESOLVED, CaseState.AWAITING_CUSTOMER_INFO)
+
+
+def last_activity(case: Case) -> float:
+    """Timestamp of the case's last update or recorded change, whichever is later."""
+    latest = case.updated_at.timestamp()
+    if case.change_history:
+        latest = max(latest, case.change_history[-1].changed_at.timestamp())
+    return latest
+
+
+def sla_deadline(case: Case) -> float | None:
+    """When the case breaches its SLA, or None while the clock is paused.
+
+    The earlier of last activity + the response target and created_at + the
+    resolution target. A priority change buys a fresh response window at the
+    new priority, so an escalated case isn't escalated again on the spot for
+    being old.
+    """
+    if case.state in PAUSED_STATES:
+        return None
+    response = RESPONSE_TARGETS[case.priority].total_seconds()
+    deadline = min(last_activity(case) + response,
+                   case.created_at.timestamp() + RESOLUTION_TARGETS[case.priority].total_seconds())
+    for change in reversed(case.change_history):
+        if change.field == "priority":
+            deadline = max(deadline, change.changed_at.timestamp() + response)
+            break
+    return deadline
+
+
+class TimingWheel:
+    """Hierarchical timing wheel: schedule, cancel and per-tick expiry in O(1).
+
+    Level 0 has `slots[0]` slots of `tick` seconds each; every higher level has
+    slots as wide as a whole turn of the level below. A timer goes into the
+    lowest level whose span covers its delay and moves down a level each time
+    the slot it sits in comes round, so advancing one tick touches at most one
+    slot per level. Timers past the top level's span wait in an overflow set
+    that is re-filed once per top-level turn. Keys are unique: scheduling a key
+    again moves its timer.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: tuple[int, ...] = (60, 60, 24, 64), start: float | None = None):
+        self.tick = tick
+        self.slots = slots
+        # Ticks per slot at each level, and ticks covered by each level
+        self.units = [math.prod(slots[:level]) for level in range(len(slots))]
+        self.spans = [unit * size for unit, size in zip(self.units, slots)]
+        self.origin = time.time() if start is None else start
+        self.current = 0
+        self._wheels: list[list[dict]] = [[{} for _ in range(size)] for size in slots]
+        self._overflow: dict = {}
+        self._where: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key) -> bool:
+        return key in self._where
+
+    def schedule(self, key, deadline: float):
+        """File a timer for key at deadline (epoch seconds); one already past falls due on the next tick."""
+        self.cancel(key)
+        self._file(key, max(math.ceil((deadline - self.origin) / self.tick), self.current + 1))
+
+    def cancel(self, key) -> bool:
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        bucket = self._overflow if where == "overflow" else self._wheels[where[0]][where[1]]
+        del bucket[key]
+        return True
+
+    def advance(self, now: float | None = None) -> list:
+        """Move the wheel up to now and return the keys whose deadlines passed, in due order."""
+        target = math.floor(((time.time() if now is None else now) - self.origin) / self.tick)
+        expired = []
+        while self.current < target:
+            self.current += 1
+            if self.current % self.spans[-1] == 0 and self._overflow:
+                self._refile(self._overflow)
+            for level in range(len(self.slots) - 1, 0, -1):
+                if self.current % self.units[level] == 0:
+                    self._refile(self._wheels[level][(self.current // self.units[level]) % self.slots[level]])
+            slot = self._wheels[0][self.current % self.slots[0]]
+            if slot:
+                for key in slot:
+                    del self._where[key]
+                expired.extend(slot)
+                slot.clear()
+        return expired
+
+    def _file(self, key, due: int):
+        delay = due - self.current
+        for level, span in enumerate(self.spans):
+            if delay < span:
+                index = (due // self.units[level]) % self.slots[level]
+                self._wheels[level][index][key] = due
+                self._where[key] = (level, index)
+                return
+        self._overflow[key] = due
+        self._where[key] = "overflow"
+
+    def _refile(self, bucket: dict):
+        timers = list(bucket.items())
+        bucket.clear()
+        for key, due in timers:
+            self._file(key, due)
+
+
+class SLAScheduler:
+    """Escalates cases that breach their SLA, using a TimingWheel of deadlines.
+
+    track(case) files (or moves, or drops) the case's timer from sla_deadline();
+    register it as a save listener so every tool change re-times the case. Each
+    tick() advances the wheel and escalates only the cases that fell due: the
+    priority goes up one level with a Change recorded, the case is saved through
+    `save`, and each callback in `on_escalate` gets (case, old priority, new
+    priority). A VERY_HIGH case that breaches is reported to the callbacks but
+    not re-filed until the case changes again. No tick ever scans the store.
+
+    Each due case is re-read, checked and escalated while holding
+    `lock_for(case_id)`; pass tools_and_resources.case_lock so escalations
+    never interleave with tool changes to the same case.
+
+    start() runs tick() on a background thread every `tick` seconds.
+    """
+
+    def __init__(self, store, save, tick: float = 60.0, slots: tuple[int, ...] = (60, 24, 32, 16), on_escalate=(),
+                 lock_for=None):
+        self.store = store
+        self.save = save
+        self.lock_for = lock_for or (lambda case_id: nullcontext())
+        self.wheel = TimingWheel(tick, slots)
+        self.on_escalate = list(on_escalate)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.ticks = 0
+        self.fired = 0
+        self.escalated: dict[str, int] = {}
+        self.breached_at_top = 0
+
+    def track(self, case: Case):
+        deadline = sla_deadline(case)
+        with self._lock:
+            if deadline is None:
+                self.wheel.cancel(case.id)
+            else:
+                self.wheel.schedule(case.id, deadline)
+
+    def untrack(self, case_id: str) -> bool:
+        with self._lock:
+            return self.wheel.cancel(case_id)
+
+    def track_all(self, cases) -> int:
+        count = 0
+        for case in cases:
+            self.track(case)
+            count += 1
+        return count
+
+    def tick(self, now: float | None = None) -> list[str]:
+        """Escalate every case whose deadline has passed; the ids escalated."""
+        with self._lock:
+            due = self.wheel.advance(now)
+            self.ticks += 1
+            self.fired += len(due)
+        escalated = []
+        for case_id in due:
+            with self.lock_for(case_id):
+                case = self.store.get(case_id)
+                # The case may have changed since it was filed; only act on a real breach
+                if case is None or (deadline := sla_deadline(case)) is None:
+                    continue
+                if deadline > (time.time() if now is None else now):
+                    self.track(case)
+                    continue
+                if self.escalate(case, now):
+                    escalated.append(case_id)
+        return escalated
+
+    def escalate(self, case: Case, now: float | None = None) -> bool:
+        """Raise the case one priority level; call it holding lock_for(case.id)."""
+        old_priority = case.priority
+        new_priority = ESCALATES_TO.get(old_priority)
+        if new_priority is None:
+            with self._lock:
+                self.breached_at_top += 1
+        else:
+            change = Change(
+                field="priority",
+                old_value=old_priority.value,
+                new_value=new_priority.value,
+                changed_at=datetime.now() if now is None else datetime.fromtimestamp(now),
+            )
+            case.priority = new_priority
+            case.change_history.append(change)
+            case.updated_at = change.changed_at
+            self.save(case)
+            # Re-filed here too in case `save` doesn't notify this scheduler
+            self.track(case)
+            with self._lock:
+                self.escalated[new_priority.value] = self.escalated.get(new_priority.value, 0) + 1
+        for callback in self.on_escalate:
+            callback(case, old_priority, new_priority or old_priority)
+        return new_priority is not None
+
+    def start(self) -> "SLAScheduler":
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="sla-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"tracked": len(self.wheel), "ticks": self.ticks, "fired": self.fired,
+                    "escalated": dict(self.escalated), "breached_at_top": self.breached_at_top}
+
+    def _run(self):
+        while not self._stopping.wait(self.wheel.tick):
+            self.tick()
@@ -0,0 +1,363 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from simple_model import Case, Comment, Change, CaseState, Priority, Component
+
+
+# SQL is kept in module constants so sqlite3's per-connection statement cache
+# hands back the same prepared statement on every call.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    component TEXT NOT NULL,
+    assignee_id TEXT NOT NULL,
+    customer TEXT,
+    n_comments INTEGER NOT NULL,
+    n_changes INTEGER NOT NULL,
+    comments_digest TEXT NOT NULL,
+    changes_digest TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_state ON cases(state);
+CREATE INDEX IF NOT EXISTS cases_priority ON cases(priority);
+CREATE INDEX IF NOT EXISTS cases_component ON cases(component);
+CREATE INDEX IF NOT EXISTS cases_assignee ON cases(assignee_id);
+CREATE INDEX IF NOT EXISTS cases_customer ON cases(customer);
+CREATE TABLE IF NOT EXISTS comments (
+    case_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (case_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS changes (
+    case_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (case_id, seq)
+) WITHOUT ROWID;
+"""
+
+UPSERT_CASE = """
+INSERT INTO cases (id, state, priority, component, assignee_id, customer, n_comments, n_changes,
+                   comments_digest, changes_digest, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    state = excluded.state,
+    priority = excluded.priority,
+    component = excluded.component,
+    assignee_id = excluded.assignee_id,
+    customer = excluded.customer,
+    n_comments = excluded.n_comments,
+    n_changes = excluded.n_changes,
+    comments_digest = excluded.comments_digest,
+    changes_digest = excluded.changes_digest,
+    data = excluded.data
+"""
+SELECT_CASE = "SELECT data FROM cases WHERE id = ?"
+SELECT_COUNTS = "SELECT n_comments, n_changes, comments_digest, changes_digest FROM cases WHERE id = ?"
+SELECT_COMMENTS = "SELECT data FROM comments WHERE case_id = ? ORDER BY seq"
+SELECT_CHANGES = "SELECT data FROM changes WHERE case_id = ? ORDER BY seq"
+INSERT_COMMENT = "INSERT OR REPLACE INTO comments (case_id, seq, data) VALUES (?, ?, ?)"
+INSERT_CHANGE = "INSERT OR REPLACE INTO changes (case_id, seq, data) VALUES (?, ?, ?)"
+DELETE_COMMENTS_FROM = "DELETE FROM comments WHERE case_id = ? AND seq >= ?"
+DELETE_CHANGES_FROM = "DELETE FROM changes WHERE case_id = ? AND seq >= ?"
+DELETE_CASE = "DELETE FROM cases WHERE id = ?"
+COUNT_CASES = "SELECT COUNT(*) FROM cases"
+SELECT_IDS = "SELECT id FROM cases ORDER BY rowid"
+# Last rowid of the next page of cases after a rowid, for iter_cases
+PAGE_END = "SELECT MAX(rowid) FROM (SELECT rowid FROM cases WHERE rowid > ? ORDER BY rowid LIMIT ?)"
+# Result-set reads: the cases matching {where}, then all their comments and changes in one
+# query each, instead of two more queries per case
+SELECT_CASES = "SELECT id, data FROM cases{where} ORDER BY rowid"
+SELECT_CASES_COMMENTS = """
+SELECT comments.case_id, comments.data FROM comments JOIN cases ON cases.id = comments.case_id{where}
+ORDER BY comments.case_id, comments.seq
+"""
+SELECT_CASES_CHANGES = """
+SELECT changes.case_id, changes.data FROM changes JOIN cases ON cases.id = changes.case_id{where}
+ORDER BY changes.case_id, changes.seq
+"""
+
+
+def _digest(rows: list[str]):
+    """Running blake2b over serialized comments or changes, extended as more are appended."""
+    digest = hashlib.blake2b(digest_size=16)
+    for data in rows:
+        digest.update(data.encode())
+        digest.update(b"\0")
+    return digest
+
+
+class SQLiteCaseStore:
+    """Durable case store backed by a local SQLite database in WAL mode.
+
+    Exposes the same lookup interface as store.CaseStore, so the tools can use
+    either one. Cases are read from disk on every lookup and written back by
+    save(case), so process memory does not grow with the number of cases.
+    Comments and changes live in their own tables and are appended, not rewritten,
+    when a case is saved; a digest of each list spots one edited in place, which
+    is then rewritten whole. Each thread gets its own connection: WAL lets readers
+    run while another connection writes.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, cached_statements=256)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.batch_depth = 0
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def batch(self):
+        """Group every write inside the block into one transaction. Blocks may nest."""
+        conn = self._conn
+        if self._local.batch_depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        self._local.batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._local.batch_depth -= 1
+            if self._local.batch_depth == 0:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            self._local.batch_depth -= 1
+            if self._local.batch_depth == 0:
+                conn.execute("COMMIT")
+
+    # Dict-style access, matching CaseStore
+    def __getitem__(self, case_id: str) -> Case:
+        case = self.get_case(case_id)
+        if case is None:
+            raise KeyError(case_id)
+        return case
+
+    def __setitem__(self, case_id: str, case: Case):
+        if case_id != case.id:
+            raise ValueError(f"Case id mismatch: {case_id} != {case.id}")
+        self.add_case(case)
+
+    def __delitem__(self, case_id: str):
+        if not self.remove_case(case_id):
+            raise KeyError(case_id)
+
+    def __contains__(self, case_id: object) -> bool:
+        return self._conn.execute(SELECT_COUNTS, (case_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._conn.execute(COUNT_CASES).fetchone()[0]
+
+    def __iter__(self):
+        for (case_id,) in self._conn.execute(SELECT_IDS):
+            yield case_id
+
+    def get(self, case_id: str, default=None):
+        case = self.get_case(case_id)
+        return default if case is None else case
+
+    def get_case(self, case_id: str) -> Case | None:
+        with self._read() as conn:
+            row = conn.execute(SELECT_CASE, (case_id,)).fetchone()
+            if row is None:
+                return None
+            return self._load(case_id, row[0])
+
+    def add_case(self, case: Case) -> str:
+        """Add or replace a case, rewriting its comments and changes."""
+        self.add_cases([case])
+        return case.id
+
+    def add_cases(self, cases, chunk_size: int = 1000) -> int:
+        """Write many cases in one transaction, inserting them in executemany chunks."""
+        count = 0
+        with self.batch():
+            chunk = []
+            for case in cases:
+                chunk.append(case)
+                if len(chunk) >= chunk_size:
+                    count += self._write_chunk(chunk)
+                    chunk = []
+            if chunk:
+                count += self._write_chunk(chunk)
+        return count
+
+    def _write_chunk(self, cases: list[Case]) -> int:
+        conn = self._conn
+        ids = [(case.id, 0) for case in cases]
+        conn.executemany(DELETE_COMMENTS_FROM, ids)
+        conn.executemany(DELETE_CHANGES_FROM, ids)
+        comment_rows, change_rows, case_rows = [], [], []
+        for case in cases:
+            comments = [comment.model_dump_json() for comment in case.comments]
+            changes = [change.model_dump_json() for change in case.change_history]
+            comment_rows.extend((case.id, seq, data) for seq, data in enumerate(comments))
+            change_rows.extend((case.id, seq, data) for seq, data in enumerate(changes))
+            case_rows.append(self._case_row(case, _digest(comments).hexdigest(), _digest(changes).hexdigest()))
+        conn.executemany(UPSERT_CASE, case_rows)
+        conn.executemany(INSERT_COMMENT, comment_rows)
+        conn.executemany(INSERT_CHANGE, change_rows)
+        return len(cases)
+
+    def remove_case(self, case_id: str) -> bool:
+        with self.batch():
+            conn = self._conn
+            removed = conn.execute(DELETE_CASE, (case_id,)).rowcount > 0
+            conn.execute(DELETE_COMMENTS_FROM, (case_id, 0))
+            conn.execute(DELETE_CHANGES_FROM, (case_id, 0))
+        return removed
+
+    def save(self, case: Case):
+        """Write back a case changed in place, appending only its new comments and changes.
+
+        Comments and changes are append-only in the tools. If the stored ones are
+        no longer a prefix of the case's (fewer of them now, or one edited in
+        place, which the digest of that prefix catches), the list is rewritten.
+        """
+        with self.batch():
+            conn = self._conn
+            row = conn.execute(SELECT_COUNTS, (case.id,)).fetchone()
+            if row is None:
+                raise KeyError(case.id)
+            n_comments, n_changes, comments_digest, changes_digest = row
+            comments = [comment.model_dump_json() for comment in case.comments]
+            changes = [change.model_dump_json() for change in case.change_history]
+            comments_digest, n_comments = self._appended(conn, DELETE_COMMENTS_FROM, case.id, comments,
+                                                         n_comments, comments_digest)
+            changes_digest, n_changes = self._appended(conn, DELETE_CHANGES_FROM, case.id, changes,
+                                                       n_changes, changes_digest)
+            conn.execute(UPSERT_CASE, self._case_row(case, comments_digest, changes_digest))
+            conn.executemany(INSERT_COMMENT, [(case.id, seq, comments[seq]) for seq in range(n_comments, len(comments))])
+            conn.executemany(INSERT_CHANGE, [(case.id, seq, changes[seq]) for seq in range(n_changes, len(changes))])
+
+    @staticmethod
+    def _appended(conn, delete: str, case_id: str, rows: list[str], n_stored: int, stored_digest: str) -> tuple[str, int]:
+        """(digest of all rows, how many are already stored), deleting the stored ones if they are not a prefix."""
+        digest = _digest(rows[:n_stored])
+        if len(rows) < n_stored or digest.hexdigest() != stored_digest:
+            conn.execute(delete, (case_id, 0))
+            return _digest(rows).hexdigest(), 0
+        for data in rows[n_stored:]:
+            digest.update(data.encode())
+            digest.update(b"\0")
+        return digest.hexdigest(), n_stored
+
+    def list_cases(self) -> list[Case]:
+        return self._select("", ())
+
+    def iter_cases(self, chunk_size: int = 1000):
+        """Every case, read chunk_size at a time through the same three set-based queries as list_cases."""
+        last = 0
+        while True:
+            end = self._conn.execute(PAGE_END, (last, chunk_size)).fetchone()[0]
+            if end is None:
+                return
+            yield from self._select(" WHERE cases.rowid > ? AND cases.rowid <= ?", (last, end))
+            last = end
+
+    def list_cases_by_state(self, state: CaseState | str) -> list[Case]:
+        return self.find_cases(state=state)
+
+    def list_cases_by_priority(self, priority: Priority | str) -> list[Case]:
+        return self.find_cases(priority=priority)
+
+    def list_cases_by_component(self, component: Component | str) -> list[Case]:
+        return self.find_cases(component=component)
+
+    def list_cases_by_assignee(self, assignee_id: str) -> list[Case]:
+        return self.find_cases(assignee_id=assignee_id)
+
+    def list_cases_by_customer(self, customer: str) -> list[Case]:
+        return self.find_cases(customer=customer)
+
+    def find_cases(self, state=None, priority=None, component=None, assignee_id=None, customer=None) -> list[Case]:
+        """Return cases matching every given filter, using the column indexes."""
+        columns = {
+            "state": None if state is None else CaseState(state).value,
+            "priority": None if priority is None else Priority(priority).value,
+            "component": None if component is None else Component(component).value,
+            "assignee_id": assignee_id,
+            "customer": customer,
+        }
+        clauses, params = [], []
+        for column, value in columns.items():
+            if value is not None:
+                clauses.append(f"cases.{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(where, params)
+
+    def _select(self, where: str, params) -> list[Case]:
+        """Cases matching a WHERE clause over the cases table, in three queries whatever their number."""
+        with self._read() as conn:
+            rows = conn.execute(SELECT_CASES.format(where=where), params).fetchall()
+            comments: dict[str, list[Comment]] = {}
+            for case_id, data in conn.execute(SELECT_CASES_COMMENTS.format(where=where), params):
+                comments.setdefault(case_id, []).append(Comment.model_validate_json(data))
+            changes: dict[str, list[Change]] = {}
+            for case_id, data in conn.execute(SELECT_CASES_CHANGES.format(where=where), params):
+                changes.setdefault(case_id, []).append(Change.model_validate_json(data))
+        return [self._build(data, comments.get(case_id, []), changes.get(case_id, [])) for case_id, data in rows]
+
+    @contextmanager
+    def _read(self):
+        """A deferred read transaction (unless a batch is open), so every query in it sees one snapshot."""
+        conn = self._conn
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            if own_transaction:
+                conn.execute("COMMIT")
+
+    def _load(self, case_id: str, data: str) -> Case:
+        conn = self._conn
+        comments = [Comment.model_validate_json(r[0]) for r in conn.execute(SELECT_COMMENTS, (case_id,))]
+        changes = [Change.model_validate_json(r[0]) for r in conn.execute(SELECT_CHANGES, (case_id,))]
+        return self._build(data, comments, changes)
+
+    @staticmethod
+    def _build(data: str, comments: list[Comment], changes: list[Change]) -> Case:
+        fields = json.loads(data)
+        fields["comments"] = comments
+        fields["change_history"] = changes
+        return Case.model_validate(fields)
+
+    @staticmethod
+    def _case_row(case: Case, comments_digest: str, changes_digest: str) -> tuple:
+        return (
+            case.id,
+            case.state.value,
+            case.priority.value,
+            case.component.value,
+            case.assignee.id,
+            case.customer,
+            len(case.comments),
+            len(case.change_history),
+            comments_digest,
+            changes_digest,
+            case.model_dump_json(exclude={"comments", "change_history"}),
+        )
+
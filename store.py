@@ -0,0 +1,225 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from simple_model import Case, CaseState, Priority, Component
+
+
+class CaseStore:
+    """In-memory case store with secondary indexes on the fields triage filters by.
+
+    The indexes map a field value to the ids of the cases that currently hold it,
+    so the list_cases_by_* lookups cost O(matches) instead of a scan over every case.
+    Anything that mutates a case in place must call save(case) afterwards so the
+    indexes follow the new values.
+
+    Cases restored from a snapshot (see journal.py) are filed in the indexes
+    straight away but only decoded into Case objects the first time they are read.
+
+    Writes and index walks hold an RLock, so tools running on worker threads
+    (see runner.py) can share one store.
+    """
+
+    INDEXED_FIELDS = ("state", "priority", "component", "assignee", "customer")
+
+    def __init__(self):
+        self.cases: dict[str, Case] = {}
+        # case_id -> snapshot reader for cases not decoded yet
+        self._lazy: dict[str, object] = {}
+        # field -> value -> {case_id: None}; dicts keep insertion order and O(1) removal
+        self._indexes = {field: defaultdict(dict) for field in self.INDEXED_FIELDS}
+        # case_id -> the index keys the case was last filed under
+        self._keys: dict[str, tuple] = {}
+        # Optional journal.CaseJournal that logs every write
+        self.journal = None
+        self._lock = threading.RLock()
+
+    # Dict-style access so existing `case_store[case_id]` callers keep working
+    def __getitem__(self, case_id: str) -> Case:
+        case = self.get_case(case_id)
+        if case is None:
+            raise KeyError(case_id)
+        return case
+
+    def __setitem__(self, case_id: str, case: Case):
+        if case_id != case.id:
+            raise ValueError(f"Case id mismatch: {case_id} != {case.id}")
+        self.add_case(case)
+
+    def __delitem__(self, case_id: str):
+        if not self.remove_case(case_id):
+            raise KeyError(case_id)
+
+    def __contains__(self, case_id: object) -> bool:
+        return case_id in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def get(self, case_id: str, default=None):
+        case = self.get_case(case_id)
+        return default if case is None else case
+
+    def add_case(self, case: Case) -> str:
+        """Add or replace a case and file it in every index."""
+        with self._lock:
+            self._lazy.pop(case.id, None)
+            self.cases[case.id] = case
+            self._reindex(case.id, self._index_keys(case))
+            if self.journal is not None:
+                self.journal.record_put(case)
+        return case.id
+
+    def add_cases(self, cases) -> int:
+        count = 0
+        for case in cases:
+            self.add_case(case)
+            count += 1
+        return count
+
+    def iter_cases(self, chunk_size: int = 1000):
+        """Every case, decoded one at a time. chunk_size only matters to SQLiteCaseStore."""
+        with self._lock:
+            case_ids = list(self._keys)
+        for case_id in case_ids:
+            case = self.get_case(case_id)
+            if case is not None:
+                yield case
+
+    def add_lazy(self, case_id: str, index_keys: tuple, reader):
+        """File a case that `reader.load(case_id)` will decode on first access."""
+        with self._lock:
+            self.cases.pop(case_id, None)
+            self._lazy[case_id] = reader
+            self._reindex(case_id, tuple(index_keys))
+
+    @contextmanager
+    def batch(self):
+        """No-op here; SQLiteCaseStore uses it to group writes into one transaction."""
+        yield self
+
+    def get_case(self, case_id: str) -> Case | None:
+        case = self.cases.get(case_id)
+        if case is None and case_id in self._lazy:
+            with self._lock:
+                case = self.cases.get(case_id)
+                if case is None and case_id in self._lazy:
+                    case = self._lazy.pop(case_id).load(case_id)
+                    self.cases[case_id] = case
+        return case
+
+    def remove_case(self, case_id: str) -> bool:
+        with self._lock:
+            if case_id not in self._keys:
+                return False
+            self.cases.pop(case_id, None)
+            self._lazy.pop(case_id, None)
+            self._unindex(case_id)
+            if self.journal is not None:
+                self.journal.record_remove(case_id)
+        return True
+
+    def save(self, case: Case):
+        """Record in-place changes to a case, moving it between index buckets as needed."""
+        with self._lock:
+            if case.id not in self._keys:
+                raise KeyError(case.id)
+            self._lazy.pop(case.id, None)
+            self.cases[case.id] = case
+            self._reindex(case.id, self._index_keys(case))
+            if self.journal is not None:
+                self.journal.record_save(case)
+
+    def list_cases(self) -> list[Case]:
+        with self._lock:
+            case_ids = list(self._keys)
+        return [self.get_case(case_id) for case_id in case_ids]
+
+    def list_cases_by_state(self, state: CaseState | str) -> list[Case]:
+        return self._lookup("state", CaseState(state).value)
+
+    def list_cases_by_priority(self, priority: Priority | str) -> list[Case]:
+        return self._lookup("priority", Priority(priority).value)
+
+    def list_cases_by_component(self, component: Component | str) -> list[Case]:
+        return self._lookup("component", Component(component).value)
+
+    def list_cases_by_assignee(self, assignee_id: str) -> list[Case]:
+        return self._lookup("assignee", assignee_id)
+
+    def list_cases_by_customer(self, customer: str) -> list[Case]:
+        return self._lookup("customer", customer)
+
+    def find_cases(self, state=None, priority=None, component=None, assignee_id=None, customer=None) -> list[Case]:
+        """Return cases matching every given filter, walking only the smallest index bucket."""
+        filters = {}
+        if state is not None:
+            filters["state"] = CaseState(state).value
+        if priority is not None:
+            filters["priority"] = Priority(priority).value
+        if component is not None:
+            filters["component"] = Component(component).value
+        if assignee_id is not None:
+            filters["assignee"] = assignee_id
+        if customer is not None:
+            filters["customer"] = customer
+        if not filters:
+            return self.list_cases()
+
+        with self._lock:
+            buckets = [self._indexes[field].get(value, {}) for field, value in filters.items()]
+            buckets.sort(key=len)
+            smallest, rest = buckets[0], buckets[1:]
+            case_ids = [case_id for case_id in smallest if all(case_id in bucket for bucket in rest)]
+        return [self.get_case(case_id) for case_id in case_ids]
+
+    def index_keys(self, case_id: str) -> tuple | None:
+        """The (state, priority, component, assignee id, customer) a case is filed under."""
+        return self._keys.get(case_id)
+
+    def _lookup(self, field: str, value) -> list[Case]:
+        with self._lock:
+            case_ids = list(self._indexes[field].get(value, {}))
+        return [self.get_case(case_id) for case_id in case_ids]
+
+    @staticmethod
+    def _index_keys(case: Case) -> tuple:
+        return (
+            case.state.value,
+            case.priority.value,
+            case.component.value,
+            case.assignee.id,
+            case.customer,
+        )
+
+    def _reindex(self, case_id: str, new_keys: tuple):
+        old_keys = self._keys.get(case_id)
+        if old_keys == new_keys:
+            return
+        for field, old, new in zip(self.INDEXED_FIELDS, old_keys or (None,) * len(new_keys), new_keys):
+            if old_keys is not None and old == new:
+                continue
+            index = self._indexes[field]
+            if old_keys is not None:
+                self._discard(index, old, case_id)
+            if new is not None:
+                index[new][case_id] = None
+        self._keys[case_id] = new_keys
+
+    def _unindex(self, case_id: str):
+        old_keys = self._keys.pop(case_id, None)
+        if old_keys is None:
+            return
+        for field, old in zip(self.INDEXED_FIELDS, old_keys):
+            self._discard(self._indexes[field], old, case_id)
+
+    @staticmethod
+    def _discard(index: dict, value, case_id: str):
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        bucket.pop(case_id, None)
+        if not bucket:
+            del index[value]
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from simple_model import Comment
+
+
+WINDOW_PROMPT = (
+    "Summarize these support case comments for a developer taking over the case. "
+    "Keep who investigated what, findings, root cause, fixes and open questions. Be concise."
+)
+MERGE_PROMPT = (
+    "Merge these partial summaries of one support case, in chronological order, into a single "
+    "concise summary. Keep who investigated what, findings, root cause, fixes and open questions."
+)
+
+
+def llm_summarizer(kind: str | None = None):
+    """summarize_fn that calls agent_graph.make_chat_model() without tools, created on first use.
+
+    So it goes through the same response cache as the agent, and CHAT_MODEL=scripted
+    (or kind="scripted") keeps it offline.
+    """
+    llm = None
+
+    def summarize(text: str, level: int) -> str:
+        nonlocal llm
+        from langchain_core.messages import SystemMessage, HumanMessage
+        if llm is None:
+            from agent_graph import make_chat_model
+            llm = make_chat_model([], kind)
+        prompt = WINDOW_PROMPT if level == 0 else MERGE_PROMPT
+        return llm.invoke([SystemMessage(content=prompt), HumanMessage(content=text)]).content
+
+    return summarize
+
+
+def format_comment(comment: Comment) -> str:
+    return f"[{comment.created_at}] {comment.author}: {comment.content}"
+
+
+class CommentSummarizer:
+    """Hierarchical map-reduce summarizer for long comment threads.
+
+    Comments are cut into fixed windows of `window` comments from the start of
+    the thread, each window is summarized (map) and groups of `fanout` summaries
+    are merged level by level until one root remains (reduce). Every node is
+    cached by a hash of its input text, so when a comment is appended only the
+    last window and the nodes above it are recomputed: the last window and the
+    root for threads up to window * fanout comments, one extra node per level
+    beyond that.
+
+    `summarize_fn(text, level)` does the actual summarizing; level 0 is a window
+    of raw comments, higher levels are merges. It defaults to llm_summarizer().
+    """
+
+    def __init__(self, summarize_fn=None, window: int = 20, fanout: int = 8, cache_size: int = 10000):
+        self.summarize_fn = summarize_fn or llm_summarizer()
+        self.window = window
+        self.fanout = fanout
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def summarize(self, comments: list[Comment]) -> str:
+        if not comments:
+            return ""
+        level = 0
+        nodes = [
+            self._node("\n".join(format_comment(c) for c in comments[i:i + self.window]), level)
+            for i in range(0, len(comments), self.window)
+        ]
+        while len(nodes) > 1:
+            level += 1
+            nodes = [
+                self._node("\n\n".join(nodes[i:i + self.fanout]), level)
+                for i in range(0, len(nodes), self.fanout)
+            ]
+        return nodes[0]
+
+    def _node(self, text: str, level: int) -> str:
+        key = hashlib.sha256(f"{level}\0{text}".encode()).hexdigest()
+        with self._lock:
+            summary = self._cache.get(key)
+            if summary is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return summary
+            self.misses += 1
+        summary = self.summarize_fn(text, level)
+        with self._lock:
+            self._cache[key] = summary
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return summary
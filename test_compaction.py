@@ -0,0 +1,79 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from compaction import HistoryCompactor, estimate_tokens
+
+
+def turn(step: int, name: str, args: dict, result: str) -> list:
+    call_id = f"call_{step}"
+    return [
+        AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": call_id, "type": "tool_call"}], id=f"ai_{step}"),
+        ToolMessage(content=result, tool_call_id=call_id, name=name, id=f"tool_{step}"),
+    ]
+
+
+def history(n_turns: int, result_chars: int = 2000) -> list:
+    messages = [HumanMessage(content="Triage CASE-2025-002.", id="request")]
+    for step in range(n_turns):
+        messages += turn(step, "check_past_cases", {"case_id": f"CASE-{step}"}, f"result {step} " + "x" * result_chars)
+    return messages
+
+
+def apply(messages: list, updates: list) -> list:
+    by_id = {message.id: message for message in updates}
+    return [by_id.get(message.id, message) for message in messages]
+
+
+def test_old_results_are_digested_and_recent_turns_kept():
+    compactor = HistoryCompactor(keep_turns=2, digest_chars=100, token_budget=100000)
+    messages = history(4)
+    compacted = apply(messages, compactor.compact(messages))
+
+    for message in compacted[2:6:2]:
+        assert message.response_metadata["compacted"] == "digest"
+        assert len(message.content) <= 100
+    assert compacted[6:] == messages[6:]
+    assert compacted[0] is messages[0]
+    # Every tool call still has its result
+    assert [m.tool_call_id for m in compacted if isinstance(m, ToolMessage)] == [f"call_{i}" for i in range(4)]
+
+
+def test_repeated_call_stubs_the_earlier_result():
+    compactor = HistoryCompactor(keep_turns=1, digest_chars=100, token_budget=100000)
+    messages = history(1) + turn(1, "check_past_cases", {"case_id": "CASE-0"}, "fresh result")
+    compacted = apply(messages, compactor.compact(messages))
+    assert compacted[2].response_metadata["compacted"] == "superseded"
+    assert compacted[4].content == "fresh result"
+
+
+def test_history_is_brought_under_the_budget_without_touching_the_request():
+    compactor = HistoryCompactor(keep_turns=1, digest_chars=300, token_budget=1000)
+    messages = history(12)
+    assert estimate_tokens(messages) > 6000
+    compacted = apply(messages, compactor.compact(messages))
+
+    assert estimate_tokens(compacted) <= 1000
+    # Digests alone don't fit; the oldest results are dropped to stubs
+    assert compacted[2].response_metadata["compacted"] == "stub"
+    assert compacted[0] is messages[0]
+    assert compacted[-2:] == messages[-2:]
+
+
+def test_long_ai_and_human_messages_count_against_the_budget():
+    compactor = HistoryCompactor(keep_turns=1, digest_chars=200, token_budget=400)
+    messages = [
+        HumanMessage(content="Earlier request " + "detail " * 500, id="old_request"),
+        AIMessage(content="Earlier answer " + "analysis " * 500, id="old_answer"),
+        HumanMessage(content="Triage CASE-2025-002.", id="request"),
+        *turn(0, "check_past_cases", {"case_id": "CASE-2025-002"}, "short"),
+    ]
+    compacted = apply(messages, compactor.compact(messages))
+
+    assert compacted[0].response_metadata["compacted"] == "digest"
+    assert compacted[1].response_metadata["compacted"] == "digest"
+    assert compacted[2] is messages[2]
+    assert estimate_tokens(compacted) <= 400
+
+
+def test_second_pass_changes_nothing():
+    compactor = HistoryCompactor(keep_turns=1, digest_chars=100, token_budget=500)
+    messages = apply(history(6), HistoryCompactor(keep_turns=1, digest_chars=100, token_budget=500).compact(history(6)))
+    assert compactor.compact(messages) == []
@@ -0,0 +1,87 @@
+import threading
+import time
+from cases import load_all_cases
+from durable_queue import DurableCaseQueue, DurableWorker
+
+
+def make_queue(tmp_path, **kwargs) -> DurableCaseQueue:
+    case_queue = DurableCaseQueue(str(tmp_path / "queue.sqlite3"), **kwargs)
+    case_queue.enqueue(load_all_cases()["incoming_case"])
+    return case_queue
+
+
+def test_expired_lease_is_redelivered_and_stale_owner_cannot_finish(tmp_path):
+    case_queue = make_queue(tmp_path, visibility_timeout=0.05)
+    case_queue.register("w1")
+    case_queue.register("w2")
+    first = case_queue.claim("w1")
+    assert case_queue.claim("w2") is None
+
+    time.sleep(0.1)
+    second = case_queue.claim("w2")
+    assert second.case_id == first.case_id and second.redelivery
+    assert not case_queue.heartbeat(first)
+    assert not case_queue.complete(first)
+    assert case_queue.complete(second)
+    assert case_queue.counts() == {"done": 1}
+
+    workers = {w["worker_id"]: w for w in case_queue.worker_stats()}
+    assert workers["w1"]["lost_leases"] == 1
+    assert workers["w2"]["redelivered"] == 1 and workers["w2"]["completed"] == 1
+
+
+def test_parked_after_max_attempts(tmp_path):
+    case_queue = make_queue(tmp_path, max_attempts=2)
+    for _ in range(2):
+        lease = case_queue.claim("w1")
+        assert case_queue.fail(lease, "boom")
+    assert case_queue.claim("w1") is None
+    assert case_queue.counts() == {"dead": 1}
+
+
+def test_parked_after_max_expired_leases(tmp_path):
+    expiring = make_queue(tmp_path, visibility_timeout=0.01, max_attempts=2)
+    for _ in range(2):
+        assert expiring.claim("w1") is not None
+        time.sleep(0.02)
+    assert expiring.claim("w1") is None
+    assert expiring.counts() == {"dead": 1}
+
+
+def test_worker_heartbeats_a_slow_handler_that_makes_progress(tmp_path):
+    case_queue = make_queue(tmp_path, visibility_timeout=0.2)
+
+    def handler(case_id, still_leased):
+        for _ in range(6):
+            time.sleep(0.1)
+            assert still_leased()
+
+    worker = DurableWorker(case_queue, handler, "w1", heartbeat_interval=0.05)
+    assert worker.run(exit_when_idle=True) == 1
+    worker.stop()
+    assert case_queue.counts() == {"done": 1}
+
+
+def test_hung_handler_loses_its_lease(tmp_path):
+    case_queue = make_queue(tmp_path, visibility_timeout=0.2)
+    release = threading.Event()
+    seen = []
+
+    def handler(case_id, still_leased):
+        release.wait(5.0)
+        seen.append(still_leased())
+        if not seen[-1]:
+            raise RuntimeError("lease lost")
+
+    worker = DurableWorker(case_queue, handler, "w1", heartbeat_interval=0.05, max_step_seconds=0.3)
+    thread = threading.Thread(target=worker.run, kwargs={"max_cases": 1})
+    thread.start()
+    time.sleep(0.7)
+    redelivered = case_queue.claim("w2")
+    release.set()
+    thread.join(5.0)
+    worker.stop()
+
+    assert redelivered is not None and redelivered.redelivery
+    assert seen == [False]
+    assert case_queue.complete(redelivered)
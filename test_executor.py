@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+from executor import ParallelToolNode
+
+
+class Tracker:
+    """Records call order and how many calls were running on each case at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running: dict[str, int] = {}
+        self.peak: dict[str, int] = {}
+        self.overall = 0
+        self.peak_overall = 0
+        self.order: list[str] = []
+
+    def run(self, label: str, case_id: str) -> str:
+        with self.lock:
+            self.running[case_id] = self.running.get(case_id, 0) + 1
+            self.peak[case_id] = max(self.peak.get(case_id, 0), self.running[case_id])
+            self.overall += 1
+            self.peak_overall = max(self.peak_overall, self.overall)
+            self.order.append(label)
+        time.sleep(0.05)
+        with self.lock:
+            self.running[case_id] -= 1
+            self.overall -= 1
+        return f"{label} {case_id}"
+
+
+def make_tools(tracker: Tracker):
+    def change_case_state(case_id: str, state: str) -> str:
+        """Change the state."""
+        return tracker.run(f"state={state}", case_id)
+
+    def add_comment(case_id: str, message: str) -> str:
+        """Add a comment."""
+        return tracker.run(f"comment={message}", case_id)
+
+    def check_past_cases(case_id: str) -> str:
+        """Read past cases."""
+        return tracker.run("check", case_id)
+
+    return [
+        StructuredTool.from_function(change_case_state, metadata={"mutates_case": True}),
+        StructuredTool.from_function(add_comment, metadata={"mutates_case": True}),
+        StructuredTool.from_function(check_past_cases),
+    ]
+
+
+def call(i: int, name: str, **args) -> dict:
+    return {"name": name, "args": args, "id": f"call_{i}", "type": "tool_call"}
+
+
+def turn(*calls) -> dict:
+    return {"messages": [AIMessage(content="", tool_calls=list(calls))]}
+
+
+def test_mutations_of_one_case_run_in_emitted_order():
+    tracker = Tracker()
+    node = ParallelToolNode(make_tools(tracker))
+    state = turn(
+        call(0, "change_case_state", case_id="CASE-1", state="in_progress"),
+        call(1, "check_past_cases", case_id="CASE-1"),
+        call(2, "add_comment", case_id="CASE-1", message="a"),
+        call(3, "add_comment", case_id="CASE-2", message="b"),
+        call(4, "check_past_cases", case_id="CASE-3"),
+    )
+    messages = node.invoke(state)["messages"]
+
+    assert [m.tool_call_id for m in messages] == [f"call_{i}" for i in range(5)]
+    assert tracker.peak["CASE-1"] == 1
+    ordered = [label for label in tracker.order if label in ("state=in_progress", "check", "comment=a")]
+    assert ordered.index("state=in_progress") < ordered.index("comment=a")
+    # CASE-1's group, CASE-2's call and CASE-3's read overlap with each other
+    assert tracker.peak_overall >= 2
+    assert all("elapsed_ms" in m.response_metadata for m in messages)
+    assert node.stats()["add_comment"]["calls"] == 2
+
+
+def test_reads_of_unmutated_cases_run_in_parallel():
+    tracker = Tracker()
+    node = ParallelToolNode(make_tools(tracker))
+    calls = [call(i, "check_past_cases", case_id="CASE-1") for i in range(4)]
+    assert len(node.groups(calls)) == 4
+    asyncio.run(node.ainvoke(turn(*calls)))
+    assert tracker.peak["CASE-1"] == 4
+
+
+def test_unknown_tool_becomes_an_error_result():
+    node = ParallelToolNode(make_tools(Tracker()))
+    messages = node.invoke(turn(call(0, "delete_everything", case_id="CASE-1")))["messages"]
+    assert messages[0].status == "error"
+    assert "delete_everything is not a valid tool" in messages[0].content
@@ -0,0 +1,73 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from cases import load_all_cases
+from guard import LoopGuard
+from store import CaseStore
+
+
+def call(i: int, name: str, **args) -> dict:
+    return {"name": name, "args": args, "id": f"call_{i}", "type": "tool_call"}
+
+
+def run(guard: LoopGuard, *turns, run_id: str = "run-1") -> list[dict]:
+    """Feed tool-calling turns to the guard; the state update each turn got."""
+    messages = [HumanMessage(content="Triage CASE-2025-002", id=run_id)]
+    updates = []
+    for calls in turns:
+        messages.append(AIMessage(content="", tool_calls=list(calls)))
+        updates.append(guard({"messages": messages}))
+    return updates
+
+
+def test_repeated_call_stops_the_run():
+    guard = LoopGuard(max_repeats=1)
+    check = [call(0, "check_past_cases", case_id="CASE-2025-002")]
+    updates = run(guard, check, check, check)
+
+    assert updates[:2] == [{}, {}]
+    stop = updates[2]
+    assert stop["stop_reason"]["reason"] == "repeat"
+    assert stop["stop_reason"]["tool"] == "check_past_cases"
+    skipped, final = stop["messages"]
+    assert isinstance(skipped, ToolMessage) and skipped.tool_call_id == "call_0" and skipped.status == "error"
+    assert final.content.startswith("Stopped the run (repeat)")
+    assert guard.stats()["stopped"] == {"repeat": 1}
+
+
+def test_field_set_back_to_an_earlier_value_is_oscillation():
+    guard = LoopGuard()
+    updates = run(
+        guard,
+        [call(0, "change_case_state", case_id="CASE-2025-002", state="in_progress")],
+        [call(1, "update_case", case_id="CASE-2025-002", state="new")],
+    )
+    # Without a store, "new" was never seen in this run
+    assert updates == [{}, {}]
+
+    store = CaseStore()
+    store.add_cases(load_all_cases().values())
+    guard = LoopGuard(store=store)
+    updates = run(
+        guard,
+        [call(0, "change_case_state", case_id="CASE-2025-002", state="in_progress")],
+        [call(1, "update_case", case_id="CASE-2025-002", state="new")],
+    )
+    reason = updates[1]["stop_reason"]
+    assert reason["reason"] == "oscillation"
+    assert reason["values"] == ["new", "in_progress", "new"]
+
+
+def test_turn_limit():
+    guard = LoopGuard(max_turns=3)
+    turns = [[call(i, "check_past_cases", case_id=f"CASE-{i}")] for i in range(4)]
+    updates = run(guard, *turns)
+    assert updates[:3] == [{}, {}, {}]
+    assert updates[3]["stop_reason"]["reason"] == "turn_limit"
+
+
+def test_runs_are_traced_separately_and_bounded():
+    guard = LoopGuard(max_repeats=0, max_runs=2)
+    check = [call(0, "check_past_cases", case_id="CASE-2025-002")]
+    for run_id in ("run-1", "run-2", "run-3"):
+        assert run(guard, check, run_id=run_id) == [{}]
+    assert guard.stats()["runs_tracked"] == 2
+    assert run(guard, check, run_id="run-3")[0]["stop_reason"]["reason"] == "repeat"
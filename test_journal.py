@@ -0,0 +1,117 @@
+import threading
+from datetime import datetime, timedelta
+from simple_model import Assignee, Case, CaseState, Change, Comment, Component, Priority
+from journal import CaseJournal
+
+
+def make_case(n_changes: int) -> Case:
+    start = datetime(2025, 1, 1, 9, 0)
+    return Case(
+        id="CASE-J-001",
+        title="Export job fails",
+        description="Nightly export stops halfway.",
+        priority=Priority.MEDIUM,
+        state=CaseState.NEW,
+        assignee=Assignee(id="dev001", name="Dev", email="dev@company.com", department="Web"),
+        component=Component.WEBAPP,
+        created_at=start,
+        updated_at=start,
+        comments=[
+            Comment(id=f"C{i}", content=f"note {i}", author="dev001",
+                    created_at=start.isoformat(), updated_at=start.isoformat())
+            for i in range(5)
+        ],
+        change_history=[
+            Change(field="note", old_value=str(i), new_value=str(i + 1), changed_at=start + timedelta(minutes=i))
+            for i in range(n_changes)
+        ],
+    )
+
+
+def test_snapshot_threshold_crossed_mid_save_does_not_duplicate(tmp_path):
+    store = CaseJournal.open(str(tmp_path), snapshot_every=2)
+    case = make_case(5)
+    store.add_case(case)
+
+    # One save writing a comment and a change crosses snapshot_every partway through
+    now = datetime(2025, 1, 2, 9, 0)
+    case.comments.append(Comment(id="C5", content="more", author="dev001",
+                                 created_at=now.isoformat(), updated_at=now.isoformat()))
+    case.state = CaseState.IN_PROGRESS
+    case.change_history.append(Change(field="state", old_value="new", new_value="in_progress", changed_at=now))
+    store.save(case)
+    store.journal.close()
+
+    recovered = CaseJournal.open(str(tmp_path), snapshot_every=2)[case.id]
+    assert len(recovered.comments) == 6
+    assert len(recovered.change_history) == 6
+    assert recovered.state == CaseState.IN_PROGRESS
+
+
+def test_recovery_replays_log_tail(tmp_path):
+    store = CaseJournal.open(str(tmp_path), snapshot_every=3)
+    case = make_case(0)
+    store.add_case(case)
+    for i in range(4):
+        case.change_history.append(Change(field="priority", old_value=case.priority.value, new_value="high",
+                                          changed_at=datetime(2025, 1, 3, 9, i)))
+        case.priority = Priority.HIGH
+        store.save(case)
+    store.journal.close()
+
+    recovered = CaseJournal.open(str(tmp_path), snapshot_every=3)[case.id]
+    assert recovered.model_dump() == case.model_dump()
+
+
+def test_direct_snapshot_waits_for_a_write_in_progress(tmp_path):
+    store = CaseJournal.open(str(tmp_path))
+    case = make_case(0)
+    store.add_case(case)
+
+    # A save that holds the store lock, as any write does, mid-way through
+    started, release = threading.Event(), threading.Event()
+    record_save = store.journal.record_save
+
+    def slow_record_save(saved):
+        started.set()
+        release.wait(5)
+        record_save(saved)
+
+    store.journal.record_save = slow_record_save
+    case.priority = Priority.HIGH
+    case.change_history.append(Change(field="priority", old_value="medium", new_value="high",
+                                      changed_at=datetime(2025, 1, 3, 9, 0)))
+    writer = threading.Thread(target=store.save, args=(case,))
+    writer.start()
+    started.wait(5)
+    snapshotter = threading.Thread(target=store.journal.snapshot)
+    snapshotter.start()
+    snapshotter.join(0.2)
+    assert snapshotter.is_alive()
+    release.set()
+    writer.join()
+    snapshotter.join()
+    store.journal.close()
+
+    recovered = CaseJournal.open(str(tmp_path))[case.id]
+    assert recovered.model_dump() == case.model_dump()
+
+
+def test_in_place_edits_without_a_change_survive_recovery(tmp_path):
+    store = CaseJournal.open(str(tmp_path))
+    case = make_case(0)
+    store.add_case(case)
+
+    # update_case and SLAScheduler.escalate move updated_at, which no Change names
+    later = datetime(2025, 1, 5, 12, 0)
+    case.priority = Priority.HIGH
+    case.change_history.append(Change(field="priority", old_value="medium", new_value="high", changed_at=later))
+    case.updated_at = later
+    store.save(case)
+    case.title = "Export job fails at 50%"
+    store.save(case)
+    store.journal.close()
+
+    recovered = CaseJournal.open(str(tmp_path))[case.id]
+    assert recovered.updated_at == later
+    assert recovered.model_dump() == case.model_dump()
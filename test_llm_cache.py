@@ -0,0 +1,66 @@
+import itertools
+from langchain_core.messages import AIMessage, HumanMessage
+import llm_cache
+from llm_cache import CACHE_HIT_FLAG, CachedChatModel
+
+
+class EchoModel:
+    """Answers with the last message's content and counts the calls it gets."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"echo: {messages[-1].content}" + "." * 200, id=f"run-{self.calls}")
+
+
+def test_key_ignores_message_ids_and_metadata(tmp_path):
+    model = EchoModel()
+    cached = CachedChatModel(model, str(tmp_path / "cache.sqlite3"), "echo")
+    first = [HumanMessage(content="triage CASE-2025-002", id="a"),
+             AIMessage(content="ok", id="run-1", response_metadata={"latency": 1.0})]
+    second = [HumanMessage(content="triage CASE-2025-002", id="b"),
+              AIMessage(content="ok", id="run-7", response_metadata={"latency": 9.0})]
+    assert cached.key(first) == cached.key(second)
+    assert cached.key(first) != cached.key(first[:1])
+
+    cached.invoke(first)
+    response = cached.invoke(second)
+    assert model.calls == 1
+    assert response.response_metadata[CACHE_HIT_FLAG]
+    assert cached.stats()["hits"] == 1
+
+
+def test_evicts_least_recently_used_over_max_bytes(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(clock)))
+    model = EchoModel()
+    cached = CachedChatModel(model, str(tmp_path / "cache.sqlite3"), "echo")
+    one = [HumanMessage(content="one")]
+    cached.invoke(one)
+    # Room for three responses of this size, not four
+    cached.max_bytes = cached.stats()["bytes"] * 3 + 10
+
+    for text in ("two", "three"):
+        cached.invoke([HumanMessage(content=text)])
+    cached.invoke(one)  # "one" becomes the most recently used
+    cached.invoke([HumanMessage(content="four")])
+
+    assert cached.stats()["evictions"] == 1
+    assert cached.stats()["bytes"] <= cached.max_bytes
+    calls = model.calls
+    cached.invoke(one)
+    cached.invoke([HumanMessage(content="three")])
+    assert model.calls == calls
+    cached.invoke([HumanMessage(content="two")])
+    assert model.calls == calls + 1
+
+
+def test_bypass_leaves_cache_untouched(tmp_path):
+    model = EchoModel()
+    cached = CachedChatModel(model, str(tmp_path / "cache.sqlite3"), "echo", bypass=True)
+    cached.invoke([HumanMessage(content="one")])
+    cached.invoke([HumanMessage(content="one")])
+    assert model.calls == 2
+    assert cached.stats()["bytes"] == 0
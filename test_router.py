@@ -0,0 +1,101 @@
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+from cases import load_all_cases
+from router import CaseRouter
+from runner import case_request
+
+
+calls: list[tuple[str, dict]] = []
+
+
+@tool
+def review_app_design(case_id: str, message: str) -> str:
+    """Review the design."""
+    calls.append(("review_app_design", {"case_id": case_id}))
+    return "Working as designed: admin role required."
+
+
+@tool
+def update_case(case_id: str, comment: str | None = None, state: str | None = None) -> str:
+    """Update the case."""
+    calls.append(("update_case", {"case_id": case_id, "comment": comment, "state": state}))
+    return f"Case {case_id} updated"
+
+
+@tool
+def check_past_cases(case_id: str) -> str:
+    """Find past cases."""
+    calls.append(("check_past_cases", {"case_id": case_id}))
+    return "CASE-2025-001 (0.91)"
+
+
+@tool
+def synthesize_comments(case_id: str, mode: str = "message") -> str:
+    """Summarize the comments."""
+    calls.append(("synthesize_comments", {"case_id": case_id, "mode": mode}))
+    return "Summary"
+
+
+@tool
+def add_comment(case_id: str, message: str) -> str:
+    """Add a comment."""
+    calls.append(("add_comment", {"case_id": case_id, "message": message}))
+    return "Comment added"
+
+
+TOOLS = [review_app_design, update_case, check_past_cases, synthesize_comments, add_comment]
+
+
+def request(title: str, description: str = "Something is off.", instructions: str = "") -> HumanMessage:
+    case = load_all_cases()["incoming_case"].model_copy(
+        update={"id": "CASE-R-001", "title": title, "description": description})
+    return HumanMessage(content=case_request(case, instructions))
+
+
+def test_permission_fast_path_resolves_without_the_agent():
+    calls.clear()
+    router = CaseRouter(TOOLS)
+    added, finished = router.route([request("Permission denied when exporting reports")])
+
+    assert finished
+    assert [name for name, _ in calls] == ["review_app_design", "update_case"]
+    assert calls[1][1] == {"case_id": "CASE-R-001", "comment": "Working as designed: admin role required.",
+                           "state": "resolved"}
+    assert added[-1].content == "Handled case CASE-R-001 on the permission fast path."
+    assert router.stats() == {"permission": 1}
+
+
+def test_synthesis_fast_path_comments_the_summary():
+    calls.clear()
+    router = CaseRouter(TOOLS)
+    _, finished = asyncio.run(router.aroute([request("Customer follow-up", instructions="Please summarize the thread.")]))
+
+    assert finished
+    assert calls == [("synthesize_comments", {"case_id": "CASE-R-001", "mode": "extractive"}),
+                     ("add_comment", {"case_id": "CASE-R-001", "message": "Summary"})]
+
+
+def test_technical_cue_prefetches_past_cases_and_hands_over():
+    calls.clear()
+    router = CaseRouter(TOOLS)
+    added, finished = router.route([request("Export hangs since the last deploy")])
+
+    assert not finished
+    assert [name for name, _ in calls] == ["check_past_cases"]
+    assert isinstance(added[0], AIMessage) and added[0].tool_calls[0]["name"] == "check_past_cases"
+    assert router.stats() == {"technical": 1}
+
+
+def test_conflicting_or_description_only_cues_go_to_the_agent():
+    calls.clear()
+    router = CaseRouter(TOOLS)
+    # A permission cue next to a technical one is ambiguous
+    assert router.classify(request("Forbidden error since the last deploy").content) == (None, 0.0)
+    # Fast-path cues in the customer's description don't count
+    assert router.classify(request("Report question", "It says permission denied").content) == (None, 0.0)
+
+    added, finished = router.route([request("Question about invoices")])
+    assert (added, finished) == ([], False)
+    assert calls == []
+    assert router.stats() == {"agent": 1}
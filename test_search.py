@@ -0,0 +1,81 @@
+from cases import load_all_cases
+from search import BM25Index, HybridSearcher
+from similarity import PastCaseIndex
+from simple_model import CaseState, Component
+
+
+def test_open_and_resolved_cases_share_one_scale():
+    cases = list(load_all_cases().values())
+    bm25 = BM25Index()
+    bm25.build(cases)
+    vectors = PastCaseIndex()
+    vectors.build([case for case in cases if case.state == CaseState.RESOLVED])
+    searcher = HybridSearcher(bm25, vectors, alpha=0.5)
+
+    # CASE-2025-002 repeats the resolved CASE-2025-001 word for word
+    scores = dict(searcher.search("WebApp hangs when clicking Run Job", k=4))
+    assert scores["CASE-2025-001"] > scores["CASE-2025-002"]
+    assert scores["CASE-2025-002"] <= searcher.alpha + 1e-9
+    assert all(0.0 < score <= 1.0 + 1e-9 for score in scores.values())
+
+
+def test_filters_hold_after_cases_move_and_leave():
+    cases = list(load_all_cases().values())
+    bm25 = BM25Index()
+    bm25.build(cases)
+    vectors = PastCaseIndex()
+    vectors.build([case for case in cases if case.state == CaseState.RESOLVED])
+    searcher = HybridSearcher(bm25, vectors)
+
+    assert [case_id for case_id, _ in searcher.search("job hangs", k=4, component="applog")] == ["CASE-2025-001"]
+    assert searcher.search("job hangs", k=4, state="resolved", component="webapp") == []
+
+    moved = cases[1].model_copy(update={"component": Component.APPLOG})
+    bm25.upsert(moved)
+    bm25.remove("CASE-2025-001")
+    assert set(bm25.candidates(component="applog").ids()) == {moved.id}
+    assert "CASE-2025-001" not in bm25.candidates(state="resolved")
+
+
+def test_edited_title_is_reindexed():
+    cases = list(load_all_cases().values())
+    bm25 = BM25Index()
+    bm25.build(cases)
+
+    edited = cases[0].model_copy(update={"title": "Quarterly invoice totals are rounded wrong"})
+    bm25.upsert(edited)
+    assert edited.id in dict(bm25.search("invoice rounded", k=4))
+
+
+def test_narrow_filter_scores_only_candidate_rows():
+    cases = list(load_all_cases().values())
+    bm25 = BM25Index()
+    bm25.build(cases)
+    vectors = PastCaseIndex(prune_ratio=0.5)
+    vectors.build(cases)
+
+    candidates = bm25.candidates(component="applog")
+    assert len(candidates) <= vectors.prune_ratio * len(vectors)
+    narrow = vectors.query_text("job hangs", k=4, candidates=candidates)
+    assert [case_id for case_id, _ in narrow] == ["CASE-2025-001"]
+    # Same answer as scoring everything and filtering afterwards
+    vectors.prune_ratio = 0.0
+    assert vectors.query_text("job hangs", k=4, candidates=candidates) == narrow
+
+
+def test_writes_during_build_are_applied_afterwards():
+    cases = load_all_cases()
+    resolved = cases["historical_case"]
+    just_resolved = cases["incoming_case"].model_copy(update={"state": CaseState.RESOLVED})
+    vectors = PastCaseIndex()
+
+    def read_store():
+        # Another thread resolves one case and reopens another while the build reads the store
+        yield resolved
+        vectors.upsert(just_resolved)
+        vectors.remove(resolved.id)
+
+    vectors.build(read_store())
+    assert just_resolved.id in vectors
+    assert resolved.id not in vectors
+    assert [case_id for case_id, _ in vectors.query_text(just_resolved.title, k=1)] == [just_resolved.id]
@@ -0,0 +1,56 @@
+from sla import TimingWheel
+
+
+def run_until(wheel: TimingWheel, end: int) -> dict:
+    """Advance one tick at a time; key -> the tick it expired on."""
+    fired = {}
+    for tick in range(1, end + 1):
+        for key in wheel.advance(float(tick)):
+            fired[key] = tick
+    return fired
+
+
+def test_timers_cascade_down_and_fire_on_their_tick():
+    wheel = TimingWheel(tick=1.0, slots=(4, 4, 4), start=0.0)
+    deadlines = {"a": 3, "b": 4, "c": 5, "d": 17, "e": 40, "f": 63}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, float(deadline))
+    assert wheel._where["a"][0] == 0
+    assert wheel._where["c"][0] == 1
+    assert wheel._where["e"][0] == 2
+
+    assert run_until(wheel, 64) == deadlines
+    assert len(wheel) == 0
+
+
+def test_overflow_is_refiled_each_top_level_turn():
+    wheel = TimingWheel(tick=1.0, slots=(4, 4), start=0.0)
+    wheel.schedule("near", 10.0)
+    wheel.schedule("far", 37.0)
+    wheel.schedule("farther", 100.0)
+    assert wheel._where["far"] == "overflow"
+    assert wheel._where["farther"] == "overflow"
+
+    fired = run_until(wheel, 100)
+    assert fired == {"near": 10, "far": 37, "farther": 100}
+
+
+def test_reschedule_and_cancel():
+    wheel = TimingWheel(tick=1.0, slots=(4, 4, 4), start=0.0)
+    wheel.schedule("a", 30.0)
+    wheel.schedule("a", 6.0)
+    wheel.schedule("b", 50.0)
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+    # A deadline already past falls due on the next tick
+    wheel.advance(2.0)
+    wheel.schedule("late", 1.0)
+
+    assert run_until(wheel, 64) == {"late": 3, "a": 6}
+
+
+def test_advance_over_many_ticks_returns_keys_in_due_order():
+    wheel = TimingWheel(tick=1.0, slots=(4, 4, 4), start=0.0)
+    for key, deadline in (("x", 50.0), ("y", 7.0), ("z", 21.0)):
+        wheel.schedule(key, deadline)
+    assert wheel.advance(60.0) == ["y", "z", "x"]
@@ -0,0 +1,81 @@
+import pytest
+from datetime import datetime
+from cases import load_all_cases
+from simple_model import CaseState, Change, Comment
+from sqlite_store import SQLiteCaseStore
+
+
+def make_store(tmp_path) -> SQLiteCaseStore:
+    store = SQLiteCaseStore(str(tmp_path / "cases.sqlite3"))
+    store.add_cases(load_all_cases().values())
+    return store
+
+
+def rows(store: SQLiteCaseStore, table: str, case_id: str) -> list[tuple[int, str]]:
+    return store._conn.execute(f"SELECT seq, data FROM {table} WHERE case_id = ? ORDER BY seq", (case_id,)).fetchall()
+
+
+def test_save_appends_only_new_comments_and_changes(tmp_path):
+    store = make_store(tmp_path)
+    case = store["CASE-2025-002"]
+    before = rows(store, "comments", case.id)
+
+    now = datetime(2025, 3, 1, 9, 0)
+    case.comments.append(Comment(id="C-new", content="Reproduced on staging", author="dev001",
+                                 created_at=now.isoformat(), updated_at=now.isoformat()))
+    case.state = CaseState.IN_PROGRESS
+    case.change_history.append(Change(field="state", old_value="new", new_value="in_progress", changed_at=now))
+    store.save(case)
+
+    after = rows(store, "comments", case.id)
+    assert after[:len(before)] == before
+    assert len(after) == len(before) + 1
+    reloaded = store[case.id]
+    assert reloaded.comments[-1].content == "Reproduced on staging"
+    assert reloaded.change_history[-1].new_value == "in_progress"
+    assert [c.id for c in store.list_cases_by_state("in_progress")] == ["CASE-2025-002", "CASE-2025-003"]
+
+
+def test_save_rewrites_comment_edited_in_place(tmp_path):
+    store = make_store(tmp_path)
+    case = store["CASE-2025-001"]
+    n_comments = len(case.comments)
+    case.comments[0].content = "Edited"
+    store.save(case)
+
+    reloaded = store[case.id]
+    assert len(reloaded.comments) == n_comments
+    assert reloaded.comments[0].content == "Edited"
+
+
+def test_save_rewrites_shortened_history(tmp_path):
+    store = make_store(tmp_path)
+    case = store["CASE-2025-001"]
+    case.comments = case.comments[:1]
+    store.save(case)
+
+    assert len(store[case.id].comments) == 1
+    assert len(rows(store, "comments", case.id)) == 1
+
+
+def test_batch_rolls_back_every_write_on_error(tmp_path):
+    store = make_store(tmp_path)
+    case = store["CASE-2025-004"]
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            case.state = CaseState.RESOLVED
+            store.save(case)
+            with store.batch():
+                store.remove_case("CASE-2025-002")
+            raise RuntimeError("abort")
+
+    assert store["CASE-2025-004"].state == CaseState.NEW
+    assert "CASE-2025-002" in store
+    assert len(store) == 4
+
+
+def test_save_of_unknown_case_raises(tmp_path):
+    store = make_store(tmp_path)
+    case = store["CASE-2025-002"].model_copy(update={"id": "CASE-MISSING"})
+    with pytest.raises(KeyError):
+        store.save(case)
@@ -0,0 +1,61 @@
+import pytest
+from cases import load_all_cases
+from simple_model import Assignee, CaseState, Component, Priority
+from store import CaseStore
+
+
+def make_store() -> CaseStore:
+    store = CaseStore()
+    store.add_cases(case.model_copy(deep=True) for case in load_all_cases().values())
+    return store
+
+
+def ids(cases) -> set[str]:
+    return {case.id for case in cases}
+
+
+def test_save_moves_case_between_index_buckets():
+    store = make_store()
+    case = store["CASE-2025-002"]
+    case.state = CaseState.IN_PROGRESS
+    case.priority = Priority.VERY_HIGH
+    case.component = Component.APPLOG
+    case.assignee = Assignee(id="dev009", name="Nine", email="nine@company.com", department="Logs")
+    store.save(case)
+
+    assert "CASE-2025-002" not in ids(store.list_cases_by_state("new"))
+    assert "CASE-2025-002" in ids(store.list_cases_by_state("in_progress"))
+    assert "CASE-2025-002" not in ids(store.list_cases_by_component("webapp"))
+    assert ids(store.list_cases_by_component("applog")) == {"CASE-2025-001", "CASE-2025-002"}
+    assert ids(store.list_cases_by_assignee("dev009")) == {"CASE-2025-002"}
+    assert ids(store.find_cases(state="in_progress", priority="very_high")) == {"CASE-2025-002", "CASE-2025-003"}
+    assert store.index_keys("CASE-2025-002")[:4] == ("in_progress", "very_high", "applog", "dev009")
+
+
+def test_edit_without_save_leaves_indexes_alone():
+    store = make_store()
+    case = store["CASE-2025-004"]
+    case.state = CaseState.RESOLVED
+
+    assert "CASE-2025-004" in ids(store.list_cases_by_state("new"))
+    store.save(case)
+    assert "CASE-2025-004" in ids(store.list_cases_by_state("resolved"))
+
+
+def test_remove_drops_empty_buckets():
+    store = make_store()
+    assert store.remove_case("CASE-2025-001")
+    assert not store.remove_case("CASE-2025-001")
+
+    assert store.list_cases_by_component("applog") == []
+    assert "applog" not in store._indexes["component"]
+    assert "CASE-2025-001" not in store
+    assert len(store) == 3
+
+
+def test_save_of_unknown_case_raises():
+    store = make_store()
+    case = store["CASE-2025-002"].model_copy(update={"id": "CASE-MISSING"})
+    with pytest.raises(KeyError):
+        store.save(case)
+    assert "CASE-MISSING" not in store
@@ -0,0 +1,93 @@
+import queue
+import threading
+from datetime import datetime, timedelta
+import pytest
+from cases import load_all_cases
+from simple_model import Priority
+from work_queue import CaseQueue, CaseWorkerPool
+
+
+def make_case(case_id: str, priority: Priority, minutes: int):
+    base = load_all_cases()["incoming_case"]
+    return base.model_copy(update={"id": case_id, "priority": priority,
+                                   "created_at": datetime(2025, 1, 1, 9, 0) + timedelta(minutes=minutes)})
+
+
+def drain(case_queue: CaseQueue) -> list[str]:
+    order = []
+    while len(case_queue):
+        order.append(case_queue.get())
+        case_queue.task_done()
+    return order
+
+
+def test_served_by_priority_then_age():
+    case_queue = CaseQueue()
+    case_queue.put(make_case("low-old", Priority.LOW, 0))
+    case_queue.put(make_case("high-new", Priority.HIGH, 30))
+    case_queue.put(make_case("high-old", Priority.HIGH, 10))
+    case_queue.put(make_case("urgent", Priority.VERY_HIGH, 60))
+    case_queue.put(make_case("medium", Priority.MEDIUM, 5))
+    assert not case_queue.put(make_case("medium", Priority.MEDIUM, 5))
+
+    assert drain(case_queue) == ["urgent", "high-old", "high-new", "medium", "low-old"]
+    assert case_queue.stats()["enqueued"] == 5
+
+
+def test_full_queue_pushes_back_until_a_slot_frees():
+    case_queue = CaseQueue(maxsize=2)
+    case_queue.put(make_case("a", Priority.LOW, 0))
+    case_queue.put(make_case("b", Priority.LOW, 1))
+    with pytest.raises(queue.Full):
+        case_queue.put_nowait(make_case("c", Priority.LOW, 2))
+    with pytest.raises(queue.Full):
+        case_queue.put(make_case("c", Priority.LOW, 2), timeout=0.05)
+    assert case_queue.stats()["rejected"] == 2
+
+    producer = threading.Thread(target=case_queue.put, args=(make_case("c", Priority.LOW, 2),))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert case_queue.get() == "a"
+    producer.join(1.0)
+    assert not producer.is_alive()
+    assert case_queue.stats()["peak_depth"] == 2
+
+
+def test_pool_drains_the_queue_and_survives_failures():
+    case_queue = CaseQueue()
+    done = []
+
+    def handler(case_id: str) -> str:
+        if case_id.endswith("3"):
+            raise ValueError(case_id)
+        return case_id
+
+    pool = CaseWorkerPool(case_queue, handler, workers=3,
+                          on_done=lambda case_id, result, error: done.append((case_id, error is None))).start()
+    for i in range(10):
+        case_queue.put(make_case(f"case-{i}", Priority.MEDIUM, i))
+    assert case_queue.join(5.0)
+    pool.stop(5.0)
+
+    stats = pool.stats()
+    assert (stats["processed"], stats["failed"], stats["busy"]) == (9, 1, 0)
+    assert sorted(done) == sorted((f"case-{i}", i != 3) for i in range(10))
+    assert pool.errors[0][0] == "case-3"
+
+
+def test_on_done_error_does_not_stop_the_worker():
+    case_queue = CaseQueue()
+
+    def on_done(case_id, result, error):
+        raise RuntimeError("callback broke")
+
+    pool = CaseWorkerPool(case_queue, lambda case_id: case_id, workers=1, on_done=on_done).start()
+    for i in range(3):
+        case_queue.put(make_case(f"case-{i}", Priority.MEDIUM, i))
+    assert case_queue.join(5.0)
+    pool.stop(5.0)
+
+    assert pool.stats()["processed"] == 3
+    assert pool.stats()["callback_errors"] == 3
+    assert pool.errors[-1][1].startswith("on_done: RuntimeError")
@@ -1,9 +1,77 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial, wraps
 from simple_model import Comment, Assignee, CaseState, Priority, Component, Change
-from langchain_core.tools import tool
+from langchain_core.tools import tool, StructuredTool
+from store import CaseStore
+from sqlite_store import SQLiteCaseStore
+from journal import CaseJournal
+from similarity import PastCaseIndex, case_text
+from embedding_store import MappedPastCaseIndex
+from dedup import DuplicateIndex
+from search import BM25Index, HybridSearcher
+from summarize import CommentSummarizer
+from extractive import ExtractiveSummarizer
+from serialize import CaseSerializer, DETAIL_LEVELS
 
-# Global case store
-case_store = {}
+# Global case store. Set CASE_STORE_DB to a file path to keep cases in SQLite
+# instead of process memory, or CASE_STORE_JOURNAL to a directory to keep them
+# in memory with snapshot + change log recovery. Either way agent work survives a restart.
+if os.environ.get("CASE_STORE_DB"):
+    case_store = SQLiteCaseStore(os.environ["CASE_STORE_DB"])
+elif os.environ.get("CASE_STORE_JOURNAL"):
+    case_store = CaseJournal.open(os.environ["CASE_STORE_JOURNAL"])
+else:
+    case_store = CaseStore()
+
+# Similarity index over resolved cases, built on the first check_past_cases call and
+# kept current by the tools below as cases are resolved, reopened or commented on.
+# Set PAST_CASE_EMBEDDINGS to a file written by embedding_store.save_index to serve
+# it from a quantized memory-mapped matrix shared by every worker instead.
+if os.environ.get("PAST_CASE_EMBEDDINGS"):
+    past_case_index = MappedPastCaseIndex(os.environ["PAST_CASE_EMBEDDINGS"])
+else:
+    past_case_index = PastCaseIndex()
+past_case_index.start_compaction()
+
+# MinHash/LSH index over case titles and descriptions for near-duplicate detection
+duplicate_index = DuplicateIndex()
+
+# BM25 index over every case's text, fused with the vector index for ranked search
+search_index = BM25Index()
+hybrid_search = HybridSearcher(search_index, past_case_index)
+
+# Map-reduce comment summarizer with cached window summaries, used by synthesize_comments
+comment_summarizer = CommentSummarizer()
+# Offline TextRank summarizer for synthesize_comments' no-model fast path
+extractive_summarizer = ExtractiveSummarizer()
+# Size-capped text renderings of cases for tool results, cached per case version
+case_serializer = CaseSerializer()
+# Called with every case save_case persists, e.g. SLAScheduler.track to re-time its SLA deadline
+save_listeners = []
+
+# Worker threads for ASYNC_TOOLS, so store and index work never blocks the event loop
+tool_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("TOOL_WORKERS", "16")), thread_name_prefix="tool")
+_index_build_lock = threading.Lock()
+# Striped per-case locks held by every write to a case, from the mutating tools below or
+# from background jobs such as SLAScheduler, so concurrent runs never interleave changes
+_case_locks = [threading.RLock() for _ in range(256)]
+
+
+def case_lock(case_id: str) -> threading.RLock:
+    return _case_locks[hash(case_id) % len(_case_locks)]
+
+
+def locked_by_case(func):
+    @wraps(func)
+    def run(case_id: str, *args, **kwargs):
+        with case_lock(case_id):
+            return func(case_id, *args, **kwargs)
+
+    return run
 
 # Create assignees
 webapp_dev = Assignee(
@@ -49,12 +117,129 @@ security_analyst = Assignee(
     department="Security Team"
 )
 
+# Map assignee IDs to assignee objects
+ASSIGNEES = {
+    "dev001": webapp_dev,
+    "dev002": applog_dev,
+    "dev003": api_dev,
+    "dba001": database_admin,
+    "sec001": security_analyst,
+    "support001": support_agent
+}
+
+
+def save_case(case):
+    """Persist a case the tools changed in place, update the BM25 and duplicate indexes to match and notify save_listeners."""
+    case_store.save(case)
+    if search_index.built:
+        search_index.upsert(case)
+    if duplicate_index.built:
+        duplicate_index.add(case)
+    for listener in save_listeners:
+        listener(case)
+
+
+def ensure_search_indexes():
+    """Build the retrieval indexes from the case store on first use."""
+    if past_case_index.built and search_index.built:
+        return
+    with _index_build_lock:
+        if not past_case_index.built:
+            def resolved_cases():
+                # Read lazily, so the store is read only once build() queues concurrent writes
+                yield from case_store.list_cases_by_state(CaseState.RESOLVED)
+            past_case_index.build(resolved_cases())
+        if not search_index.built:
+            search_index.build(case_store.list_cases())
+
+
+def find_duplicates(case_id: str) -> list[tuple[str, float]]:
+    """(case id, similarity) of stored cases that are near-duplicates of the given case."""
+    return duplicates_on_arrival(case_store[case_id])
+
+
+def duplicates_on_arrival(case) -> list[tuple[str, float]]:
+    """Near-duplicates of a newly arrived case, which is then indexed so later arrivals are checked against it.
+
+    Call this as each case arrives, e.g. from the ingest on_added hook; the
+    index is built from the store on first use.
+    """
+    if not duplicate_index.built:
+        with _index_build_lock:
+            if not duplicate_index.built:
+                duplicate_index.build(case_store.list_cases())
+    matches = duplicate_index.query(case)
+    if case.id not in duplicate_index:
+        duplicate_index.add(case)
+    return matches
+
+
+def invalid_filter(**filters) -> str | None:
+    """An error message for the first filter value that isn't a valid component, priority or state, else None."""
+    parsers = {"component": Component, "priority": Priority, "state": CaseState}
+    for field, value in filters.items():
+        if value is None:
+            continue
+        try:
+            parsers[field](value)
+        except ValueError:
+            return f"Invalid {field}: {value}"
+    return None
+
+
 # Tool definitions
 @tool
-def check_past_cases():
-    """ Check past cases that are similar to the current case via something like vector search."""
-    # Return the historical resolved case for analysis
-    return case_store["CASE-2025-001"]
+def check_past_cases(case_id: str, k: int = 3, component: str | None = None, detail: str = "digest"):
+    """ Check past resolved cases that are similar to the specified case, ranked by combined keyword (BM25) and vector similarity. Optionally restrict to one component: webapp, applog, api, database, other. Detail: digest (fields, description and last comment), key_comments (plus the comments naming root cause and fix), full (everything)"""
+    if case_id not in case_store:
+        return f"Case {case_id} not found"
+
+    if detail not in DETAIL_LEVELS:
+        return f"Invalid detail level: {detail}"
+
+    error = invalid_filter(component=component)
+    if error:
+        return error
+
+    ensure_search_indexes()
+    matches = hybrid_search.search(
+        case_text(case_store[case_id]), k, state=CaseState.RESOLVED, component=component, exclude=case_id
+    )
+    if not matches:
+        return f"No similar resolved cases found for case {case_id}"
+    return case_serializer.render_many([case_store[match_id] for match_id, _ in matches], detail)
+
+
+@tool
+def search_cases(query: str, k: int = 5, component: str | None = None, priority: str | None = None, state: str | None = None):
+    """ Search all cases by free text, optionally filtered by component (webapp, applog, api, database, other), priority (low, medium, high, very_high) and state (new, in_progress, awaiting_customer_info, resolved). Returns matching case ids, states and titles."""
+    error = invalid_filter(component=component, priority=priority, state=state)
+    if error:
+        return error
+
+    ensure_search_indexes()
+    matches = hybrid_search.search(query, k, state=state, priority=priority, component=component)
+    if not matches:
+        return "No matching cases found"
+    return "\n".join(
+        f"- {case_serializer.render(case_store[match_id], 'line')} (score {score:.2f})" for match_id, score in matches
+    )
+
+
+@tool
+def check_duplicate_cases(case_id: str):
+    """ Check whether the specified case is a near-duplicate of another open or resolved case. Much cheaper than check_past_cases, so use it first for new cases."""
+    if case_id not in case_store:
+        return f"Case {case_id} not found"
+
+    matches = find_duplicates(case_id)
+    if not matches:
+        return f"No near-duplicates found for case {case_id}"
+    lines = [
+        f"- {case_serializer.render(case_store[match_id], 'line')} (similarity {similarity:.2f})"
+        for match_id, similarity in matches
+    ]
+    return f"Case {case_id} looks like a duplicate of:\n" + "\n".join(lines)
 
 
 @tool
@@ -72,6 +257,7 @@ def change_case_component(case_id: str, component: str):
         new_value=component,
         changed_at=datetime.now()
     ))
+    save_case(case)
     return f"Changed component from {old_component} to {component} for case {case_id}"
 
 
@@ -84,20 +270,10 @@ def change_case_assignee(case_id: str, assignee_id: str):
     case = case_store[case_id]
     old_assignee = case.assignee.name
     
-    # Map assignee IDs to assignee objects
-    assignee_map = {
-        "dev001": webapp_dev,
-        "dev002": applog_dev,
-        "dev003": api_dev,
-        "dba001": database_admin,
-        "sec001": security_analyst,
-        "support001": support_agent
-    }
-    
-    if assignee_id not in assignee_map:
+    if assignee_id not in ASSIGNEES:
         return f"Invalid assignee ID: {assignee_id}"
     
-    new_assignee = assignee_map[assignee_id]
+    new_assignee = ASSIGNEES[assignee_id]
     case.assignee = new_assignee
     case.change_history.append(Change(
         field="assignee",
@@ -105,6 +281,7 @@ def change_case_assignee(case_id: str, assignee_id: str):
         new_value=new_assignee.name,
         changed_at=datetime.now()
     ))
+    save_case(case)
 
     return f"Changed assignee from {old_assignee} to {new_assignee.name} for case {case_id}"
 
@@ -124,6 +301,11 @@ def change_case_state(case_id: str, state: str):
         new_value=state,
         changed_at=datetime.now()
     ))
+    save_case(case)
+    if case.state == CaseState.RESOLVED:
+        past_case_index.upsert(case)
+    elif old_state == CaseState.RESOLVED:
+        past_case_index.remove(case_id)
     return f"Changed state from {old_state} to {state} for case {case_id}"
 
 @tool
@@ -141,6 +323,7 @@ def change_case_priority(case_id: str, priority: str):
         new_value=priority, 
         changed_at=datetime.now()
     ))
+    save_case(case)
     return f"Changed priority from {old_priority} to {priority} for case {case_id}"
 
 @tool
@@ -164,8 +347,72 @@ def add_comment(case_id: str, message: str):
         changed_at=datetime.now()
     ))
     case.comments.append(comment)
+    save_case(case)
+    if case.state == CaseState.RESOLVED:
+        past_case_index.upsert(case)
     return f"Added comment to case {case_id}: {message}"
 
+@tool
+def update_case(case_id: str, component: str | None = None, assignee_id: str | None = None, state: str | None = None,
+                priority: str | None = None, comment: str | None = None):
+    """ Change several fields of the specified case in one call and optionally add a comment. Every given value is validated first and nothing changes if any is invalid. Values: component (webapp, applog, api, database, other), assignee_id (dev001, dev002, dev003, dba001, sec001, support001), state (new, in_progress, awaiting_customer_info, resolved), priority (low, medium, high, very_high)"""
+    if case_id not in case_store:
+        return f"Case {case_id} not found"
+
+    updates, errors = {}, []
+    values = {"component": component, "assignee": assignee_id, "state": state, "priority": priority}
+    parsers = {"component": Component, "state": CaseState, "priority": Priority}
+    for field, value in values.items():
+        if value is None:
+            continue
+        if field == "assignee":
+            new = ASSIGNEES.get(value)
+        else:
+            try:
+                new = parsers[field](value)
+            except ValueError:
+                new = None
+        if new is None:
+            errors.append(f"invalid {field}: {value}")
+        else:
+            updates[field] = new
+    if errors:
+        return f"No changes made to case {case_id}: " + "; ".join(errors)
+    if not updates and not comment:
+        return f"No changes given for case {case_id}"
+
+    case = case_store[case_id]
+    old_state = case.state
+    # One timestamp for the whole update, so its Change entries read as one group
+    now = datetime.now()
+    summary = []
+    for field, new in updates.items():
+        old = getattr(case, field)
+        if new == old:
+            continue
+        setattr(case, field, new)
+        old_value, new_value = (old.name, new.name) if field == "assignee" else (old.value, new.value)
+        case.change_history.append(Change(field=field, old_value=old_value, new_value=new_value, changed_at=now))
+        summary.append(f"{field} from {old_value} to {new_value}")
+    if comment:
+        case.comments.append(Comment(
+            id=f"AgentComment{len(case.comments) + 1}",
+            content=comment,
+            author="AGENT",
+            created_at=now.isoformat(),
+            updated_at=now.isoformat()
+        ))
+        case.change_history.append(Change(field="comments", old_value=None, new_value=comment, changed_at=now))
+        summary.append("added a comment")
+    if not summary:
+        return f"Case {case_id} already has those values"
+    save_case(case)
+    if case.state == CaseState.RESOLVED:
+        past_case_index.upsert(case)
+    elif old_state == CaseState.RESOLVED:
+        past_case_index.remove(case_id)
+    return f"Updated case {case_id}: " + ", ".join(summary)
+
 @tool
 def review_app_design(case_id: str, message: str):
     """ Review the app design and suggest a workaround for the customer. In real life, you could have all the documentation for your app here"""
@@ -176,21 +423,65 @@ def review_app_design(case_id: str, message: str):
     return "DESIGN LIMITATION: Non-Admin users are not permitted to create new jobs. This is by design for security reasons. WORKAROUND: Please contact your administrator to either: 1) Grant you admin privileges, or 2) Have an admin create the job on your behalf."
 
 @tool
-def synthesize_comments(case_id: str, message: str):
-    """ Synthesize all the comments into one comment. We assume that we have some logic in place to determine when this needs to be called depending on external vs internal message"""
+def synthesize_comments(case_id: str, message: str = "", mode: str = "message"):
+    """ Synthesize all the comments into one comment. We assume that we have some logic in place to determine when this needs to be called depending on external vs internal message. Modes: message (use the summary you wrote in message), extractive (fast offline summary of the key facts: who investigated, root cause and fix), map_reduce (model-written summary of the case's comments window by window, best for cases with many comments)"""
     if case_id not in case_store:
         return f"Case {case_id} not found"
+
+    if mode == "extractive":
+        summary = extractive_summarizer.summarize(case_store[case_id])
+        return f"Here is the summary of the comments: \n\n {summary}"
+    if mode == "map_reduce":
+        summary = comment_summarizer.summarize(case_store[case_id].comments)
+        return f"Here is the summary of the comments: \n\n {summary}"
+    if mode != "message":
+        return f"Invalid mode: {mode}"
     
     return f"Here is the summary of the comments: \n\n {message}"
 
+# Tools that change a case; ParallelToolNode runs calls touching the same case one at a time
+MUTATING_TOOLS = [
+    change_case_component,
+    change_case_assignee,
+    change_case_state,
+    change_case_priority,
+    add_comment,
+    update_case,
+]
+for mutating_tool in MUTATING_TOOLS:
+    mutating_tool.metadata = {**(mutating_tool.metadata or {}), "mutates_case": True}
+    mutating_tool.func = locked_by_case(mutating_tool.func)
+
 # List of all tools for easy import
 ALL_TOOLS = [
     check_past_cases, 
+    check_duplicate_cases, 
+    search_cases, 
     change_case_component, 
     change_case_assignee, 
     change_case_state, 
     change_case_priority, 
     add_comment, 
+    update_case,
     review_app_design, 
     synthesize_comments
-] 
\ No newline at end of file
+] 
+
+
+def async_tool(sync_tool: StructuredTool) -> StructuredTool:
+    """Copy of a @tool whose async path runs the function on tool_executor."""
+    async def run(**kwargs):
+        return await asyncio.get_running_loop().run_in_executor(tool_executor, partial(sync_tool.func, **kwargs))
+
+    return StructuredTool.from_function(
+        func=sync_tool.func,
+        coroutine=run,
+        name=sync_tool.name,
+        description=sync_tool.description,
+        args_schema=sync_tool.args_schema,
+        metadata=sync_tool.metadata,
+    )
+
+
+# Same tools for graphs driven with ainvoke (see runner.py)
+ASYNC_TOOLS = [async_tool(t) for t in ALL_TOOLS]
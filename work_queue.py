@@ -0,0 +1,233 @@
+import heapq
+import os
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.messages import HumanMessage
+from simple_model import Case, Priority
+from runner import case_request
+
+
+# Lower rank is served first
+PRIORITY_RANK = {Priority.VERY_HIGH: 0, Priority.HIGH: 1, Priority.MEDIUM: 2, Priority.LOW: 3}
+
+
+class CaseQueue:
+    """Bounded in-process queue of case ids, served by priority and then age.
+
+    Entries are ordered by (priority rank, case created_at, enqueue order), so a
+    VERY_HIGH case always goes before a LOW one and cases of equal priority go
+    oldest first. put() blocks while `maxsize` cases are waiting (or raises
+    queue.Full after `timeout`), which pushes back on whoever is feeding it. A
+    case already waiting is not queued twice.
+
+    stats() reports the current and peak depth and the time cases waited between
+    put() and get(), per priority.
+    """
+
+    def __init__(self, maxsize: int = 1000, samples: int = 10000):
+        self.maxsize = maxsize
+        self._heap: list[tuple] = []
+        self._queued: set[str] = set()
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._unfinished = 0
+        self._closed = False
+        self.enqueued = 0
+        self.rejected = 0
+        self.peak_depth = 0
+        self._waits = {priority.value: deque(maxlen=samples) for priority in Priority}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def put(self, case: Case, block: bool = True, timeout: float | None = None) -> bool:
+        """Queue a case; False if it is already waiting. Raises queue.Full if no slot frees up in time."""
+        with self._not_full:
+            if case.id in self._queued:
+                return False
+            if block:
+                if not self._not_full.wait_for(lambda: len(self._heap) < self.maxsize or self._closed, timeout):
+                    self.rejected += 1
+                    raise queue.Full
+            elif len(self._heap) >= self.maxsize:
+                self.rejected += 1
+                raise queue.Full
+            if self._closed:
+                raise RuntimeError("queue is closed")
+            entry = (PRIORITY_RANK[case.priority], case.created_at.timestamp(), next(self._order),
+                     case.id, case.priority.value, time.monotonic())
+            heapq.heappush(self._heap, entry)
+            self._queued.add(case.id)
+            self._unfinished += 1
+            self.enqueued += 1
+            self.peak_depth = max(self.peak_depth, len(self._heap))
+            self._not_empty.notify()
+        return True
+
+    def put_nowait(self, case: Case) -> bool:
+        return self.put(case, block=False)
+
+    def get(self, timeout: float | None = None) -> str | None:
+        """Next case id, or None on timeout or once the queue is closed and drained."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._heap or self._closed, timeout) or not self._heap:
+                return None
+            _, _, _, case_id, priority, queued_at = heapq.heappop(self._heap)
+            self._queued.discard(case_id)
+            self._waits[priority].append(time.monotonic() - queued_at)
+            self._not_full.notify()
+        return case_id
+
+    def task_done(self):
+        with self._idle:
+            self._unfinished -= 1
+            if self._unfinished == 0:
+                self._idle.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every queued case has been taken and marked done."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def close(self):
+        """Stop accepting cases and wake idle consumers; cases already queued are still served."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = {}
+            for priority, samples in self._waits.items():
+                if samples:
+                    ordered = sorted(samples)
+                    waits[priority] = {
+                        "count": len(ordered),
+                        "avg_ms": sum(ordered) / len(ordered) * 1000,
+                        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                        "max_ms": ordered[-1] * 1000,
+                    }
+            return {
+                "depth": len(self._heap),
+                "peak_depth": self.peak_depth,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "wait": waits,
+            }
+
+
+def graph_handler(graph, store, config: dict | None = None):
+    """Thread-mode handler that runs a queued case through a compiled graph and returns its final message."""
+    def handle(case_id: str) -> str:
+        request = HumanMessage(content=case_request(store[case_id]))
+        result = graph.invoke({"messages": [request]}, config=config or {"recursion_limit": 40})
+        return result["messages"][-1].content
+
+    return handle
+
+
+class CaseWorkerPool:
+    """Workers that take case ids from a CaseQueue and pass them to `handler(case_id)`.
+
+    In "thread" mode each of the `workers` threads calls the handler itself. In
+    "process" mode the threads only dispatch: each hands its case to a process
+    pool of the same size and waits for it, so at most `workers` cases run at
+    once and they still start in queue order. A process handler must be a
+    module-level function, and the processes only share cases through a
+    CASE_STORE_DB store, not this process's memory. Process mode refuses to
+    start without CASE_STORE_DB: with the in-memory store every process would
+    change its own copy, and a CASE_STORE_JOURNAL store would be recovered per
+    process and appended to with clashing sequence numbers.
+
+    Results are not kept: `on_done(case_id, result, error)` is called as each
+    case finishes (error is None on success), and only the last `keep_errors`
+    failures stay in `errors`, so a long-running pool holds constant memory. An
+    exception from on_done is recorded in `errors` too, under "on_done: ...",
+    and counted as a callback error; it never takes the worker thread down.
+    """
+
+    def __init__(self, case_queue: CaseQueue, handler, workers: int = 4, mode: str = "thread",
+                 on_done=None, keep_errors: int = 100):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Invalid worker mode: {mode}")
+        if mode == "process" and not os.environ.get("CASE_STORE_DB"):
+            raise ValueError("Process mode needs CASE_STORE_DB; the in-memory and journal stores can't be shared between processes")
+        self.queue = case_queue
+        self.handler = handler
+        self.workers = workers
+        self.mode = mode
+        self._processes = ProcessPoolExecutor(max_workers=workers) if mode == "process" else None
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.callback_errors = 0
+        self.busy = 0
+        self.on_done = on_done
+        # (case_id, error) of the most recent failures
+        self.errors: deque[tuple[str, str]] = deque(maxlen=keep_errors)
+
+    def start(self) -> "CaseWorkerPool":
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"case-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float | None = None):
+        """Close the queue, let the workers finish what is queued, and shut down."""
+        self.queue.close()
+        for thread in self._threads:
+            thread.join(timeout)
+        if self._processes is not None:
+            self._processes.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "mode": self.mode, "busy": self.busy,
+                    "processed": self.processed, "failed": self.failed, "callback_errors": self.callback_errors,
+                    **self.queue.stats()}
+
+    def _work(self):
+        while True:
+            case_id = self.queue.get()
+            if case_id is None:
+                return
+            with self._lock:
+                self.busy += 1
+            try:
+                if self._processes is not None:
+                    result = self._processes.submit(self.handler, case_id).result()
+                else:
+                    result = self.handler(case_id)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                    self.errors.append((case_id, repr(e)))
+                self._done(case_id, None, repr(e))
+            else:
+                with self._lock:
+                    self.processed += 1
+                self._done(case_id, result, None)
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                self.queue.task_done()
+
+    def _done(self, case_id: str, result, error: str | None):
+        if self.on_done is None:
+            return
+        try:
+            self.on_done(case_id, result, error)
+        except Exception as e:
+            with self._lock:
+                self.callback_errors += 1
+                self.errors.append((case_id, f"on_done: {e!r}"))